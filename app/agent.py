@@ -8,29 +8,60 @@ Extracted from run_experiment.py lines 121-369. Key changes from Sprint 1:
 - Node functions use closures for dependency injection
 """
 
+import sqlite3
 import time
-from typing import TypedDict, Optional
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Callable, Iterator, TypedDict, Optional
 
-from langchain_ollama import ChatOllama
+from langchain_core.language_models import BaseChatModel
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, END
-from sqlalchemy import Engine, text
+from sqlalchemy import Connection, Engine, text
 import sqlglot
 
 from app.config import (
-    OLLAMA_BASE_URL,
-    TEMPERATURE,
-    NUM_CTX,
-    MAX_RETRIES,
+    CASCADE_MODELS,
+    RESULT_MAX_ROWS,
+    SQLITE_PROGRESS_STEPS,
     BLOCKED_KEYWORDS,
+    FEW_SHOT_SEED_PATH,
+    DYNAMIC_FEW_SHOT_PROMPT,
+    CACHED_PREFIX_GENERIC,
+    FEW_SHOT_EXAMPLES,
+    PROMPT_FEW_SHOT,
     get_prompt_template,
+    get_ablation_prompt,
     get_error_repair_template,
 )
 from app.database import (
     get_schema_info,
     get_sample_rows,
+    build_schema_text,
     build_column_map,
     postprocess_sql,
 )
+from app.resultset import ResultSet
+from app.sql_rewrite import push_down_limit
+from app.sql_optimizer import SqlOptimizer
+from app.query_log import query_log_writer
+from app.metrics import METRICS, Metrics
+from app.cancellation import CancelToken, QueryCancelled, check_interrupted, deadline_in, interruption
+from app.llm import create_llm, invoke_for_sql, build_cached_suffix, build_messages
+from app.scheduler import PRIORITY_INTERACTIVE
+from app.hedging import Hedger
+from app.warmup import ModelWarmer
+from app.value_index import refresh_value_index, make_value_lookup, format_value_hits
+from app.repair import build_repair_prompt
+from app.retry_policy import decide_retry, history_entry
+from app.router import load_router, make_route_question
+from app.few_shot import (
+    add_example,
+    load_seed_examples,
+    make_example_retriever,
+    format_examples,
+)
 
 
 # ──────────────────────────────────────────────────────────────
@@ -39,22 +70,116 @@ from app.database import (
 class AgentState(TypedDict):
     question: str
     relevant_tables: list[str]
+    prompt_type: str        # Prompt strategy chosen by route_question ("" = model default)
     schema_text: str
+    value_hits: list        # (table, column, value) literals grounded by the value index
     raw_sql: str            # SQL before post-processing (LIM-003)
+    output_mode: str        # How the last LLM answer was parsed: text, structured, fallback
     generated_sql: str      # SQL after post-processing (used for validation/execution)
+    optimized_sql: str      # Verified rewrite from optimize_query ("" if none adopted)
+    executed_sql: str       # SQL as run by execute_query (after limit_query)
     is_valid: bool
     validation_error: str
-    results: Optional[list]
+    results: Optional[ResultSet]  # Columnar rows with column names (app/resultset.py)
     error: str
     retry_count: int
+    retry_history: list     # One {"sql", "category"} entry per repair round (app/retry_policy.py)
+    stop_reason: str        # Why the retry loop stopped early ("" if it did not)
     model_name: str
+    deadline: Optional[float]              # Absolute time.time() deadline (None = none)
+    cancel_token: Optional[CancelToken]    # Set by the caller to abort the run
+    priority: int           # LLM scheduling class (app/scheduler.py, lower runs first)
+    stream_tokens: bool     # Emit LLM chunks as custom stream events (set by stream_agent)
+    model_tier: int         # Index into the cascade ladder (0 = cheapest model)
+    tier_started_at: float  # time.time() when the current tier started generating
+    answered_by: str        # Model whose SQL produced the final results ("" if none)
+
+
+def new_state(question: str, model_name: str, timeout: Optional[float] = None,
+              cancel_token: Optional[CancelToken] = None,
+              priority: int = PRIORITY_INTERACTIVE) -> AgentState:
+    """Return the initial AgentState for a question.
+
+    timeout (seconds) sets the request deadline; cancel_token lets the
+    caller abort the run from another thread. Bulk callers pass
+    PRIORITY_BATCH so interactive LLM calls are served first.
+    """
+    return {
+        "question": question,
+        "relevant_tables": [],
+        "prompt_type": "",
+        "schema_text": "",
+        "value_hits": [],
+        "raw_sql": "",
+        "output_mode": "",
+        "generated_sql": "",
+        "optimized_sql": "",
+        "executed_sql": "",
+        "is_valid": False,
+        "validation_error": "",
+        "results": None,
+        "error": "",
+        "retry_count": 0,
+        "retry_history": [],
+        "stop_reason": "",
+        "model_name": model_name,
+        "deadline": deadline_in(timeout),
+        "cancel_token": cancel_token,
+        "priority": priority,
+        "stream_tokens": False,
+        "model_tier": 0,
+        "tier_started_at": 0.0,
+        "answered_by": "",
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Progressive streaming
+# ──────────────────────────────────────────────────────────────
+def token_writer(state: AgentState, node: str) -> Optional[Callable[[str], None]]:
+    """on_token callback that emits {"event": "token", "node", "text"} stream events.
+
+    None unless state["stream_tokens"] is set, so invoke() keeps the
+    non-streaming LLM path.
+    """
+    if not state.get("stream_tokens"):
+        return None
+    writer = get_stream_writer()
+    return lambda text: writer({"event": "token", "node": node, "text": text})
+
+
+def stream_agent(agent, state: AgentState) -> Iterator[dict]:
+    """Run the agent and yield progress events as they happen.
+
+    Yields {"event": "node", "node", "update"} after each node,
+    {"event": "token", "node", "text"} for each LLM chunk of generate_sql
+    and handle_error, and finally {"event": "final", "state"} with the
+    same final state agent.invoke() would return.
+    """
+    final = state
+    for mode, chunk in agent.stream({**state, "stream_tokens": True},
+                                    stream_mode=["updates", "custom", "values"]):
+        if mode == "values":
+            final = chunk
+        elif mode == "custom":
+            yield chunk
+        else:
+            for node, update in chunk.items():
+                yield {"event": "node", "node": node, "update": update or {}}
+    yield {"event": "final", "state": final}
 
 
 # ──────────────────────────────────────────────────────────────
 # Node functions
 # ──────────────────────────────────────────────────────────────
-def make_schema_filter(schema_info: dict, sample_rows: dict):
-    """Create a schema_filter node with injected schema and sample data."""
+def make_schema_filter(schema_info: dict, sample_rows: dict,
+                       value_lookup: Optional[Callable[[str], list]] = None):
+    """Create a schema_filter node with injected schema and sample data.
+
+    If value_lookup is given (see app/value_index.py), literal values found
+    in the question are grounded to their (table, column) and appended to
+    schema_text; tables holding a hit are added to the selection.
+    """
 
     def schema_filter(state: AgentState) -> dict:
         """Select relevant tables based on question keywords (Node 1)."""
@@ -94,6 +219,12 @@ def make_schema_filter(schema_info: dict, sample_rows: dict):
         if not selected:
             selected = list(schema_info.keys())
 
+        # Ground literal values to the tables/columns that hold them
+        value_hits = value_lookup(state["question"]) if value_lookup else []
+        for table_name, _, _ in value_hits:
+            if table_name in schema_info and table_name not in selected:
+                selected.append(table_name)
+
         # Build schema text with sample rows
         schema_lines = []
         for table_name in selected:
@@ -103,45 +234,99 @@ def make_schema_filter(schema_info: dict, sample_rows: dict):
             if table_name in sample_rows:
                 sr = sample_rows[table_name]
                 schema_lines.append(f"-- Sample: {sr['rows'][0]}")
+        if value_hits:
+            schema_lines.append(format_value_hits(value_hits))
 
         schema_text = "\n".join(schema_lines)
-        return {"relevant_tables": selected, "schema_text": schema_text}
+        return {"relevant_tables": selected, "schema_text": schema_text, "value_hits": value_hits}
 
     return schema_filter
 
 
-def make_generate_sql(model_name: str):
-    """Create a generate_sql node for the given model."""
+def make_generate_sql(model_name: str,
+                      example_retriever: Optional[Callable[[str], list[dict]]] = None,
+                      prompt_prefix: Optional[str] = None,
+                      llm_factory: Callable[..., BaseChatModel] = create_llm,
+                      structured_output: bool = False,
+                      hedger: Optional[Hedger] = None):
+    """Create a generate_sql node for the given model.
+
+    If example_retriever is given (see app/few_shot.py), generic models get
+    DYNAMIC_FEW_SHOT_PROMPT with the most similar stored examples; when no
+    example is retrieved the model-aware template is used unchanged.
+
+    If prompt_prefix is given, the prompt is sent as that fixed system
+    message followed by a short per-question suffix (CACHED_SUFFIX_GENERIC),
+    so Ollama reuses the KV cache of the prefix across requests.
+
+    If structured_output is set, the answer is requested as JSON through
+    Ollama's `format` (see invoke_for_sql), with text-mode fallback.
+
+    If state["prompt_type"] was set by route_question, it selects the
+    strategy: zero-shot skips example retrieval, few-shot uses retrieved
+    examples (or the static FEW_SHOT_EXAMPLES), CoT asks for reasoning
+    before the query.
+
+    If hedger is given, slow calls are hedged (app/hedging.py).
+    """
 
     def generate_sql(state: AgentState) -> dict:
         """Generate SQL from question + filtered schema using LLM (Node 2).
 
         Does NOT apply post-processing — that's now a separate node (LIM-003).
         """
-        template = get_prompt_template(model_name)
-        prompt = template.format(
-            schema_text=state["schema_text"],
-            question=state["question"],
-        )
-
-        llm = ChatOllama(
-            model=model_name,
-            base_url=OLLAMA_BASE_URL,
-            temperature=TEMPERATURE,
-            num_ctx=NUM_CTX,
-        )
+        prompt_type = state.get("prompt_type", "")
+        examples = []
+        if (example_retriever is not None and "sqlcoder" not in model_name
+                and prompt_type in ("", PROMPT_FEW_SHOT)):
+            examples = example_retriever(state["question"])
+
+        if prompt_prefix is not None:
+            value_hits = state.get("value_hits") or []
+            example_text = format_examples(examples)
+            if prompt_type == PROMPT_FEW_SHOT and not example_text:
+                example_text = FEW_SHOT_EXAMPLES
+            suffix = build_cached_suffix(
+                question=state["question"],
+                relevant_tables=state.get("relevant_tables"),
+                value_hints=format_value_hits(value_hits) if value_hits else "",
+                examples=example_text,
+                prompt_type=prompt_type,
+            )
+            prompt = build_messages(prompt_prefix, suffix)
+        elif examples:
+            prompt = DYNAMIC_FEW_SHOT_PROMPT.format(
+                schema_text=state["schema_text"],
+                examples=format_examples(examples),
+                question=state["question"],
+            )
+        elif prompt_type:
+            template = get_ablation_prompt(prompt_type, model_name)
+            prompt = template.format(
+                schema_text=state["schema_text"],
+                question=state["question"],
+            )
+        else:
+            template = get_prompt_template(model_name)
+            prompt = template.format(
+                schema_text=state["schema_text"],
+                question=state["question"],
+            )
 
         t0 = time.time()
-        response = llm.invoke(prompt)
+        try:
+            sql, output_mode = invoke_for_sql(llm_factory, model_name, prompt, structured_output,
+                                              state.get("deadline"), state.get("cancel_token"),
+                                              state.get("priority", PRIORITY_INTERACTIVE),
+                                              hedger=hedger,
+                                              on_token=token_writer(state, "generate_sql"))
+        except QueryCancelled as e:
+            print(f"  Generation stopped: {e}")
+            return {"generated_sql": "", "output_mode": "", "error": str(e)}
         elapsed = time.time() - t0
 
-        # Extract SQL from markdown fences and strip trailing semicolons
-        sql = response.content.strip()
-        sql = sql.replace("```sql", "").replace("```", "").strip()
-        sql = sql.rstrip(";").strip()
-
         print(f"  SQL ({elapsed:.1f}s): {sql[:75]}")
-        return {"generated_sql": sql}
+        return {"generated_sql": sql, "output_mode": output_mode}
 
     return generate_sql
 
@@ -188,58 +373,188 @@ def validate_query(state: AgentState) -> dict:
         return {"is_valid": False, "validation_error": str(e)}
 
 
-def make_execute_query(engine: Engine):
-    """Create an execute_query node with injected database engine."""
+@contextmanager
+def guarded_connection(engine: Engine, deadline: Optional[float] = None,
+                       cancel_token: Optional[CancelToken] = None) -> Iterator[Connection]:
+    """Connection whose statements are aborted on deadline or cancellation.
+
+    On SQLite the statement is aborted when the deadline passes (progress
+    handler, checked every SQLITE_PROGRESS_STEPS instructions) or the
+    token is cancelled (sqlite3 interrupt()).
+
+    Raises:
+        QueryCancelled / DeadlineExceeded if the statement was aborted
+    """
+    check_interrupted(deadline, cancel_token)
+    with engine.connect() as conn:
+        dbapi = conn.connection.driver_connection
+        guarded = isinstance(dbapi, sqlite3.Connection) and (
+            deadline is not None or cancel_token is not None)
+        if not guarded:
+            yield conn
+            return
+
+        dbapi.set_progress_handler(lambda: 1 if interruption(deadline, cancel_token) else 0,
+                                   SQLITE_PROGRESS_STEPS)
+        unregister = cancel_token.register(dbapi.interrupt) if cancel_token else None
+        try:
+            yield conn
+        except Exception:
+            check_interrupted(deadline, cancel_token)
+            raise
+        finally:
+            dbapi.set_progress_handler(None, 0)
+            if unregister is not None:
+                unregister()
+
+
+def make_optimize_query(optimizer: SqlOptimizer):
+    """Create an optimize_query node that adopts verified rewrites (app/sql_optimizer.py).
+
+    Sets optimized_sql on every pass, to "" when no rewrite was adopted,
+    so a retry never executes the rewrite of an earlier attempt.
+    The pass runs within the request's deadline and cancel token.
+    """
+
+    def optimize_query(state: AgentState) -> dict:
+        outcome = optimizer.optimize(state["generated_sql"], state.get("deadline"),
+                                     state.get("cancel_token"))
+        if outcome is None:
+            return {"optimized_sql": ""}
+        print(f"  Optimized ({outcome['speedup']:.1f}x on sample): {outcome['sql'][:75]}")
+        return {"optimized_sql": outcome["sql"]}
+
+    return optimize_query
+
+
+def make_limit_query(max_rows: Optional[int] = RESULT_MAX_ROWS):
+    """Create a limit_query node that bounds the executed SQL to max_rows rows.
+
+    Sets executed_sql to optimized_sql (or generated_sql) with its
+    outermost LIMIT pushed down to the rows execute_query fetches
+    (app/sql_rewrite.py), so SQLite can sort top-N and stop early.
+    max_rows=None disables the rewrite.
+    """
+
+    def limit_query(state: AgentState) -> dict:
+        sql = state.get("optimized_sql") or state["generated_sql"]
+        rewritten = push_down_limit(sql, max_rows) if max_rows is not None else None
+        if rewritten is None:
+            return {"executed_sql": sql}
+        print(f"  LIMIT pushdown: {rewritten[-40:]}")
+        return {"executed_sql": rewritten}
+
+    return limit_query
+
+
+def run_query(engine: Engine, sql: str, deadline: Optional[float] = None,
+              cancel_token: Optional[CancelToken] = None, max_rows: int = RESULT_MAX_ROWS) -> list:
+    """Execute SQL and return up to max_rows rows as lists (see guarded_connection).
+
+    Raises:
+        QueryCancelled / DeadlineExceeded if the statement was aborted
+    """
+    with guarded_connection(engine, deadline, cancel_token) as conn:
+        return [list(row) for row in conn.execute(text(sql)).fetchmany(max_rows)]
+
+
+def run_query_result(engine: Engine, sql: str, deadline: Optional[float] = None,
+                     cancel_token: Optional[CancelToken] = None,
+                     max_rows: int = RESULT_MAX_ROWS) -> ResultSet:
+    """Execute SQL and return up to max_rows rows as a columnar ResultSet.
+
+    Raises:
+        QueryCancelled / DeadlineExceeded if the statement was aborted
+    """
+    with guarded_connection(engine, deadline, cancel_token) as conn:
+        result = conn.execute(text(sql))
+        return ResultSet.from_rows(list(result.keys()), result.fetchmany(max_rows))
+
+
+def make_execute_query(engine: Engine,
+                       record_example: Optional[Callable[[str, str], None]] = None,
+                       record_query: Optional[Callable[[str, float], None]] = None):
+    """Create an execute_query node with injected database engine.
+
+    Results are stored as a columnar ResultSet (app/resultset.py) with
+    the column names; results.to_arrow() feeds display and export.
+
+    If record_example is given, question/SQL pairs that execute and return
+    rows are passed to it (feeds the dynamic few-shot store). If
+    record_query is given, every statement that executes is passed to it
+    as run, with its execution time (feeds the query log).
+    """
 
     def execute_query(state: AgentState) -> dict:
         """Execute validated SQL against the database (Node 5)."""
         sql = state["generated_sql"]
+        executed = state.get("executed_sql") or sql
+        t0 = time.time()
         try:
-            with engine.connect() as conn:
-                rows = conn.execute(text(sql)).fetchmany(20)
-                results = [list(row) for row in rows]
-                return {"results": results, "error": ""}
+            results = run_query_result(engine, executed, state.get("deadline"), state.get("cancel_token"))
         except Exception as e:
             return {"results": None, "error": str(e)}
 
+        if record_query is not None:
+            # Telemetry: a log failure must not fail a query that ran
+            try:
+                record_query(executed, time.time() - t0)
+            except Exception as e:
+                print(f"  Query log failed: {e}")
+        if record_example is not None and results:
+            try:
+                record_example(state["question"], sql)
+            except Exception as e:
+                print(f"  Few-shot store update failed: {e}")
+        return {"results": results, "error": ""}
+
     return execute_query
 
 
-def make_handle_error(model_name: str, column_map: dict):
-    """Create a handle_error node for the given model, with post-processing."""
+def make_handle_error(model_name: str, column_map: dict,
+                      llm_factory: Callable[..., BaseChatModel] = create_llm,
+                      structured_output: bool = False,
+                      schema_info: Optional[dict] = None):
+    """Create a handle_error node for the given model, with post-processing.
+
+    If schema_info is given, repairs use the compact prompt from
+    app/repair.py (referenced tables/columns, error location, closest
+    matches) instead of resending the full schema_text.
+    """
 
     def handle_error(state: AgentState) -> dict:
         """Feed error back to LLM for SQL repair (Node 6)."""
-        template = get_error_repair_template(model_name)
-        prompt = template.format(
-            schema_text=state["schema_text"],
-            question=state["question"],
-            generated_sql=state["generated_sql"],
-            error=state.get("error", "") or state.get("validation_error", ""),
-        )
-
-        llm = ChatOllama(
-            model=model_name,
-            base_url=OLLAMA_BASE_URL,
-            temperature=TEMPERATURE,
-            num_ctx=NUM_CTX,
-        )
+        if schema_info is not None:
+            prompt = build_repair_prompt(state, schema_info, model_name)
+        else:
+            template = get_error_repair_template(model_name)
+            prompt = template.format(
+                schema_text=state["schema_text"],
+                question=state["question"],
+                generated_sql=state["generated_sql"],
+                error=state.get("error", "") or state.get("validation_error", ""),
+            )
 
         t0 = time.time()
-        response = llm.invoke(prompt)
+        try:
+            sql, output_mode = invoke_for_sql(llm_factory, model_name, prompt, structured_output,
+                                              state.get("deadline"), state.get("cancel_token"),
+                                              state.get("priority", PRIORITY_INTERACTIVE),
+                                              on_token=token_writer(state, "handle_error"))
+        except QueryCancelled as e:
+            print(f"  Repair stopped: {e}")
+            return {"generated_sql": "", "error": str(e)}
         elapsed = time.time() - t0
 
-        sql = response.content.strip()
-        sql = sql.replace("```sql", "").replace("```", "").strip()
-        sql = sql.rstrip(";").strip()
-
         # Post-process the repaired SQL too
         raw = sql
         sql = postprocess_sql(sql, column_map)
 
         new_retry = state["retry_count"] + 1
+        history = [*(state.get("retry_history") or []), history_entry(state)]
         print(f"  Retry {new_retry} ({elapsed:.1f}s): {sql[:75]}")
-        return {"raw_sql": raw, "generated_sql": sql, "retry_count": new_retry, "error": ""}
+        return {"raw_sql": raw, "generated_sql": sql, "retry_count": new_retry, "error": "",
+                "output_mode": output_mode, "retry_history": history}
 
     return handle_error
 
@@ -248,33 +563,225 @@ def make_handle_error(model_name: str, column_map: dict):
 # Routing functions
 # ──────────────────────────────────────────────────────────────
 def check_validation(state: AgentState) -> str:
-    """Route after validation: execute if valid, retry or end if not."""
+    """Route after validation: execute if valid, retry or end if not.
+
+    Whether a retry is worth it is decided by the retry policy
+    (per-category budgets, repeated SQL, MAX_RETRIES).
+    """
     if state["is_valid"]:
         return "execute_query"
-    if state["retry_count"] < MAX_RETRIES:
+    if decide_retry(state)[0]:
         return "handle_error"
     return END
 
 
 def should_retry(state: AgentState) -> str:
-    """Route after execution: retry on error or finish."""
-    if state["error"] and state["retry_count"] < MAX_RETRIES:
+    """Route after execution: retry on error (if the policy allows) or finish."""
+    if state["error"] and decide_retry(state)[0]:
         return "handle_error"
     return END
 
 
+def finalize(state: AgentState) -> dict:
+    """Record why the run stopped (last node before END)."""
+    failed = not state["is_valid"] or state["error"]
+    stop_reason = decide_retry(state)[1] if failed else ""
+    if stop_reason:
+        print(f"  Stopped: {stop_reason}")
+    return {"stop_reason": stop_reason}
+
+
+# ──────────────────────────────────────────────────────────────
+# Model cascade
+# ──────────────────────────────────────────────────────────────
+def is_confident(state: AgentState) -> bool:
+    """Confidence check for a cheap tier's answer.
+
+    An executed query that returns no rows, or only NULLs (e.g. MAX over
+    an empty filter), is treated as a likely wrong answer worth a second
+    opinion from the next model.
+    """
+    results = state.get("results")
+    if not results:
+        return False
+    return any(value is not None for row in results for value in row)
+
+
+def make_cascade_generate(generate_nodes: list[Callable], models: list[str],
+                          metrics: Metrics = METRICS):
+    """Create a generate_sql node that dispatches to the current tier's model."""
+
+    def generate_sql(state: AgentState) -> dict:
+        tier = state.get("model_tier", 0)
+        started = time.time()
+        metrics.incr(f"cascade.{models[tier]}.attempts")
+        update = generate_nodes[tier](state)
+        return {**update, "model_name": models[tier], "tier_started_at": started}
+
+    return generate_sql
+
+
+def make_escalate(models: list[str], metrics: Metrics = METRICS):
+    """Create the escalate node: move to the next tier with a fresh state."""
+
+    def escalate(state: AgentState) -> dict:
+        tier = state.get("model_tier", 0)
+        model = models[tier]
+        metrics.incr(f"cascade.{model}.escalations")
+        metrics.observe(f"cascade.{model}.latency", time.time() - state.get("tier_started_at", 0.0))
+
+        reason = state.get("validation_error") or state.get("error") or "empty or NULL results"
+        print(f"  Escalating {model} -> {models[tier + 1]}: {reason[:60]}")
+        return {"model_tier": tier + 1, "retry_count": 0, "retry_history": [], "is_valid": False,
+                "validation_error": "", "error": "", "results": None}
+
+    return escalate
+
+
+def make_cascade_done(models: list[str], metrics: Metrics = METRICS):
+    """Create the cascade_done node: record which tier answered."""
+
+    def cascade_done(state: AgentState) -> dict:
+        model = models[state.get("model_tier", 0)]
+        metrics.observe(f"cascade.{model}.latency", time.time() - state.get("tier_started_at", 0.0))
+
+        answered = state.get("is_valid") and not state.get("error") and state.get("results") is not None
+        if not answered:
+            metrics.incr("cascade.unanswered")
+            return {"answered_by": ""}
+        metrics.incr(f"cascade.{model}.hits")
+        return {"answered_by": model}
+
+    return cascade_done
+
+
+def make_cascade_routing(n_tiers: int):
+    """Wrap check_validation/should_retry with escalation for cascade mode.
+
+    Lower tiers escalate instead of retrying; the last tier keeps the
+    regular repair loop. Every finished run goes through cascade_done.
+    """
+
+    def has_next_tier(state: AgentState) -> bool:
+        if interruption(state.get("deadline"), state.get("cancel_token")):
+            return False
+        return state.get("model_tier", 0) < n_tiers - 1
+
+    def check_validation_cascade(state: AgentState) -> str:
+        if not state["is_valid"] and has_next_tier(state):
+            return "escalate"
+        route = check_validation(state)
+        return "cascade_done" if route == END else route
+
+    def should_retry_cascade(state: AgentState) -> str:
+        if has_next_tier(state) and (state["error"] or not is_confident(state)):
+            return "escalate"
+        route = should_retry(state)
+        return "cascade_done" if route == END else route
+
+    return check_validation_cascade, should_retry_cascade
+
+
+def cascade_stats(models: list[str] = CASCADE_MODELS, metrics: Metrics = METRICS) -> list[dict]:
+    """Per-tier hit rate and latency from the metrics registry.
+
+    hit_rate is hits / attempts at that tier; share is hits / questions
+    that entered the cascade (attempts at tier 0).
+    """
+    total = metrics.counter(f"cascade.{models[0]}.attempts")
+    stats = []
+    for model in models:
+        attempts = metrics.counter(f"cascade.{model}.attempts")
+        hits = metrics.counter(f"cascade.{model}.hits")
+        stats.append({
+            "model": model,
+            "attempts": int(attempts),
+            "hits": int(hits),
+            "escalations": int(metrics.counter(f"cascade.{model}.escalations")),
+            "hit_rate": hits / attempts if attempts else 0.0,
+            "share": hits / total if total else 0.0,
+            "latency": metrics.summary(f"cascade.{model}.latency"),
+        })
+    return stats
+
+
 # ──────────────────────────────────────────────────────────────
 # Graph builder
 # ──────────────────────────────────────────────────────────────
-def build_agent(engine: Engine, model_name: str):
+def build_agent(engine: Engine, model_name: str, value_index_path: Optional[str | Path] = None,
+                example_store_path: Optional[str | Path] = None,
+                cache_prompt_prefix: bool = False,
+                structured_output: bool = False,
+                llm_factory: Callable[..., BaseChatModel] = create_llm,
+                cascade_models: Optional[list[str]] = None,
+                router_model_path: Optional[str | Path] = None,
+                compact_repair: bool = False,
+                hedge: bool = False,
+                warm_up: bool = False,
+                optimize: bool = False,
+                query_log_path: Optional[str | Path] = None):
     """Construct and compile the LangGraph agent.
 
+    With cache_prompt_prefix, generic models are prompted with a stable
+    prefix holding the instructions and the full schema, and a short suffix
+    with the question and schema_filter's table selection as a hint. The
+    default is the original single-prompt layout with the filtered schema
+    and sample rows; the Streamlit app and API opt in. sqlcoder always uses
+    its own prompt format (DEC-003).
+
+    With structured_output, generate_sql and handle_error request JSON
+    constrained by SQL_OUTPUT_SCHEMA instead of free text.
+
+    llm_factory(model_name, **options) returns the chat model used by the
+    LLM nodes; tests pass a stub here.
+
+    If value_index_path is given, the sidecar FTS5 value index is built or
+    incrementally refreshed there and schema_filter grounds question values
+    against it.
+
+    If example_store_path is given, the few-shot store there is seeded from
+    FEW_SHOT_SEED_PATH, generate_sql retrieves similar examples per question,
+    and successfully executed queries are added to the store.
+
+    If cascade_models is given (cheapest first, e.g. CASCADE_MODELS), it
+    replaces model_name: each question starts on the first model and an
+    escalate node moves to the next one when validation, execution or the
+    is_confident check fails. Only the last model uses handle_error. A
+    final cascade_done node sets answered_by and records per-tier hits and
+    latency in METRICS (see cascade_stats).
+
+    With compact_repair, handle_error sends only the schema the failed SQL
+    touches plus the error location (app/repair.py) instead of schema_text.
+
+    If router_model_path is given (see app/router.py), a route_question
+    node after schema_filter picks zero-shot, few-shot or CoT per question.
+
+    With hedge, generate_sql calls slower than the HEDGE_PERCENTILE of
+    recent LLM latency get a duplicate on another replica or
+    HEDGE_BACKUP_MODEL (app/hedging.py); without either it has no effect.
+
+    With warm_up, a background ModelWarmer (app/warmup.py) loads each
+    model with a throwaway prefill of the schema prefix and re-warms the
+    first one whenever Ollama unloads it.
+
+    If query_log_path is given, execute_query queues every executed
+    statement for the query log there (app/query_log.py), the workload
+    scripts/advise_indexes.py mines for indexes.
+
+    With optimize, an optimize_query node before limit_query rewrites the
+    validated SQL into a faster equivalent when one verifies on a sampled
+    copy of the database (app/sql_optimizer.py).
+
     New graph structure (LIM-003 fix — postprocess_query is a separate node):
 
-        schema_filter → generate_sql → postprocess_query → validate_query → execute_query → END
-                              ^                                  |                    |
-                              |                                  v                    v
-                              +--------------------------- handle_error <-----------+
+        schema_filter → generate_sql → postprocess_query → validate_query → limit_query → execute_query → finalize → END
+                              ^                                  |                                   |
+                              |                                  v                                   v
+                              +--------------------------- handle_error <----------------------------+
+
+    handle_error is entered only while the retry policy (app/retry_policy.py)
+    allows it; finalize records stop_reason. limit_query bounds the
+    executed SQL to the RESULT_MAX_ROWS rows execute_query fetches.
     """
     schema_info = get_schema_info(engine)
     sample_tables = [t for t in schema_info.keys()
@@ -282,21 +789,83 @@ def build_agent(engine: Engine, model_name: str):
     sample_rows = get_sample_rows(engine, sample_tables)
     column_map = build_column_map(schema_info)
 
+    value_lookup = None
+    if value_index_path is not None:
+        refresh_value_index(engine, schema_info, value_index_path)
+        value_lookup = make_value_lookup(value_index_path)
+
+    example_retriever = None
+    record_example = None
+    if example_store_path is not None:
+        load_seed_examples(example_store_path, FEW_SHOT_SEED_PATH)
+        example_retriever = make_example_retriever(example_store_path)
+        record_example = partial(add_example, example_store_path)
+
+    models = list(cascade_models) if cascade_models else [model_name]
+    hedger = Hedger() if hedge else None
+    schema_prefix = None
+    if cache_prompt_prefix:
+        schema_prefix = CACHED_PREFIX_GENERIC.format(schema_text=build_schema_text(schema_info))
+
+    if warm_up:
+        ModelWarmer(models, schema_prefix, llm_factory).start()
+
+    generate_nodes = [
+        make_generate_sql(model, example_retriever,
+                          None if "sqlcoder" in model else schema_prefix,
+                          llm_factory, structured_output, hedger)
+        for model in models
+    ]
+
     workflow = StateGraph(AgentState)
 
-    workflow.add_node("schema_filter", make_schema_filter(schema_info, sample_rows))
-    workflow.add_node("generate_sql", make_generate_sql(model_name))
+    workflow.add_node("schema_filter", make_schema_filter(schema_info, sample_rows, value_lookup))
+    if cascade_models:
+        workflow.add_node("generate_sql", make_cascade_generate(generate_nodes, models))
+    else:
+        workflow.add_node("generate_sql", generate_nodes[0])
     workflow.add_node("postprocess_query", make_postprocess_query(column_map))
     workflow.add_node("validate_query", validate_query)
-    workflow.add_node("execute_query", make_execute_query(engine))
-    workflow.add_node("handle_error", make_handle_error(model_name, column_map))
+    workflow.add_node("limit_query", make_limit_query())
+    execute_entry = "limit_query"
+    if optimize:
+        workflow.add_node("optimize_query", make_optimize_query(SqlOptimizer(engine, schema_info)))
+        workflow.add_edge("optimize_query", "limit_query")
+        execute_entry = "optimize_query"
+    record_executed = query_log_writer(query_log_path).record if query_log_path is not None else None
+    workflow.add_node("execute_query", make_execute_query(engine, record_example, record_executed))
+    workflow.add_node("handle_error", make_handle_error(
+        models[-1], column_map, llm_factory, structured_output,
+        schema_info if compact_repair else None))
 
     workflow.set_entry_point("schema_filter")
-    workflow.add_edge("schema_filter", "generate_sql")
+    if router_model_path is not None:
+        workflow.add_node("route_question", make_route_question(load_router(router_model_path)))
+        workflow.add_edge("schema_filter", "route_question")
+        workflow.add_edge("route_question", "generate_sql")
+    else:
+        workflow.add_edge("schema_filter", "generate_sql")
     workflow.add_edge("generate_sql", "postprocess_query")
     workflow.add_edge("postprocess_query", "validate_query")
-    workflow.add_conditional_edges("validate_query", check_validation)
-    workflow.add_conditional_edges("execute_query", should_retry)
     workflow.add_edge("handle_error", "validate_query")
+    workflow.add_edge("limit_query", "execute_query")
+    workflow.add_node("finalize", finalize)
+    workflow.add_edge("finalize", END)
+
+    if cascade_models:
+        route_validation, route_execution = make_cascade_routing(len(models))
+        workflow.add_node("escalate", make_escalate(models))
+        workflow.add_node("cascade_done", make_cascade_done(models))
+        workflow.add_conditional_edges("validate_query", route_validation, {
+            "execute_query": execute_entry, "escalate": "escalate", "handle_error": "handle_error",
+            "cascade_done": "cascade_done"})
+        workflow.add_conditional_edges("execute_query", route_execution)
+        workflow.add_edge("escalate", "generate_sql")
+        workflow.add_edge("cascade_done", "finalize")
+    else:
+        workflow.add_conditional_edges("validate_query", check_validation, {
+            "execute_query": execute_entry, "handle_error": "handle_error", END: "finalize"})
+        workflow.add_conditional_edges("execute_query", should_retry, {
+            "handle_error": "handle_error", END: "finalize"})
 
     return workflow.compile()
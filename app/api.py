@@ -0,0 +1,512 @@
+"""Headless HTTP API for the SQL Query Agent (ASGI, Starlette).
+
+Usage (one agent and engine per worker process):
+    uvicorn app.api:create_app --factory --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST /query                  {"question": ..., "page_size"?, "timeout"?}
+                                 -> SQL, first page of results, query_id
+    GET  /query/{query_id}/rows  ?page=N&page_size=M -> further result pages
+    GET  /query/{query_id}/export ?format=csv|parquet -> full result, streamed
+    POST /query/stream           same body; NDJSON, one line per graph node
+                                 plus {"event": "token"} lines with SQL as generated
+    GET  /health                 queue and concurrency state
+    GET  /metrics                METRICS snapshot
+
+Admission control: at most max_concurrency agent runs execute at once
+(Ollama serves a handful of requests in parallel at best), up to
+max_queue more wait for a slot, and each client (X-Client-Id header, else
+the peer address) may have per_client_limit requests in the system.
+Anything beyond that is rejected immediately with 429 and Retry-After
+rather than queued without bound. A client that disconnects cancels its
+run (CancelToken), which aborts the Ollama call and SQLite statement:
+POST /query polls for the disconnect while the run is in progress, the
+streaming endpoints notice it when their response generator is closed.
+
+Identical concurrent POST /query requests (same normalized question) share
+one agent run through app/singleflight.py; the response says so with
+"coalesced": true.
+"""
+
+import asyncio
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import anyio.to_thread
+from langchain_core.language_models import BaseChatModel
+from sqlalchemy import Engine
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.config import (
+    DEFAULT_DB_PATH,
+    DEFAULT_MODEL,
+    REQUEST_TIMEOUT_SECONDS,
+    RESULT_MAX_ROWS,
+    API_MAX_CONCURRENCY,
+    API_MAX_QUEUE,
+    API_PER_CLIENT_LIMIT,
+    API_PAGE_SIZE,
+    API_MAX_PAGE_SIZE,
+    API_QUERY_CACHE_SIZE,
+    API_EXPORT_QUEUE_CHUNKS,
+    API_DISCONNECT_POLL_SECONDS,
+    API_RETRY_AFTER_SECONDS,
+)
+from app.database import create_db_engine
+from app.agent import build_agent, new_state, run_query, stream_agent
+from app.resultset import ResultSet
+from app.export import EXPORT_FORMATS, iter_export
+from app.cancellation import CancelToken, QueryCancelled, deadline_in, remaining_seconds
+from app.llm import create_llm
+from app.metrics import METRICS
+from app.health import HEALTH
+from app.replicas import REPLICAS
+from app.scheduler import SCHEDULER
+from app.singleflight import SingleFlight, flight_key
+from app.value_index import default_index_path
+from app.few_shot import default_store_path
+from app.query_log import default_log_path
+
+# State fields that are not sent to clients
+_PRIVATE_FIELDS = {"cancel_token", "deadline", "tier_started_at", "schema_text"}
+
+
+class Overloaded(Exception):
+    """Admission refused; carries the reason reported in the 429 body."""
+
+
+# ──────────────────────────────────────────────────────────────
+# Admission control
+# ──────────────────────────────────────────────────────────────
+class AdmissionController:
+    """Bounded admission: running + queued requests, and a per-client cap."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, per_client_limit: int):
+        self.max_concurrency = max_concurrency
+        self.capacity = max_concurrency + max_queue
+        self.per_client_limit = per_client_limit
+        self._lock = threading.Lock()
+        self._in_system = 0
+        self._per_client: dict[str, int] = {}
+
+    def acquire(self, client_id: str) -> None:
+        """Admit a request or raise Overloaded."""
+        with self._lock:
+            if self._per_client.get(client_id, 0) >= self.per_client_limit:
+                METRICS.incr("api.rejected.client_limit")
+                raise Overloaded(f"Client {client_id} has {self.per_client_limit} requests in flight")
+            if self._in_system >= self.capacity:
+                METRICS.incr("api.rejected.queue_full")
+                raise Overloaded("Server queue is full")
+            self._in_system += 1
+            self._per_client[client_id] = self._per_client.get(client_id, 0) + 1
+            self._report()
+
+    def release(self, client_id: str) -> None:
+        with self._lock:
+            self._in_system -= 1
+            remaining = self._per_client.get(client_id, 1) - 1
+            if remaining:
+                self._per_client[client_id] = remaining
+            else:
+                self._per_client.pop(client_id, None)
+            self._report()
+
+    def _report(self) -> None:
+        METRICS.set_gauge("api.in_system", self._in_system)
+        METRICS.set_gauge("api.queued", max(0, self._in_system - self.max_concurrency))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "in_system": self._in_system,
+                "running": min(self._in_system, self.max_concurrency),
+                "queued": max(0, self._in_system - self.max_concurrency),
+                "capacity": self.capacity,
+                "clients": len(self._per_client),
+            }
+
+
+# ──────────────────────────────────────────────────────────────
+# Helpers
+# ──────────────────────────────────────────────────────────────
+def client_id(request: Request) -> str:
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
+def public_fields(update: dict) -> dict:
+    """State update without internal fields, JSON-safe."""
+    return json.loads(json.dumps(
+        {k: v for k, v in update.items() if k not in _PRIVATE_FIELDS}, default=_json_default))
+
+
+def _json_default(value):
+    if isinstance(value, ResultSet):
+        return value.rows()
+    return str(value)
+
+
+def too_many_requests(reason: str) -> JSONResponse:
+    return JSONResponse({"error": reason}, status_code=429,
+                        headers={"Retry-After": str(API_RETRY_AFTER_SECONDS)})
+
+
+async def cancel_on_disconnect(request: Request, cancel_token: CancelToken,
+                               interval: float = API_DISCONNECT_POLL_SECONDS) -> None:
+    """Cancel the token once the client has gone (run as a task alongside the request)."""
+    while not cancel_token.cancelled:
+        if await request.is_disconnected():
+            print("  Client disconnected, cancelling its run")
+            cancel_token.cancel()
+            return
+        await asyncio.sleep(interval)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls on_close once it is done, even if its
+    body was never iterated (client gone before the response started).
+
+    A generator's finally only runs once the generator has started, so
+    cleanup that must always happen (admission release, cancelling the
+    producer) is also hooked here; on_close must be safe to call twice.
+    """
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+def first_page(results: ResultSet, page_size: int) -> Optional[tuple[list, bool]]:
+    """Page 1 and has_more from the rows execute_query kept, if they settle it.
+
+    execute_query keeps at most RESULT_MAX_ROWS rows; fewer than that is
+    the whole result. None means the page needs a query (page_size at or
+    above RESULT_MAX_ROWS with the kept rows all used).
+    """
+    if len(results) > page_size:
+        return results[:page_size].rows(), True
+    if len(results) < RESULT_MAX_ROWS:
+        return results.rows(), False
+    return None
+
+
+def _int_param(value, default: int, minimum: int, maximum: int) -> int:
+    try:
+        return min(max(int(value), minimum), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+# ──────────────────────────────────────────────────────────────
+# App factory
+# ──────────────────────────────────────────────────────────────
+def create_app(engine: Optional[Engine] = None, model_name: str = DEFAULT_MODEL,
+               llm_factory: Callable[..., BaseChatModel] = create_llm, agent=None,
+               max_concurrency: int = API_MAX_CONCURRENCY, max_queue: int = API_MAX_QUEUE,
+               per_client_limit: int = API_PER_CLIENT_LIMIT,
+               request_timeout: float = REQUEST_TIMEOUT_SECONDS) -> Starlette:
+    """Create the ASGI app with one shared engine and compiled agent.
+
+    Without an engine, DEFAULT_DB_PATH is used with the value index and
+    few-shot store next to it (same setup as the Streamlit app). Tests
+    pass an engine and a stub llm_factory.
+    """
+    if engine is None:
+        engine = create_db_engine(str(DEFAULT_DB_PATH))
+        agent = agent or build_agent(
+            engine,
+            model_name,
+            value_index_path=default_index_path(DEFAULT_DB_PATH),
+            example_store_path=default_store_path(DEFAULT_DB_PATH),
+            cache_prompt_prefix=True,
+            query_log_path=default_log_path(DEFAULT_DB_PATH),
+            llm_factory=llm_factory,
+            warm_up=True,
+        )
+        REPLICAS.start()
+        HEALTH.start()
+    agent = agent or build_agent(engine, model_name, llm_factory=llm_factory)
+
+    admission = AdmissionController(max_concurrency, max_queue, per_client_limit)
+    # Held by the thread that runs the agent (not by callers waiting on a
+    # coalesced run), so waiting requests do not occupy a slot
+    slots = threading.BoundedSemaphore(max_concurrency)
+    flights = SingleFlight()
+    database = engine.url.render_as_string(hide_password=True)
+    queries: OrderedDict[str, str] = OrderedDict()  # query_id -> executed SQL (bounded LRU)
+
+    def remember(sql: str) -> str:
+        query_id = uuid.uuid4().hex
+        queries[query_id] = sql
+        while len(queries) > API_QUERY_CACHE_SIZE:
+            queries.popitem(last=False)
+        return query_id
+
+    def fetch_page(sql: str, page: int, page_size: int, deadline: Optional[float]) -> tuple[list, bool]:
+        """Rows of one page (1-based) and whether more rows follow."""
+        sql = sql.strip().rstrip(";")
+        paged = f"SELECT * FROM ({sql}) LIMIT {page_size + 1} OFFSET {(page - 1) * page_size}"
+        rows = run_query(engine, paged, deadline=deadline, max_rows=page_size + 1)
+        return rows[:page_size], len(rows) > page_size
+
+    async def parse_body(request: Request) -> tuple[Optional[dict], Optional[JSONResponse]]:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None, JSONResponse({"error": "Body must be JSON"}, status_code=400)
+        if not isinstance(body, dict) or not str(body.get("question", "")).strip():
+            return None, JSONResponse({"error": "Missing 'question'"}, status_code=400)
+        timeout = body.get("timeout")
+        if timeout is not None:
+            try:
+                timeout = float(timeout)
+            except (TypeError, ValueError):
+                timeout = None
+            if timeout is None or not 0 < timeout < float("inf"):
+                return None, JSONResponse({"error": "'timeout' must be a positive number of seconds"},
+                                          status_code=400)
+            body["timeout"] = timeout
+        return body, None
+
+    def request_timeout_for(body: dict) -> float:
+        """Requested timeout (validated by parse_body), capped at the server's."""
+        return min(body.get("timeout") or request_timeout, request_timeout)
+
+    def release_once(client: str) -> Callable[[], None]:
+        """Admission release for one request that is a no-op when called again."""
+        released = threading.Event()
+
+        def release() -> None:
+            if not released.is_set():
+                released.set()
+                admission.release(client)
+
+        return release
+
+    # ── POST /query ──────────────────────────────────────────
+    async def query(request: Request) -> JSONResponse:
+        body, error = await parse_body(request)
+        if error:
+            return error
+        page_size = _int_param(body.get("page_size"), API_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+        question = str(body["question"]).strip()
+        cancel_token = CancelToken()
+        deadline = deadline_in(request_timeout_for(body))
+        client = client_id(request)
+        try:
+            admission.acquire(client)
+        except Overloaded as e:
+            return too_many_requests(str(e))
+
+        def run(shared_token: CancelToken) -> dict:
+            with slots:
+                state = new_state(question, model_name, timeout=remaining_seconds(deadline),
+                                  cancel_token=shared_token)
+                return agent.invoke(state)
+
+        watcher = asyncio.create_task(cancel_on_disconnect(request, cancel_token))
+        try:
+            METRICS.incr("api.requests")
+            final, shared = await anyio.to_thread.run_sync(
+                flights.do, flight_key(question, model_name, database), run, cancel_token, deadline)
+            response = {k: final.get(k) for k in (
+                "generated_sql", "error", "validation_error", "retry_count",
+                "stop_reason", "answered_by")}
+            response.update(question=question, coalesced=shared, results=None)
+            if final.get("results") is not None and not final.get("error"):
+                response["columns"] = final["results"].columns
+                # The agent run already fetched the leading rows
+                page = first_page(final["results"], page_size)
+                if page is None:
+                    page = await anyio.to_thread.run_sync(
+                        fetch_page, final["generated_sql"], 1, page_size, deadline)
+                rows, has_more = page
+                query_id = remember(final["generated_sql"])
+                response.update(query_id=query_id, page=1, page_size=page_size,
+                                results=rows, has_more=has_more)
+            return JSONResponse(public_fields(response))
+        except QueryCancelled as e:
+            return JSONResponse({"error": str(e), "stop_reason": e.stop_reason}, status_code=504)
+        finally:
+            watcher.cancel()
+            cancel_token.cancel()
+            admission.release(client)
+
+    # ── GET /query/{query_id}/rows ───────────────────────────
+    async def query_rows(request: Request) -> JSONResponse:
+        sql = queries.get(request.path_params["query_id"])
+        if sql is None:
+            return JSONResponse({"error": "Unknown or expired query_id"}, status_code=404)
+        page = _int_param(request.query_params.get("page"), 1, 1, 1_000_000)
+        page_size = _int_param(request.query_params.get("page_size"), API_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+        client = client_id(request)
+        try:
+            admission.acquire(client)
+        except Overloaded as e:
+            return too_many_requests(str(e))
+        try:
+            rows, has_more = await anyio.to_thread.run_sync(
+                fetch_page, sql, page, page_size, deadline_in(request_timeout))
+        except QueryCancelled as e:
+            return JSONResponse({"error": str(e), "stop_reason": e.stop_reason}, status_code=504)
+        finally:
+            admission.release(client)
+        return JSONResponse(public_fields({"query_id": request.path_params["query_id"], "page": page,
+                                           "page_size": page_size, "results": rows,
+                                           "has_more": has_more}))
+
+    # ── GET /query/{query_id}/export ─────────────────────────
+    async def query_export(request: Request):
+        sql = queries.get(request.path_params["query_id"])
+        if sql is None:
+            return JSONResponse({"error": "Unknown or expired query_id"}, status_code=404)
+        fmt = request.query_params.get("format", "csv")
+        if fmt not in EXPORT_FORMATS:
+            return JSONResponse({"error": f"format must be one of {sorted(EXPORT_FORMATS)}"},
+                                status_code=400)
+        client = client_id(request)
+        try:
+            admission.acquire(client)
+        except Overloaded as e:
+            return too_many_requests(str(e))
+
+        release = release_once(client)
+
+        # Encoded in a worker thread (one SQLite connection, one thread);
+        # the bounded queue stops it from running ahead of a slow client
+        cancel_token = CancelToken()
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=API_EXPORT_QUEUE_CHUNKS)
+
+        def put(item) -> None:
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+        def produce() -> None:
+            try:
+                for chunk in iter_export(engine, sql, fmt, deadline_in(request_timeout), cancel_token):
+                    put(chunk)
+            except Exception as e:
+                if not cancel_token.cancelled:
+                    put(e)
+            finally:
+                if not cancel_token.cancelled:
+                    put(None)
+
+        def close() -> None:
+            cancel_token.cancel()
+            # Unblock a producer waiting on the full queue
+            while not chunks.empty():
+                chunks.get_nowait()
+            release()
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            first = await chunks.get()
+        except BaseException:
+            close()
+            raise
+        if isinstance(first, Exception):
+            close()
+            status = 504 if isinstance(first, QueryCancelled) else 400
+            return JSONResponse({"error": str(first)}, status_code=status)
+
+        async def body():
+            try:
+                item = first
+                while item is not None:
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+                    item = await chunks.get()
+            finally:
+                close()
+
+        extension = "csv" if fmt == "csv" else "parquet"
+        return ClosingStreamingResponse(body(), close, media_type=EXPORT_FORMATS[fmt], headers={
+            "Content-Disposition": f'attachment; filename="query.{extension}"'})
+
+    # ── POST /query/stream ───────────────────────────────────
+    async def query_stream(request: Request):
+        body, error = await parse_body(request)
+        if error:
+            return error
+        cancel_token = CancelToken()
+        state = new_state(str(body["question"]).strip(), model_name,
+                          timeout=request_timeout_for(body), cancel_token=cancel_token)
+        client = client_id(request)
+        try:
+            admission.acquire(client)
+        except Overloaded as e:
+            return too_many_requests(str(e))
+        release = release_once(client)
+
+        def close() -> None:
+            # Client disconnect or normal end: abort anything still running
+            cancel_token.cancel()
+            release()
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+
+        def run_graph() -> None:
+            try:
+                with slots:
+                    for event in stream_agent(agent, state):
+                        if event["event"] == "node":
+                            line = {"node": event["node"], "update": public_fields(event["update"])}
+                        elif event["event"] == "token":
+                            line = event
+                        else:
+                            continue
+                        loop.call_soon_threadsafe(events.put_nowait, line)
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait, {"event": "error", "error": str(e)})
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, None)
+
+        async def lines():
+            try:
+                METRICS.incr("api.requests")
+                threading.Thread(target=run_graph, daemon=True).start()
+                while (line := await events.get()) is not None:
+                    yield json.dumps(line) + "\n"
+                yield json.dumps({"event": "done"}) + "\n"
+            finally:
+                close()
+
+        return ClosingStreamingResponse(lines(), close, media_type="application/x-ndjson")
+
+    # ── GET /health, /metrics ────────────────────────────────
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "model": model_name, "coalescing": flights.in_flight(),
+                             "ollama": HEALTH.status(), "llm": SCHEDULER.snapshot(),
+                             "replicas": REPLICAS.snapshot(),
+                             **admission.snapshot()})
+
+    async def metrics(request: Request) -> JSONResponse:
+        return JSONResponse(METRICS.snapshot())
+
+    app = Starlette(routes=[
+        Route("/query", query, methods=["POST"]),
+        Route("/query/stream", query_stream, methods=["POST"]),
+        Route("/query/{query_id}/rows", query_rows, methods=["GET"]),
+        Route("/query/{query_id}/export", query_export, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ])
+    app.state.agent = agent
+    app.state.engine = engine
+    app.state.admission = admission
+    app.state.flights = flights
+    return app
@@ -0,0 +1,147 @@
+"""Multi-question batched prompting for bulk workloads.
+
+Bulk jobs (report generation, evaluation runs) otherwise send one prompt
+per question and re-pay prefill of the same schema each time. Here N
+questions are packed into one prompt that shares the cached schema prefix
+(CACHED_PREFIX_GENERIC) and asks for numbered SQL answers. Each parsed
+answer is post-processed, checked with validate_query and executed on its
+own; only questions whose answer is missing, invalid or fails to execute
+go through the regular single-question agent.
+"""
+
+import re
+import time
+from typing import Callable, Optional
+
+from langchain_core.language_models import BaseChatModel
+from sqlalchemy import Engine
+
+from app.config import BATCH_SIZE, BATCH_SUFFIX_GENERIC, CACHED_PREFIX_GENERIC
+from app.database import get_schema_info, build_schema_text, build_column_map, postprocess_sql
+from app.agent import build_agent, new_state, validate_query, make_execute_query
+from app.llm import create_llm, extract_sql, build_messages
+from app.scheduler import PRIORITY_BATCH, SCHEDULER
+
+# "1.", "2)", "3:", "Q4 -", "**5.**", "Answer 6:" at the start of a line
+_ANSWER_MARKER = re.compile(
+    r"^[ \t]*(?:\*\*)?(?:answer|question|q|a)?[ \t]*#?(\d{1,3})[ \t]*(?:\*\*)?[ \t]*[.):\-][ \t]*(?:\*\*)?",
+    re.IGNORECASE | re.MULTILINE,
+)
+_QUERY_START = re.compile(r"\b(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def format_batch_questions(questions: list[str]) -> str:
+    """Number questions for the batch prompt (1-based)."""
+    return "\n".join(f"{i}. {q}" for i, q in enumerate(questions, start=1))
+
+
+def parse_batch_response(content: str, n_questions: int) -> dict[int, str]:
+    """Parse numbered SQL answers from a batch response.
+
+    Tolerates markdown fences, bold numbering, answers spanning several
+    lines and models that echo the question before the query. Numbers
+    outside 1..n_questions and repeated numbers (first one wins) are ignored.
+
+    Returns:
+        dict mapping 1-based question number -> SQL (without semicolon)
+    """
+    content = content.replace("```sql", "").replace("```", "")
+    markers = list(_ANSWER_MARKER.finditer(content))
+
+    answers = {}
+    for i, marker in enumerate(markers):
+        number = int(marker.group(1))
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(content)
+        body = content[marker.end():end]
+        query_start = _QUERY_START.search(body)
+        if query_start is None:
+            continue
+        sql = extract_sql(body[query_start.start():])
+        if 1 <= number <= n_questions and number not in answers and sql:
+            answers[number] = sql
+    return answers
+
+
+def generate_sql_batch(questions: list[str], prompt_prefix: str, model_name: str,
+                       llm_factory: Callable[..., BaseChatModel] = create_llm) -> dict[int, str]:
+    """Generate SQL for several questions with a single LLM call."""
+    suffix = BATCH_SUFFIX_GENERIC.format(questions=format_batch_questions(questions))
+    llm = llm_factory(model_name)
+
+    t0 = time.time()
+    with SCHEDULER.slot(PRIORITY_BATCH):
+        response = llm.invoke(build_messages(prompt_prefix, suffix))
+    elapsed = time.time() - t0
+
+    answers = parse_batch_response(response.content, len(questions))
+    print(f"  Batch of {len(questions)} ({elapsed:.1f}s): parsed {len(answers)} answers")
+    return answers
+
+
+def build_batch_runner(engine: Engine, model_name: str, batch_size: int = BATCH_SIZE,
+                       llm_factory: Callable[..., BaseChatModel] = create_llm,
+                       agent=None):
+    """Create a run_batch(questions) function for bulk workloads.
+
+    agent is the compiled graph used for fallbacks; one is built with the
+    same model and llm_factory if not given. With batch_size 1, or for
+    sqlcoder (whose prompt format cannot hold several questions), every
+    question goes through the agent.
+    """
+    schema_info = get_schema_info(engine)
+    column_map = build_column_map(schema_info)
+    prompt_prefix = CACHED_PREFIX_GENERIC.format(schema_text=build_schema_text(schema_info))
+    execute_query = make_execute_query(engine)
+    fallback_agent = agent or build_agent(engine, model_name, llm_factory=llm_factory)
+    use_batches = batch_size > 1 and "sqlcoder" not in model_name
+
+    def answer_from_batch(question: str, raw_sql: Optional[str]) -> Optional[dict]:
+        """Validate and execute a batch answer; None means fall back."""
+        if not raw_sql:
+            return None
+        sql = postprocess_sql(raw_sql, column_map)
+        if not validate_query({"generated_sql": sql})["is_valid"]:
+            return None
+        executed = execute_query({"question": question, "generated_sql": sql})
+        if executed["error"]:
+            return None
+        return {
+            "question": question,
+            "raw_sql": raw_sql,
+            "sql": sql,
+            "results": executed["results"],
+            "error": "",
+            "retry_count": 0,
+            "source": "batch",
+        }
+
+    def answer_single(question: str) -> dict:
+        final = fallback_agent.invoke(new_state(question, model_name, priority=PRIORITY_BATCH))
+        return {
+            "question": question,
+            "raw_sql": final.get("raw_sql", ""),
+            "sql": final.get("generated_sql", ""),
+            "results": final.get("results"),
+            "error": final.get("error") or final.get("validation_error", ""),
+            "retry_count": final.get("retry_count", 0),
+            "source": "single",
+        }
+
+    def run_batch(questions: list[str]) -> list[dict]:
+        """Answer questions in batches; results are returned in input order."""
+        outcomes = []
+        step = batch_size if use_batches else 1
+        for start in range(0, len(questions), step):
+            chunk = questions[start:start + step]
+            answers = {}
+            if use_batches:
+                try:
+                    answers = generate_sql_batch(chunk, prompt_prefix, model_name, llm_factory)
+                except Exception as e:
+                    print(f"  Batch failed, falling back to single questions: {e}")
+            for number, question in enumerate(chunk, start=1):
+                outcome = answer_from_batch(question, answers.get(number))
+                outcomes.append(outcome or answer_single(question))
+        return outcomes
+
+    return run_batch
@@ -0,0 +1,150 @@
+"""Per-request deadlines and cancellation for agent runs.
+
+A request carries two things in AgentState:
+
+- deadline: absolute time.time() after which no new work is started and
+  in-flight work is aborted (None = no deadline)
+- cancel_token: a CancelToken the caller (Streamlit rerun, API client
+  disconnect) can trigger at any time
+
+Nodes call check_interrupted() before expensive work. Long-running calls
+register a callback on the token (close the Ollama HTTP client, interrupt
+the SQLite statement) so cancel() aborts them immediately rather than at
+the next check.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+# stop_reason values for interrupted runs
+STOP_CANCELLED = "cancelled"
+STOP_DEADLINE = "deadline_exceeded"
+
+
+class QueryCancelled(Exception):
+    """The request was cancelled by its caller."""
+
+    stop_reason = STOP_CANCELLED
+
+
+class DeadlineExceeded(QueryCancelled):
+    """The request ran past its deadline."""
+
+    stop_reason = STOP_DEADLINE
+
+
+class CancelToken:
+    """Thread-safe cancellation flag with abort callbacks."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Set the flag and run registered abort callbacks (once)."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"  Cancel callback failed: {e}")
+
+    def register(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run callback on cancel (immediately if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+
+                def unregister() -> None:
+                    with self._lock:
+                        self._callbacks.pop(callback_id, None)
+
+                return unregister
+        callback()
+        return lambda: None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or timeout; returns True if cancelled."""
+        return self._event.wait(timeout)
+
+
+def deadline_in(seconds: Optional[float]) -> Optional[float]:
+    """Absolute deadline for a timeout in seconds (None = no deadline)."""
+    return time.time() + seconds if seconds is not None else None
+
+
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until deadline (never negative), or None without a deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.time())
+
+
+def interruption(deadline: Optional[float], cancel_token: Optional[CancelToken]) -> str:
+    """Return STOP_CANCELLED / STOP_DEADLINE if the request must stop, else ""."""
+    if cancel_token is not None and cancel_token.cancelled:
+        return STOP_CANCELLED
+    if deadline is not None and time.time() >= deadline:
+        return STOP_DEADLINE
+    return ""
+
+
+def check_interrupted(deadline: Optional[float], cancel_token: Optional[CancelToken]) -> None:
+    """Raise QueryCancelled or DeadlineExceeded if the request must stop."""
+    reason = interruption(deadline, cancel_token)
+    if reason == STOP_CANCELLED:
+        raise QueryCancelled("Query cancelled")
+    if reason == STOP_DEADLINE:
+        raise DeadlineExceeded("Deadline exceeded")
+
+
+def run_cancellable(fn: Callable[[], object], cancel_token: CancelToken,
+                    on_tick: Optional[Callable[[float], None]] = None,
+                    tick_seconds: float = 0.25):
+    """Run fn() in a worker thread and wait for it, cancelling the token on early exit.
+
+    on_tick(elapsed) is called from the waiting thread every tick_seconds.
+    If it raises (Streamlit raises from UI calls when the script is
+    rerun or stopped) or the waiting thread is otherwise unwound, the
+    token is cancelled so the worker's LLM call and SQLite statement are
+    aborted instead of running on in the background.
+    """
+    outcome: dict = {}
+    done = threading.Event()
+
+    def worker() -> None:
+        try:
+            outcome["result"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    thread = threading.Thread(target=worker, daemon=True)
+    start = time.time()
+    thread.start()
+    try:
+        while not done.wait(tick_seconds):
+            if on_tick is not None:
+                on_tick(time.time() - start)
+    finally:
+        if not done.is_set():
+            cancel_token.cancel()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
@@ -14,20 +14,158 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_DB_PATH = PROJECT_ROOT / "data" / "chinook.db"
 
+# Engine mode (app/database.py): "file" opens the database file per
+# connection; "snapshot" serves queries from an in-memory copy loaded with
+# the backup API at startup and reloaded when the file changes (checked
+# at most every SNAPSHOT_CHECK_SECONDS, on connection checkout)
+DB_ENGINE_MODE = os.environ.get("DB_ENGINE_MODE", "file")
+SNAPSHOT_POOL_SIZE = 8
+SNAPSHOT_CHECK_SECONDS = 1.0
+
 # ──────────────────────────────────────────────────────────────
 # Ollama connection
 # ──────────────────────────────────────────────────────────────
 # Use environment variable for Docker, fallback to WSL gateway for local dev
 OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://172.27.64.1:11434")
 
+# Comma-separated Ollama replicas to balance LLM calls across
+# (app/replicas.py); defaults to the single OLLAMA_BASE_URL
+OLLAMA_BASE_URLS = [url.strip() for url in os.environ.get("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",")
+                    if url.strip()]
+HEALTH_CHECK_INTERVAL_SECONDS = 10
+HEALTH_CHECK_TIMEOUT_SECONDS = 2
+HEALTH_STALE_INTERVALS = 3    # Cached health status older than this many intervals is stale
+REPLICA_EJECT_FAILURES = 3    # Consecutive failures before a replica is ejected
+REPLICA_EJECT_SECONDS = 30
+
+# Hedged generate_sql calls (app/hedging.py, build_agent(hedge=True)): a
+# duplicate goes to another replica, or HEDGE_BACKUP_MODEL if set, when a
+# call runs past the HEDGE_PERCENTILE of recent LLM latency
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 1.0
+HEDGE_BACKUP_MODEL = os.environ.get("HEDGE_BACKUP_MODEL", "")
+
+# Requests each Ollama server processes in parallel (its OLLAMA_NUM_PARALLEL);
+# app/scheduler.py keeps in-flight LLM calls at this limit per replica and
+# queues the rest
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "2"))
+
 # ──────────────────────────────────────────────────────────────
 # Model defaults (DEC-005: llama3.1:8b recommended)
 # ──────────────────────────────────────────────────────────────
 DEFAULT_MODEL = "llama3.1:8b"
 TEMPERATURE = 0
 NUM_CTX = 8192
+# How long Ollama keeps a model loaded after a request (duration string,
+# "-1" = forever); app/warmup.py re-warms it if it is evicted anyway
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
 MAX_RETRIES = 3
 
+# Model cascade, cheapest first. Each question starts on the first model
+# and escalates on a validation, execution or confidence failure; only
+# the last model gets the MAX_RETRIES repair loop.
+CASCADE_MODELS = ["llama3.2:3b", "llama3.1:8b"]
+
+# Per-request deadline (app/cancellation.py). A repair round is not
+# started when less than the typical LLM call time is left (median of
+# observed calls, at least RETRY_MIN_SECONDS). SQLite statements check
+# the deadline every SQLITE_PROGRESS_STEPS VM instructions.
+REQUEST_TIMEOUT_SECONDS = 120
+RETRY_MIN_SECONDS = 5.0
+SQLITE_PROGRESS_STEPS = 1000
+
+# Repair rounds allowed per error category (app/retry_policy.py), capped
+# by MAX_RETRIES overall. A blocked write is never retried; a hallucinated
+# table gets one repair with the schema before giving up.
+RETRY_BUDGETS = {
+    "schema_linking": 2,
+    "syntax": 2,
+    "dialect": 2,
+    "hallucination": 1,
+    "empty": 1,
+    "blocked": 0,
+    "unknown": MAX_RETRIES,
+}
+
+# Rows execute_query fetches (the page the UI shows); limit_query pushes
+# this bound into the SQL so SQLite can stop early (app/sql_rewrite.py)
+RESULT_MAX_ROWS = 20
+
+# Optimizer pass over validated SQL (app/sql_optimizer.py,
+# build_agent(optimize=True)): a rewrite is adopted only if it returns the
+# same rows as the original on a sample of OPTIMIZER_SAMPLE_ROWS rows per
+# table and runs at least OPTIMIZER_MIN_SPEEDUP times faster there
+OPTIMIZER_SAMPLE_ROWS = 2000
+OPTIMIZER_MIN_SPEEDUP = 1.1
+OPTIMIZER_TIMING_REPEATS = 3
+OPTIMIZER_VERIFY_SECONDS = 2.0  # Per statement on the sample
+OPTIMIZER_MAX_SECONDS = 3.0     # Whole verification pass, all candidates
+OPTIMIZER_MIN_REMAINING_SECONDS = 10.0  # Less request budget left: skip the pass
+
+# Query results are fetched into Arrow record batches of this many rows
+# (app/frames.py)
+ARROW_BATCH_ROWS = 10_000
+
+# ──────────────────────────────────────────────────────────────
+# Value index (literal grounding of question terms)
+# ──────────────────────────────────────────────────────────────
+# Sidecar FTS5 database stored next to the source database,
+# e.g. data/chinook.db -> data/chinook.values.db
+VALUE_INDEX_SUFFIX = ".values.db"
+VALUE_INDEX_MAX_NGRAM = 4           # Longest question n-gram looked up
+VALUE_INDEX_MAX_HITS = 8            # Max (table, column, value) hits injected into the prompt
+VALUE_INDEX_MAX_VALUE_LENGTH = 100  # Longer values (addresses, notes) are not indexed
+VALUE_INDEX_MAX_DISTINCT = 50_000   # Columns with more distinct values are skipped
+
+# ──────────────────────────────────────────────────────────────
+# Dynamic few-shot example store
+# ──────────────────────────────────────────────────────────────
+# Sidecar FTS5 database of verified question/SQL pairs,
+# e.g. data/chinook.db -> data/chinook.examples.db
+FEW_SHOT_STORE_SUFFIX = ".examples.db"
+FEW_SHOT_SEED_PATH = PROJECT_ROOT / "data" / "few_shot_seed.json"
+FEW_SHOT_TOP_K = 3
+FEW_SHOT_TOKEN_BUDGET = 300  # Approximate tokens (chars / 4) spent on examples
+
+# ──────────────────────────────────────────────────────────────
+# Query log and index advisor
+# ──────────────────────────────────────────────────────────────
+# Sidecar log of executed SQL (app/query_log.py),
+# e.g. data/chinook.db -> data/chinook.queries.db; scripts/advise_indexes.py
+# mines it for indexes (app/index_advisor.py) and can apply them to a copy,
+# e.g. data/chinook.db -> data/chinook.indexed.db
+QUERY_LOG_SUFFIX = ".queries.db"
+QUERY_LOG_FLUSH_SECONDS = 2.0     # Executions batched per background commit
+INDEXED_COPY_SUFFIX = ".indexed.db"
+INDEX_ADVISOR_MAX_QUERIES = 500   # Most frequent logged statements replayed
+INDEX_ADVISOR_MAX_COLUMNS = 3     # Widest composite index proposed
+
+# ──────────────────────────────────────────────────────────────
+# Difficulty router (prompt strategy per question, app/router.py)
+# ──────────────────────────────────────────────────────────────
+# Nearest-centroid model trained by scripts/train_router.py from EXP-002;
+# none is shipped until ablation results label questions with at least
+# two prompt types (routing stays off unless build_agent gets a path)
+ROUTER_MODEL_PATH = PROJECT_ROOT / "data" / "router_model.json"
+
+# ──────────────────────────────────────────────────────────────
+# HTTP API (app/api.py)
+# ──────────────────────────────────────────────────────────────
+# At most API_MAX_CONCURRENCY agent runs per worker (keep at or below
+# OLLAMA_NUM_PARALLEL), up to API_MAX_QUEUE more waiting; beyond that, or
+# past API_PER_CLIENT_LIMIT in-flight requests per client, the API answers
+# 429 with Retry-After: API_RETRY_AFTER_SECONDS.
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "2"))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "16"))
+API_PER_CLIENT_LIMIT = int(os.getenv("API_PER_CLIENT_LIMIT", "4"))
+API_RETRY_AFTER_SECONDS = 5
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 1000
+API_QUERY_CACHE_SIZE = 256  # query_id -> SQL entries kept for pagination
+API_EXPORT_QUEUE_CHUNKS = 4  # Encoded export batches buffered ahead of the client
+API_DISCONNECT_POLL_SECONDS = 0.5  # How often POST /query checks for a gone client
+
 # ──────────────────────────────────────────────────────────────
 # Security: blocked SQL keywords
 # ──────────────────────────────────────────────────────────────
@@ -53,6 +191,7 @@ SQL_KEYWORDS = {
 PROMPT_ZERO_SHOT = "zero_shot"
 PROMPT_FEW_SHOT = "few_shot"
 PROMPT_COT = "cot"
+PROMPT_DYNAMIC_FEW_SHOT = "dynamic_few_shot"
 
 # Schema context types for ablation study (EXP-002)
 SCHEMA_FULL = "full"          # All tables in database
@@ -93,6 +232,14 @@ Given the database schema, here is the SQL query that answers `{question}`:
 # ──────────────────────────────────────────────────────────────
 
 # Few-shot prompt with 2 examples from Chinook database
+FEW_SHOT_EXAMPLES = """Example 1:
+Question: How many employees are there?
+SQL: SELECT COUNT(*) FROM Employee;
+
+Example 2:
+Question: What are the names of all albums by the artist 'AC/DC'?
+SQL: SELECT Album.Title FROM Album JOIN Artist ON Album.ArtistId = Artist.ArtistId WHERE Artist.Name = 'AC/DC';"""
+
 FEW_SHOT_PROMPT = """You are a SQL expert. Generate a SQLite-compatible SELECT query for the question below.
 
 Schema:
@@ -100,13 +247,27 @@ Schema:
 
 Here are some examples:
 
-Example 1:
-Question: How many employees are there?
-SQL: SELECT COUNT(*) FROM Employee;
+""" + FEW_SHOT_EXAMPLES + """
 
-Example 2:
-Question: What are the names of all albums by the artist 'AC/DC'?
-SQL: SELECT Album.Title FROM Album JOIN Artist ON Album.ArtistId = Artist.ArtistId WHERE Artist.Name = 'AC/DC';
+Rules:
+- Return ONLY the SQL query, no explanation
+- Use only SELECT statements
+- Use only tables and columns from the schema above
+- Use SQLite syntax
+
+Question: {question}
+
+SQL:"""
+
+# Few-shot prompt with examples retrieved per question (app/few_shot.py)
+DYNAMIC_FEW_SHOT_PROMPT = """You are a SQL expert. Generate a SQLite-compatible SELECT query for the question below.
+
+Schema:
+{schema_text}
+
+Here are some examples of similar questions:
+
+{examples}
 
 Rules:
 - Return ONLY the SQL query, no explanation
@@ -140,6 +301,79 @@ Reasoning:
 
 SQL:"""
 
+# ──────────────────────────────────────────────────────────────
+# Cache-friendly prompt layout (KV-cache prefix reuse)
+# ──────────────────────────────────────────────────────────────
+# The prefix (instructions + full schema) is byte-identical for every
+# request in a session and is sent as the system message. Ollama keeps
+# the KV cache of the previous prompt and only runs prefill for the part
+# after the longest common prefix, so only the short suffix is recomputed.
+# Anything that varies per question (selected tables, grounded values,
+# retrieved examples) must go in the suffix.
+CACHED_PREFIX_GENERIC = """You are a SQL expert. Generate a SQLite-compatible SELECT query for each question you are given.
+
+Rules:
+- Return ONLY the SQL query, no explanation
+- Use only SELECT statements
+- Use only tables and columns from the schema below
+- Use SQLite syntax
+
+Schema:
+{schema_text}"""
+
+CACHED_SUFFIX_GENERIC = """{hints}Question: {question}
+
+SQL:"""
+
+# Chain-of-thought variant of the suffix (router PROMPT_COT); the prefix
+# stays the same, so CoT questions still hit the prefix cache
+CACHED_SUFFIX_COT = """{hints}Question: {question}
+
+Before writing the query, reason briefly:
+1. Tables needed:
+2. Columns to select:
+3. Joins/filters/aggregations:
+Then write the SQL query after "SQL:".
+
+Reasoning:"""
+
+# ──────────────────────────────────────────────────────────────
+# Structured output (Ollama `format` JSON schema)
+# ──────────────────────────────────────────────────────────────
+# Ollama constrains decoding to this schema, so the response always
+# parses. "tables" comes first so the model names the tables it will use
+# before writing the query.
+SQL_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tables": {"type": "array", "items": {"type": "string"}},
+        "sql": {"type": "string"},
+    },
+    "required": ["tables", "sql"],
+}
+
+STRUCTURED_OUTPUT_INSTRUCTION = (
+    '\n\nRespond with a JSON object: {"tables": [tables used], "sql": "the SQL query"}.'
+)
+
+# ──────────────────────────────────────────────────────────────
+# Batched prompting (bulk workloads, app/batch.py)
+# ──────────────────────────────────────────────────────────────
+# N questions share one prompt: same cached prefix as above, numbered
+# questions in the suffix, numbered SQL answers parsed back.
+BATCH_SIZE = 5
+
+BATCH_SUFFIX_GENERIC = """Answer each of the following questions with one SQLite SELECT query.
+
+{questions}
+
+Return one answer per question, numbered like the questions:
+1. <SQL query>
+2. <SQL query>
+No explanations.
+
+Answers:"""
+
 # ──────────────────────────────────────────────────────────────
 # Error repair prompts (used by handle_error node)
 # ──────────────────────────────────────────────────────────────
@@ -178,6 +412,26 @@ The following SQL query produced an error. Fix the query to answer:
 ```sql
 """
 
+# Compact repair prompt (app/repair.py): only the tables/columns the
+# failed SQL references, the error location and closest-matching names
+ERROR_REPAIR_COMPACT = """Fix this SQLite query.
+
+Question: {question}
+
+Failed SQL:
+{generated_sql}
+
+Error: {error}
+
+{location}Relevant schema:
+{schema_text}
+
+Return ONLY the corrected SQL query, no explanation.
+
+SQL:"""
+
+REPAIR_TOKEN_BUDGET = 250  # Approximate tokens (chars / 4) for the compact schema
+
 
 def get_prompt_template(model_name: str) -> str:
     """Return the appropriate prompt template for a model (DEC-003)."""
@@ -197,7 +451,8 @@ def get_ablation_prompt(prompt_type: str, model_name: str = "") -> str:
     """Return the prompt template for ablation experiments (EXP-002).
 
     Args:
-        prompt_type: One of PROMPT_ZERO_SHOT, PROMPT_FEW_SHOT, PROMPT_COT
+        prompt_type: One of PROMPT_ZERO_SHOT, PROMPT_FEW_SHOT, PROMPT_COT,
+            PROMPT_DYNAMIC_FEW_SHOT (expects an {examples} placeholder)
         model_name: Model name for model-specific prompts (e.g., sqlcoder)
 
     Returns:
@@ -210,6 +465,8 @@ def get_ablation_prompt(prompt_type: str, model_name: str = "") -> str:
     # Ablation prompt selection for generic models
     if prompt_type == PROMPT_FEW_SHOT:
         return FEW_SHOT_PROMPT
+    elif prompt_type == PROMPT_DYNAMIC_FEW_SHOT:
+        return DYNAMIC_FEW_SHOT_PROMPT
     elif prompt_type == PROMPT_COT:
         return COT_PROMPT
     else:  # PROMPT_ZERO_SHOT or default
@@ -3,20 +3,171 @@
 Handles engine creation, schema introspection, sample row fetching,
 column mapping, and SQL post-processing (DEC-004). Extracted from
 notebook cells 1-7 and run_experiment.py lines 39-116.
+
+Engine modes (DB_ENGINE_MODE): "file" reads the database file through
+the OS page cache on every query. "snapshot" copies the file into a named
+in-memory database with the backup API at startup and serves all
+connections of a pool from it (DatabaseSnapshot); read-mostly
+deployments skip the file layer entirely. The copy is reloaded when the
+file's mtime, size, inode or data_version changes.
 """
 
 import re
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Optional
 
-from sqlalchemy import create_engine, inspect, text, Engine
+from sqlalchemy import create_engine, event, inspect, text, Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import QueuePool
 
-from app.config import SQL_KEYWORDS
+from app.config import (
+    DB_ENGINE_MODE,
+    SNAPSHOT_CHECK_SECONDS,
+    SNAPSHOT_POOL_SIZE,
+    SQL_KEYWORDS,
+)
 
 
-def create_db_engine(db_path: str) -> Engine:
-    """Create a SQLAlchemy engine for a SQLite database."""
+def create_db_engine(db_path: str, mode: str = DB_ENGINE_MODE) -> Engine:
+    """Create a SQLAlchemy engine for a SQLite database ("file" or "snapshot" mode)."""
+    if mode == "snapshot":
+        return create_snapshot_engine(db_path)
+    if mode != "file":
+        raise ValueError(f"Unknown engine mode {mode!r}, expected 'file' or 'snapshot'")
     return create_engine(f"sqlite:///{db_path}")
 
 
+# ──────────────────────────────────────────────────────────────
+# In-memory snapshot engine
+# ──────────────────────────────────────────────────────────────
+class _SnapshotConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which snapshot generation it opened."""
+
+    generation = 0
+
+
+def _memory_uri(name: str) -> str:
+    """URI of a named in-memory database shared by all connections in the process."""
+    if sqlite3.sqlite_version_info >= (3, 36):
+        return f"file:/{name}?vfs=memdb"
+    return f"file:{name}?mode=memory&cache=shared"
+
+
+class DatabaseSnapshot:
+    """In-memory copy of a SQLite database file, reloaded when the file changes.
+
+    Each load backs the file up into a new named in-memory database (the
+    next generation); an anchor connection keeps it alive until the next
+    load. Pooled connections to an older generation are discarded on
+    their next checkout, and the old copy is freed when the last of them
+    closes. Snapshot connections are read-only (PRAGMA query_only).
+    """
+
+    def __init__(self, db_path: str | Path, check_interval: float = SNAPSHOT_CHECK_SECONDS):
+        self.db_path = Path(db_path)
+        self.check_interval = check_interval
+        self.generation = 0
+        self.load_seconds = 0.0
+        self._lock = threading.Lock()
+        self._source: Optional[sqlite3.Connection] = None
+        self._source_inode: Optional[int] = None
+        self._anchor: Optional[sqlite3.Connection] = None
+        self._uri = ""
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+        self.refresh(force=True)
+
+    def _read_fingerprint(self) -> tuple:
+        stat = self.db_path.stat()
+        if self._source is None or stat.st_ino != self._source_inode:
+            # First load, or the file was replaced: data_version is only
+            # meaningful on a connection to the current file
+            if self._source is not None:
+                self._source.close()
+            self._source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                           check_same_thread=False)
+            self._source_inode = stat.st_ino
+        data_version = self._source.execute("PRAGMA data_version").fetchone()[0]
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size, data_version
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload the snapshot if the file changed (always if force); returns True if reloaded."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            fingerprint = self._read_fingerprint()
+            if not force and fingerprint == self._fingerprint:
+                return False
+            t0 = time.perf_counter()
+            generation = self.generation + 1
+            uri = _memory_uri(f"{self.db_path.stem}-snapshot-{id(self):x}-{generation}")
+            anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._source.backup(anchor)
+            previous = self._anchor
+            self._anchor, self._uri, self._fingerprint = anchor, uri, fingerprint
+            self.generation = generation
+            self.load_seconds = time.perf_counter() - t0
+        if previous is not None:
+            previous.close()
+            print(f"  Snapshot of {self.db_path.name} reloaded ({self.load_seconds * 1000:.0f}ms)")
+        return True
+
+    def maybe_refresh(self) -> bool:
+        """refresh() at most once per check_interval; keeps the current copy if the check fails."""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return False
+        try:
+            return self.refresh()
+        except (OSError, sqlite3.Error) as e:
+            print(f"  Snapshot refresh failed, serving generation {self.generation}: {e}")
+            return False
+
+    def connect(self) -> sqlite3.Connection:
+        """New read-only connection to the current generation (the pool's creator)."""
+        with self._lock:
+            uri, generation = self._uri, self.generation
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, factory=_SnapshotConnection)
+        conn.generation = generation
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in (self._anchor, self._source):
+                if conn is not None:
+                    conn.close()
+            self._anchor = self._source = None
+
+
+_SNAPSHOTS: "weakref.WeakKeyDictionary[Engine, DatabaseSnapshot]" = weakref.WeakKeyDictionary()
+
+
+def create_snapshot_engine(db_path: str | Path, pool_size: int = SNAPSHOT_POOL_SIZE,
+                           check_interval: float = SNAPSHOT_CHECK_SECONDS) -> Engine:
+    """Engine serving queries from a DatabaseSnapshot of db_path through a connection pool."""
+    snapshot = DatabaseSnapshot(db_path, check_interval)
+    engine = create_engine(f"sqlite:///{db_path}", creator=snapshot.connect, poolclass=QueuePool,
+                           pool_size=pool_size, max_overflow=pool_size)
+
+    @event.listens_for(engine, "checkout")
+    def use_current_generation(dbapi_connection, connection_record, connection_proxy):
+        snapshot.maybe_refresh()
+        if dbapi_connection.generation != snapshot.generation:
+            # The pool invalidates this connection and opens a new one
+            raise DisconnectionError("snapshot reloaded")
+
+    _SNAPSHOTS[engine] = snapshot
+    return engine
+
+
+def get_snapshot(engine: Engine) -> Optional[DatabaseSnapshot]:
+    """The DatabaseSnapshot behind a snapshot-mode engine (None in file mode)."""
+    return _SNAPSHOTS.get(engine)
+
+
 def get_schema_info(engine: Engine) -> dict:
     """Introspect all tables, columns, primary keys, and foreign keys.
 
@@ -0,0 +1,137 @@
+"""Streaming CSV/Parquet export of full query results.
+
+execute_query keeps the first 20 rows. An export re-runs the validated
+SQL with a streaming cursor and encodes it in record batches of
+ARROW_BATCH_ROWS rows (app/frames.py), handing each encoded chunk on
+before the next batch is fetched, so the full result is never held in
+memory. The statement runs on guarded_connection, so the per-query
+deadline and the cancel token abort it like any agent query.
+
+iter_export yields the encoded bytes (the API streams them as the
+response body); export_query writes them to a file (the Streamlit
+download, whose download_button then reads the finished file into
+memory; only the API path keeps the whole export out of memory). Both report rows, bytes and elapsed time in the stats dict,
+and record them in METRICS as export.rows / export.seconds.
+"""
+
+import io
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from sqlalchemy import Engine, text
+
+from app.agent import guarded_connection
+from app.cancellation import CancelToken
+from app.config import ARROW_BATCH_ROWS
+from app.frames import fetch_batches
+from app.metrics import METRICS, Metrics
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object collecting what a writer emits until drained."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(schema: pa.Schema) -> pa.Schema:
+    """Writer schema: columns that were all NULL in the first batch become strings."""
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+                      for f in schema])
+
+
+def _conform(batch: pa.RecordBatch, schema: pa.Schema) -> pa.RecordBatch:
+    try:
+        return batch.cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"A column changes type within the result, export it as CSV ({e})") from e
+
+
+def iter_export(engine: Engine, sql: str, fmt: str = "csv",
+                deadline: Optional[float] = None, cancel_token: Optional[CancelToken] = None,
+                batch_size: int = ARROW_BATCH_ROWS, stats: Optional[dict] = None,
+                metrics: Metrics = METRICS) -> Iterator[bytes]:
+    """Run sql and yield the result encoded as fmt ("csv" or "parquet"), batch by batch.
+
+    stats, if given, is filled with format, rows, bytes and seconds once
+    the export finishes.
+
+    Raises:
+        ValueError for an unknown format
+        QueryCancelled / DeadlineExceeded if the statement was aborted
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}, expected one of {sorted(EXPORT_FORMATS)}")
+    stats = stats if stats is not None else {}
+    stats.update(format=fmt, rows=0, bytes=0, seconds=0.0)
+    t0 = time.time()
+    sink = _ChunkSink()
+    writer = None
+
+    with guarded_connection(engine, deadline, cancel_token) as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(
+            text(sql.strip().rstrip(";")))
+        names = list(result.keys())
+        for batch in fetch_batches(result, batch_size):
+            if fmt == "csv":
+                pa_csv.write_csv(batch, sink, pa_csv.WriteOptions(include_header=stats["rows"] == 0))
+            else:
+                if writer is None:
+                    writer = pq.ParquetWriter(sink, _parquet_schema(batch.schema))
+                writer.write_batch(_conform(batch, writer.schema))
+            stats["rows"] += batch.num_rows
+            chunk = sink.drain()
+            stats["bytes"] += len(chunk)
+            yield chunk
+
+    if stats["rows"] == 0:
+        # Header only: the columns with no rows
+        empty = pa.Table.from_arrays([pa.array([], type=pa.string()) for _ in names], names=names)
+        if fmt == "csv":
+            pa_csv.write_csv(empty, sink)
+        else:
+            writer = pq.ParquetWriter(sink, empty.schema)
+    if writer is not None:
+        writer.close()
+    tail = sink.drain()
+    stats["bytes"] += len(tail)
+    stats["seconds"] = time.time() - t0
+    metrics.incr("export.rows", stats["rows"])
+    metrics.observe("export.seconds", stats["seconds"])
+    if tail:
+        yield tail
+
+
+def export_query(engine: Engine, sql: str, path: str | Path, fmt: str = "csv",
+                 deadline: Optional[float] = None, cancel_token: Optional[CancelToken] = None,
+                 batch_size: int = ARROW_BATCH_ROWS) -> dict:
+    """Export the full result of sql to path; returns format, rows, bytes and seconds."""
+    stats: dict = {}
+    with open(path, "wb") as f:
+        for chunk in iter_export(engine, sql, fmt, deadline, cancel_token, batch_size, stats):
+            f.write(chunk)
+    return stats
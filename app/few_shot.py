@@ -0,0 +1,151 @@
+"""Dynamic few-shot example store (verified question/SQL pairs).
+
+FEW_SHOT_PROMPT hard-codes two examples regardless of the question. This
+module keeps a sidecar SQLite database of question/SQL pairs, seeded from
+data/few_shot_seed.json and fed by queries that executed successfully,
+and retrieves the most similar pairs for each new question with an FTS5
+(BM25, porter-stemmed) index. Retrieval is a single indexed query and
+stays well under a millisecond for stores of a few thousand pairs.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.config import (
+    FEW_SHOT_STORE_SUFFIX,
+    FEW_SHOT_TOP_K,
+    FEW_SHOT_TOKEN_BUDGET,
+)
+from app.value_index import normalize_value
+
+# Function words that carry no signal about query shape. Words like
+# "top", "most", "never" and "each" are kept: they map to ORDER BY,
+# NOT EXISTS and GROUP BY and are exactly what makes an example useful.
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "with", "from",
+    "and", "or", "is", "are", "was", "were", "be", "do", "does", "did",
+    "what", "which", "who", "me", "my", "that", "this", "there", "it", "its",
+}
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS examples (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    norm TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS example_fts USING fts5(
+    question,
+    content = 'examples',
+    content_rowid = 'id',
+    tokenize = 'porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS examples_ai AFTER INSERT ON examples BEGIN
+    INSERT INTO example_fts (rowid, question) VALUES (new.id, new.question);
+END;
+"""
+
+
+def default_store_path(db_path: str | Path) -> Path:
+    """Return the sidecar store path for a database (chinook.db -> chinook.examples.db)."""
+    return Path(db_path).with_suffix(FEW_SHOT_STORE_SUFFIX)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English and SQL)."""
+    return len(text) // 4 + 1
+
+
+def _open_store(store_path: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(store_path))
+    conn.executescript(_SCHEMA_SQL)
+    return conn
+
+
+def add_example(store_path: str | Path, question: str, sql: str, source: str = "executed") -> bool:
+    """Add a verified question/SQL pair. Returns False if the question is already stored."""
+    conn = _open_store(store_path)
+    try:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO examples (question, sql, norm, source) VALUES (?, ?, ?, ?)",
+            (question.strip(), sql.strip().rstrip(";"), normalize_value(question), source),
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def load_seed_examples(store_path: str | Path, seed_path: str | Path) -> int:
+    """Load question/SQL pairs from a JSON seed file. Returns the number added.
+
+    The seed file is a list of {"question": ..., "sql": ...} objects.
+    Already-stored questions are skipped, so this is safe to call at startup.
+    """
+    with open(seed_path) as f:
+        seeds = json.load(f)
+    return sum(add_example(store_path, s["question"], s["sql"], source="seed") for s in seeds)
+
+
+def retrieve_examples(store_path: str | Path, question: str, k: int = FEW_SHOT_TOP_K,
+                      token_budget: int = FEW_SHOT_TOKEN_BUDGET,
+                      exclude_question: Optional[str] = None) -> list[dict]:
+    """Return up to k stored pairs most similar to the question (BM25).
+
+    Pairs are added in rank order until the token budget is exhausted.
+    exclude_question drops an exact (normalized) match, which evaluation
+    runs use to keep a test question from retrieving itself.
+    """
+    if not Path(store_path).exists():
+        return []
+
+    terms = [t for t in normalize_value(question).split() if t not in STOPWORDS]
+    if not terms:
+        return []
+    match_expr = " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+    exclude_norm = normalize_value(exclude_question) if exclude_question else None
+
+    conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT e.question, e.sql, e.norm FROM example_fts f "
+            "JOIN examples e ON e.id = f.rowid "
+            "WHERE example_fts MATCH ? ORDER BY bm25(example_fts) LIMIT ?",
+            (match_expr, k + 1),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    examples = []
+    used = 0
+    for q, sql, norm in rows:
+        if norm == exclude_norm:
+            continue
+        cost = estimate_tokens(q) + estimate_tokens(sql)
+        if used + cost > token_budget:
+            break
+        examples.append({"question": q, "sql": sql})
+        used += cost
+        if len(examples) == k:
+            break
+    return examples
+
+
+def format_examples(examples: list[dict]) -> str:
+    """Render examples in the FEW_SHOT_PROMPT style."""
+    blocks = []
+    for i, ex in enumerate(examples, start=1):
+        blocks.append(f"Example {i}:\nQuestion: {ex['question']}\nSQL: {ex['sql']};")
+    return "\n\n".join(blocks)
+
+
+def make_example_retriever(store_path: str | Path) -> Callable[[str], list[dict]]:
+    """Create a question -> examples retriever bound to a store (for generate_sql)."""
+
+    def example_retriever(question: str) -> list[dict]:
+        return retrieve_examples(store_path, question)
+
+    return example_retriever
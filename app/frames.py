@@ -0,0 +1,62 @@
+"""Arrow result frames.
+
+Query results used to travel as lists of Python row lists without column
+names, and the UI built a pandas DataFrame from them, inferring an object
+dtype per column one cell at a time. Here rows are fetched in batches of
+ARROW_BATCH_ROWS and transposed into typed Arrow record batches that carry
+the column names from the cursor description. st.dataframe and the
+exports take Arrow tables as they are, and a large result is held as a
+few typed buffers instead of one Python object per cell.
+
+sqlite3 reports no column types in cursor.description, so each column's
+type is inferred by Arrow from its values (int64, double, string, binary;
+null for all-NULL columns). SQLite columns are dynamically typed: a column
+mixing numbers and text is stored as strings.
+"""
+
+from typing import Iterator, Optional
+
+import pyarrow as pa
+from sqlalchemy import CursorResult
+
+from app.config import ARROW_BATCH_ROWS
+
+
+def column_array(values: list, type_: Optional[pa.DataType] = None) -> pa.Array:
+    """Arrow array of one column's values; type inferred unless given."""
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed types in one SQLite column, or a value that no longer fits
+        # the type inferred from the first batch
+        return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+
+
+def rows_to_batch(names: list[str], rows: list, schema: Optional[pa.Schema] = None) -> pa.RecordBatch:
+    """Transpose rows into a record batch; schema pins the types of earlier batches."""
+    columns = list(zip(*rows)) if rows else [() for _ in names]
+    arrays = []
+    for i, values in enumerate(columns):
+        type_ = schema.field(i).type if schema is not None else None
+        if type_ is not None and pa.types.is_null(type_):
+            type_ = None
+        arrays.append(column_array(list(values), type_))
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def fetch_batches(result: CursorResult, batch_size: int = ARROW_BATCH_ROWS,
+                  max_rows: Optional[int] = None) -> Iterator[pa.RecordBatch]:
+    """Yield record batches from an executed statement, fetching batch_size rows at a time."""
+    names = list(result.keys())
+    schema = None
+    fetched = 0
+    while max_rows is None or fetched < max_rows:
+        n = batch_size if max_rows is None else min(batch_size, max_rows - fetched)
+        rows = result.fetchmany(n)
+        if not rows:
+            return
+        batch = rows_to_batch(names, rows, schema)
+        schema = batch.schema
+        fetched += len(rows)
+        yield batch
+
@@ -0,0 +1,135 @@
+"""Background Ollama health monitor.
+
+The Streamlit app used to call /api/tags on every rerun, i.e. on every
+widget interaction: a network round trip per render, and up to the
+5-second timeout when Ollama is slow. HealthMonitor polls in a daemon
+thread every HEALTH_CHECK_INTERVAL_SECONDS instead and caches the result;
+status() only reads the cache and never blocks the render path.
+
+Cached per probe: whether Ollama answered and has the model, the
+available models, the probe latency and when it ran. Status older than
+HEALTH_STALE_INTERVALS poll intervals is flagged stale. METRICS gets an
+"ollama.up" gauge and an "ollama.probe_seconds" latency series.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from app.config import (
+    DEFAULT_MODEL,
+    OLLAMA_BASE_URLS,
+    HEALTH_CHECK_INTERVAL_SECONDS,
+    HEALTH_CHECK_TIMEOUT_SECONDS,
+    HEALTH_STALE_INTERVALS,
+)
+from app.metrics import METRICS, Metrics
+
+
+def probe_ollama(base_url: str, model_name: str = DEFAULT_MODEL,
+                 timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS) -> dict:
+    """Check that an Ollama server answers /api/tags and has model_name.
+
+    Returns:
+        dict with ok, message, models and latency_seconds
+    """
+    t0 = time.time()
+    try:
+        response = httpx.get(f"{base_url.rstrip('/')}/api/tags", timeout=timeout)
+    except httpx.ConnectError:
+        return {"ok": False, "message": f"Cannot connect to Ollama at {base_url}",
+                "models": [], "latency_seconds": time.time() - t0}
+    except Exception as e:
+        return {"ok": False, "message": f"Error: {e}", "models": [], "latency_seconds": time.time() - t0}
+    latency = time.time() - t0
+
+    if response.status_code != 200:
+        return {"ok": False, "message": f"Ollama returned status {response.status_code}",
+                "models": [], "latency_seconds": latency}
+    models = [m["name"] for m in response.json().get("models", [])]
+    if model_name in models or any(model_name in m for m in models):
+        return {"ok": True, "message": f"Connected. Model: {model_name}",
+                "models": models, "latency_seconds": latency}
+    return {"ok": False, "message": f"Model {model_name} not found. Available: {models}",
+            "models": models, "latency_seconds": latency}
+
+
+class HealthMonitor:
+    """Poll Ollama in the background and serve the cached status."""
+
+    def __init__(self, base_urls: list[str] = OLLAMA_BASE_URLS, model_name: str = DEFAULT_MODEL,
+                 interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+                 probe: Callable[[str, str], dict] = probe_ollama,
+                 metrics: Metrics = METRICS):
+        self.base_urls = list(base_urls)
+        self.model_name = model_name
+        self.interval = interval
+        self._probe = probe
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._status: dict = {"ok": None, "message": "Checking Ollama...", "models": [],
+                              "latency_seconds": None, "checked_at": None}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def status(self) -> dict:
+        """Last cached status (never blocks on the network).
+
+        ok is None until the first probe finished; stale is True when the
+        last probe is older than HEALTH_STALE_INTERVALS intervals.
+        """
+        with self._lock:
+            status = dict(self._status)
+        checked_at = status["checked_at"]
+        status["stale"] = checked_at is not None and (
+            time.time() - checked_at > HEALTH_STALE_INTERVALS * self.interval)
+        return status
+
+    def refresh(self) -> dict:
+        """Probe every replica now and cache the result; healthy if any replica is."""
+        results = [self._probe(url, self.model_name) for url in self.base_urls]
+        healthy = [r for r in results if r["ok"]]
+        chosen = healthy[0] if healthy else results[0]
+        status = {
+            "ok": bool(healthy),
+            "message": chosen["message"],
+            "models": sorted({m for r in results for m in r["models"]}),
+            "latency_seconds": chosen["latency_seconds"],
+            "checked_at": time.time(),
+        }
+        if len(results) > 1:
+            status["message"] += f" ({len(healthy)}/{len(results)} replicas up)"
+        with self._lock:
+            self._status = status
+        self._metrics.set_gauge("ollama.up", 1 if healthy else 0)
+        self._metrics.observe("ollama.probe_seconds", chosen["latency_seconds"])
+        return status
+
+    # ── Background thread ────────────────────────────────────
+    def start(self) -> None:
+        """Start polling in a daemon thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ollama-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + 1)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"  Health probe failed: {e}")
+            self._stop.wait(self.interval)
+
+
+# Process-wide monitor shared by all Streamlit sessions
+HEALTH = HealthMonitor()
@@ -0,0 +1,142 @@
+"""Hedged LLM requests to cut tail latency.
+
+A few generate_sql calls take several times the median (model swap on
+the server, GC, another tenant) and dominate p99. With hedging, a call
+that has not returned after the HEDGE_PERCENTILE of recent LLM latency
+("llm.seconds" in METRICS) gets a duplicate, sent to another replica
+(app/replicas.py) or to HEDGE_BACKUP_MODEL. The first successful answer
+wins and the other call is cancelled through its CancelToken, which
+closes its HTTP connection so Ollama stops generating.
+
+No hedge is sent until HEDGE_MIN_SAMPLES calls have been observed, and
+never earlier than HEDGE_MIN_DELAY_SECONDS, so a cold start does not
+double the load. Nor is one sent when there is nowhere
+distinct to send it: with a single replica and no HEDGE_BACKUP_MODEL
+other than the primary model, invoke_for_sql calls the model unhedged
+rather than doubling the load on the server that is already slow.
+
+Recorded in METRICS (see hedge_stats): calls, hedges fired, backup wins
+and call latency with hedging ("hedge.seconds"). A cancelled primary's
+own latency is never observed, so the p99 improvement is measured by
+running the evaluation suite with and without hedging
+(latency_comparison in scripts/eval_harness.py).
+"""
+
+import contextvars
+import queue
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+from app.cancellation import CancelToken
+from app.config import (
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MIN_DELAY_SECONDS,
+    HEDGE_BACKUP_MODEL,
+)
+from app.metrics import METRICS, Metrics
+
+T = TypeVar("T")
+
+PRIMARY = "primary"
+BACKUP = "backup"
+
+
+class Hedger:
+    """Run a call and, if it is slow, a backup; return the first success."""
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES,
+                 min_delay: float = HEDGE_MIN_DELAY_SECONDS,
+                 backup_model: str = HEDGE_BACKUP_MODEL,
+                 metrics: Metrics = METRICS, latency_series: str = "llm.seconds"):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.backup_model = backup_model
+        self._metrics = metrics
+        self._series = latency_series
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        if self._metrics.summary(self._series)["count"] < self.min_samples:
+            return None
+        return max(self.min_delay, self._metrics.percentile(self._series, self.percentile))
+
+    def run(self, primary: Callable[[CancelToken], T], backup: Callable[[CancelToken], T],
+            cancel_token: Optional[CancelToken] = None) -> T:
+        """Call primary(token); after delay() also backup(token); return the first result.
+
+        Each attempt gets its own CancelToken, cancelled when the other one
+        wins or when cancel_token is cancelled. If the first attempt to
+        finish fails, the other one is awaited; if both fail, the primary's
+        error is raised. An error before the hedge delay is raised as is.
+        """
+        self._metrics.incr("hedge.calls")
+        t0 = time.time()
+        tokens = {PRIMARY: CancelToken(), BACKUP: CancelToken()}
+        unregister = [cancel_token.register(t.cancel) for t in tokens.values()] if cancel_token else []
+        outcomes: queue.Queue = queue.Queue()
+
+        def start(name: str, fn: Callable[[CancelToken], T]) -> None:
+            def attempt() -> None:
+                try:
+                    outcomes.put((name, True, fn(tokens[name])))
+                except BaseException as e:
+                    outcomes.put((name, False, e))
+
+            # Run in a copy of the caller's context, so context-bound callbacks
+            # (LangGraph's stream writer for token events) work in the attempt
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(attempt,), name=f"hedge-{name}",
+                             daemon=True).start()
+
+        try:
+            start(PRIMARY, primary)
+            try:
+                outcome = outcomes.get(timeout=self.delay())
+            except queue.Empty:
+                outcome = None
+
+            if outcome is None:
+                self._metrics.incr("hedge.fired")
+                start(BACKUP, backup)
+                errors = {}
+                for _ in range(2):
+                    name, ok, value = outcomes.get()
+                    if ok:
+                        outcome = (name, ok, value)
+                        break
+                    errors[name] = value
+                else:
+                    outcome = (PRIMARY, False, errors.get(PRIMARY) or errors[BACKUP])
+        finally:
+            for unregister_fn in unregister:
+                unregister_fn()
+
+        name, ok, value = outcome
+        # Stop the losing attempt, if one is still running
+        for token in tokens.values():
+            token.cancel()
+        if ok:
+            self._metrics.observe("hedge.seconds", time.time() - t0)
+            if name == BACKUP:
+                self._metrics.incr("hedge.backup_wins")
+            return value
+        raise value
+
+
+def hedge_stats(metrics: Metrics = METRICS) -> dict:
+    """Hedge rate, backup win rate and latency of hedged-mode calls."""
+    calls = metrics.counter("hedge.calls")
+    fired = metrics.counter("hedge.fired")
+    wins = metrics.counter("hedge.backup_wins")
+    return {
+        "calls": int(calls),
+        "hedged": int(fired),
+        "hedge_rate": fired / calls if calls else 0.0,
+        "backup_wins": int(wins),
+        "backup_win_rate": wins / fired if fired else 0.0,
+        "latency": metrics.summary("hedge.seconds"),
+    }
@@ -0,0 +1,286 @@
+"""Workload-driven index advisor.
+
+Generated SQL filters and joins on the same columns over and over
+(Track.GenreId, InvoiceLine.TrackId, Customer.Country). This module mines
+the query log (app/query_log.py) for them and ranks candidate indexes by
+what they would save SQLite on that workload:
+
+1. every logged statement is parsed and qualified with sqlglot; columns
+   compared in WHERE and JOIN ON clauses (equality, IN, IS, ranges) and
+   the columns IN subqueries project become candidates: one index per
+   column, plus a composite of a table's equality columns followed by
+   its first range column
+2. candidates already served by an existing index (a prefix of its
+   columns, or the INTEGER PRIMARY KEY) are dropped
+3. each remaining candidate is created on a scratch in-memory copy of the
+   database (backup API), the statements touching its table are planned
+   with EXPLAIN QUERY PLAN, and the index is dropped again
+
+A plan's cost is the rows its steps read: a SCAN (or an automatic index,
+which SQLite builds by scanning) reads the whole table, an equality
+SEARCH about log2 of it, a range SEARCH a quarter of it (the planner's
+own default estimate). The estimated benefit of a candidate is the cost it removes,
+weighted by each statement's execution count. Recommendations are
+chosen greedily: the best candidate is kept on the scratch copy and the
+rest are scored again on top of it, so an index that only duplicates
+the gain of a better one (or is a prefix of it) is not recommended.
+
+The source database is only read. apply_indexes writes the
+recommendations to a copy (chinook.db -> chinook.indexed.db).
+"""
+
+import math
+import re
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.qualify import qualify
+
+from app.config import INDEX_ADVISOR_MAX_COLUMNS, INDEXED_COPY_SUFFIX
+from app.sql_rewrite import SchemaFacts, table_aliases
+
+_RANGE = (exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between)
+_EQUALITY = (exp.EQ, exp.In, exp.Is)
+_PLAN_STEP = re.compile(r"^(SCAN|SEARCH) (\S+)(.*)$")
+_RANGE_STEP = re.compile(r"[<>]")
+_CANDIDATE_INDEX = "advisor_candidate"
+
+
+def default_indexed_path(db_path: str | Path) -> Path:
+    """Return the indexed copy path for a database (chinook.db -> chinook.indexed.db)."""
+    return Path(db_path).with_suffix(INDEXED_COPY_SUFFIX)
+
+
+# ──────────────────────────────────────────────────────────────
+# Candidate extraction
+# ──────────────────────────────────────────────────────────────
+def _compared_columns(predicate: exp.Expression) -> list[exp.Column]:
+    if isinstance(predicate, exp.In):
+        if isinstance(predicate.parent, exp.Not):
+            return []  # NOT IN cannot use an index on its left side
+        columns = [predicate.this]
+        query = predicate.args.get("query")
+        if query is not None and isinstance(query.this, exp.Select) and len(query.this.expressions) == 1:
+            columns.append(query.this.expressions[0].unalias())
+        return [c for c in columns if isinstance(c, exp.Column)]
+    if isinstance(predicate, (exp.Is, exp.Between)):
+        operands = [predicate.this]
+    else:
+        operands = [predicate.this, predicate.expression]
+    return [c for c in operands if isinstance(c, exp.Column)]
+
+
+def predicate_columns(sql: str, facts: SchemaFacts) -> dict[str, dict[str, list[str]]]:
+    """Columns sql compares, as {table: {"eq": [...], "range": [...]}} (lower-case names)."""
+    try:
+        tree = qualify(sqlglot.parse_one(sql, read="sqlite"), schema=facts.types,
+                       dialect="sqlite", quote_identifiers=False)
+    except (SqlglotError, KeyError, ValueError):
+        return {}
+    aliases = table_aliases(tree)
+    if aliases is None:
+        return {}
+
+    found: dict = defaultdict(lambda: {"eq": [], "range": []})
+    clauses = [*tree.find_all(exp.Where),
+               *(join.args["on"] for join in tree.find_all(exp.Join) if join.args.get("on"))]
+    for clause in clauses:
+        for predicate in clause.find_all(*_EQUALITY, *_RANGE):
+            kind = "range" if isinstance(predicate, _RANGE) else "eq"
+            for column in _compared_columns(predicate):
+                table = aliases.get(column.table.lower())
+                if table in facts.types and column.name.lower() not in found[table][kind]:
+                    found[table][kind].append(column.name.lower())
+    return dict(found)
+
+
+def candidate_indexes(columns: dict[str, dict[str, list[str]]],
+                      max_columns: int = INDEX_ADVISOR_MAX_COLUMNS) -> set[tuple[str, tuple[str, ...]]]:
+    """(table, columns) candidates for one statement's predicate columns."""
+    candidates = set()
+    for table, found in columns.items():
+        for column in found["eq"] + found["range"]:
+            candidates.add((table, (column,)))
+        composite = found["eq"][:max_columns]
+        ranges = [c for c in found["range"] if c not in composite]
+        if ranges and len(composite) < max_columns:
+            composite = composite + ranges[:1]
+        if len(composite) > 1:
+            candidates.add((table, tuple(composite)))
+    return candidates
+
+
+# ──────────────────────────────────────────────────────────────
+# Plan evaluation
+# ──────────────────────────────────────────────────────────────
+def scratch_copy(db_path: str | Path) -> sqlite3.Connection:
+    """In-memory copy of the database made with the backup API (source opened read-only)."""
+    scratch = sqlite3.connect(":memory:")
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        source.backup(scratch)
+    finally:
+        source.close()
+    return scratch
+
+
+def existing_indexes(conn: sqlite3.Connection) -> dict[str, list[tuple[str, ...]]]:
+    """Column lists of every index per table (lower-case), including INTEGER PRIMARY KEYs."""
+    indexes: dict = defaultdict(list)
+    tables = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        pk = [c for c in conn.execute(f"PRAGMA table_info([{table}])") if c[5] > 0]
+        if len(pk) == 1 and pk[0][2].upper() == "INTEGER":
+            indexes[table.lower()].append((pk[0][1].lower(),))
+        for index in conn.execute(f"PRAGMA index_list([{table}])"):
+            columns = conn.execute(f"PRAGMA index_info([{index[1]}])").fetchall()
+            indexes[table.lower()].append(tuple(c[2].lower() for c in columns if c[2]))
+    return dict(indexes)
+
+
+def plan_cost(conn: sqlite3.Connection, sql: str, aliases: dict, table_rows: dict) -> float:
+    """Estimated rows read by sql's query plan (see the module docstring)."""
+    cost = 0.0
+    for _, _, _, detail in conn.execute("EXPLAIN QUERY PLAN " + sql):
+        match = _PLAN_STEP.match(detail)
+        if match is None:
+            continue
+        operation, name, rest = match.groups()
+        rows = table_rows.get(aliases.get(name.lower(), name.lower()), 0)
+        if operation == "SCAN" or "AUTOMATIC" in rest:
+            cost += rows
+        elif _RANGE_STEP.search(rest):
+            cost += rows / 4 + math.log2(rows + 1)  # SQLite's own guess for a range
+        else:
+            cost += math.log2(rows + 1) + 1
+    return cost
+
+
+def _create_index_sql(name: str, table: str, columns: list[str]) -> str:
+    return f"CREATE INDEX IF NOT EXISTS [{name}] ON [{table}] ({', '.join(f'[{c}]' for c in columns)})"
+
+
+def _evaluate(conn: sqlite3.Connection, name: str, table: str, columns: list[str],
+              statements: list[dict], table_rows: dict) -> dict:
+    """Create an index and score it against the statements' current plan costs.
+
+    The index is left in place; the caller drops it if it is not kept.
+    """
+    conn.execute(_create_index_sql(name, table, columns))
+    benefit, improved, executions, costs = 0.0, 0, 0, []
+    for statement in statements:
+        cost = plan_cost(conn, statement["sql"], statement["aliases"], table_rows)
+        if cost < statement["cost"]:
+            benefit += (statement["cost"] - cost) * statement["executions"]
+            improved += 1
+            executions += statement["executions"]
+            costs.append((statement, cost))
+    return {"benefit": benefit, "statements": improved, "executions": executions, "costs": costs}
+
+
+def _prefix_of(columns: tuple, others: list[tuple]) -> bool:
+    return any(other[:len(columns)] == columns for other in others)
+
+
+def advise_indexes(db_path: str | Path, schema_info: dict, workload: list[dict],
+                   max_columns: int = INDEX_ADVISOR_MAX_COLUMNS) -> list[dict]:
+    """Rank candidate indexes for a workload (load_workload output), best first.
+
+    Returns:
+        list of {table, columns, sql, benefit, statements, executions}:
+        the CREATE INDEX statement, the estimated rows saved over the
+        workload, and how many logged statements (and executions of
+        them) the index improves
+    """
+    facts = SchemaFacts(schema_info)
+    names = {table.lower(): table for table in schema_info}
+    column_names = {(table.lower(), c["name"].lower()): c["name"]
+                    for table, info in schema_info.items() for c in info["columns"]}
+
+    conn = scratch_copy(db_path)
+    try:
+        table_rows = {table.lower(): conn.execute(f"SELECT COUNT(*) FROM [{table}]").fetchone()[0]
+                      for table in schema_info}
+        existing = existing_indexes(conn)
+
+        statements = []
+        candidates = set()
+        for entry in workload:
+            sql = entry["sql"].strip().rstrip(";")
+            try:
+                aliases = table_aliases(sqlglot.parse_one(sql, read="sqlite"))
+                if aliases is None:
+                    continue
+                cost = plan_cost(conn, sql, aliases, table_rows)
+            except (SqlglotError, sqlite3.Error):
+                continue  # no longer parses or plans against this schema
+            columns = predicate_columns(sql, facts)
+            statements.append({"sql": sql, "aliases": aliases, "cost": cost,
+                               "executions": entry.get("executions", 1), "tables": set(columns)})
+            candidates |= candidate_indexes(columns, max_columns)
+
+        recommendations = []
+        remaining = {c for c in candidates if not _prefix_of(c[1], existing.get(c[0], []))}
+        while remaining:
+            best = None
+            for table, columns in sorted(remaining):
+                outcome = _evaluate(conn, _CANDIDATE_INDEX, names[table],
+                                    [column_names[table, c] for c in columns],
+                                    [st for st in statements if table in st["tables"]], table_rows)
+                conn.execute(f"DROP INDEX [{_CANDIDATE_INDEX}]")
+                if outcome["benefit"] > 0 and (best is None or outcome["benefit"] > best[2]["benefit"]):
+                    best = (table, columns, outcome)
+            if best is None:
+                break
+            table, columns, outcome = best
+            real = [column_names[table, c] for c in columns]
+            index_name = f"idx_{names[table]}_{'_'.join(real)}"
+            # Keep the chosen index on the scratch copy: later candidates
+            # are scored by what they add on top of it
+            _evaluate(conn, index_name, names[table], real,
+                      [st for st in statements if table in st["tables"]], table_rows)
+            for statement, cost in outcome["costs"]:
+                statement["cost"] = cost
+            existing.setdefault(table, []).append(columns)
+            remaining = {c for c in remaining if not _prefix_of(c[1], existing.get(c[0], []))}
+            recommendations.append({
+                "table": names[table],
+                "columns": real,
+                "sql": _create_index_sql(index_name, names[table], real),
+                "benefit": round(outcome["benefit"], 1),
+                "statements": outcome["statements"],
+                "executions": outcome["executions"],
+            })
+    finally:
+        conn.close()
+    return recommendations
+
+
+def apply_indexes(db_path: str | Path, recommendations: list[dict],
+                  copy_path: Optional[str | Path] = None) -> Path:
+    """Write a copy of the database with the recommended indexes; returns its path.
+
+    The copy (default: chinook.db -> chinook.indexed.db) is replaced if it
+    exists. The source database is not modified.
+    """
+    copy_path = Path(copy_path) if copy_path is not None else default_indexed_path(db_path)
+    if copy_path.exists():
+        copy_path.unlink()
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    target = sqlite3.connect(str(copy_path))
+    try:
+        source.backup(target)
+        for recommendation in recommendations:
+            target.execute(recommendation["sql"])
+        target.execute("ANALYZE")
+        target.commit()
+    finally:
+        source.close()
+        target.close()
+    return copy_path
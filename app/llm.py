@@ -0,0 +1,305 @@
+"""LLM client layer for the SQL Query Agent.
+
+Centralizes ChatOllama construction, prompt message layout and response
+handling that were previously repeated inside each agent node.
+"""
+
+import json
+import threading
+import time
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_ollama import ChatOllama
+from ollama import ResponseError
+
+from app.metrics import METRICS
+from app.scheduler import PRIORITY_INTERACTIVE, SCHEDULER, LLMScheduler
+from app.replicas import REPLICAS, ReplicaPool
+from app.hedging import Hedger
+from app.cancellation import (
+    CancelToken,
+    DeadlineExceeded,
+    QueryCancelled,
+    check_interrupted,
+    remaining_seconds,
+)
+
+from app.config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    TEMPERATURE,
+    NUM_CTX,
+    CACHED_SUFFIX_GENERIC,
+    CACHED_SUFFIX_COT,
+    PROMPT_COT,
+    SQL_OUTPUT_SCHEMA,
+    STRUCTURED_OUTPUT_INSTRUCTION,
+)
+
+# Output modes reported by invoke_for_sql
+OUTPUT_TEXT = "text"              # Plain completion, SQL extracted with extract_sql
+OUTPUT_STRUCTURED = "structured"  # JSON constrained by SQL_OUTPUT_SCHEMA
+OUTPUT_FALLBACK = "fallback"      # Structured requested, model/server could not honor it
+
+# Models whose Ollama server rejected a `format` schema; they use text mode
+# for the rest of the process instead of failing every call
+_STRUCTURED_UNSUPPORTED: set[str] = set()
+
+
+def _rejects_format(error: ResponseError) -> bool:
+    """True if Ollama refused the request because of its `format` schema.
+
+    Servers that predate JSON schema formats answer 400 with a message
+    naming the format; any other error (model not found, 5xx, out of
+    memory, busy) says nothing about structured output support.
+    """
+    message = str(error.error).lower()
+    return error.status_code == 400 and ("format" in message or "schema" in message)
+
+
+def create_llm(model_name: str, base_url: str = OLLAMA_BASE_URL, **options) -> ChatOllama:
+    """Create a ChatOllama client with the project defaults.
+
+    num_ctx and temperature must stay identical across calls: Ollama
+    reloads the model (and drops its prompt cache) when they change.
+    keep_alive keeps the model resident between requests.
+    """
+    return ChatOllama(
+        model=model_name,
+        base_url=base_url,
+        temperature=TEMPERATURE,
+        num_ctx=NUM_CTX,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        **options,
+    )
+
+
+def extract_sql(content: str) -> str:
+    """Extract SQL from an LLM response.
+
+    Strips markdown fences and trailing semicolons. If the model wrote
+    reasoning before the query (CoT prompts), only the text after the last
+    "SQL:" marker is kept.
+    """
+    sql = content.strip()
+    if "SQL:" in sql:
+        sql = sql.rsplit("SQL:", 1)[1]
+    sql = sql.replace("```sql", "").replace("```", "").strip()
+    sql = sql.rstrip(";").strip()
+    return sql
+
+
+def parse_structured_sql(content: str) -> Optional[str]:
+    """Return the SQL from a SQL_OUTPUT_SCHEMA JSON response, or None if it does not parse."""
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("sql"), str):
+        return None
+    return extract_sql(data["sql"]) or None
+
+
+def _with_instruction(prompt: str | list[BaseMessage], instruction: str) -> str | list[BaseMessage]:
+    """Append an instruction to a prompt string or to the last message of a message list."""
+    if isinstance(prompt, str):
+        return prompt + instruction
+    *head, last = prompt
+    return [*head, HumanMessage(content=last.content + instruction)]
+
+
+def _close_client(llm: BaseChatModel) -> None:
+    """Abort an in-flight request by closing the model's HTTP client (ChatOllama only)."""
+    client = getattr(getattr(llm, "_client", None), "_client", None)
+    if isinstance(client, httpx.Client):
+        client.close()
+
+
+def timeout_options(deadline: Optional[float]) -> dict:
+    """llm_factory options that bound the Ollama HTTP call by the remaining budget."""
+    remaining = remaining_seconds(deadline)
+    if remaining is None:
+        return {}
+    return {"client_kwargs": {"timeout": max(remaining, 0.1)}}
+
+
+def invoke_text(llm: BaseChatModel, prompt: str | list[BaseMessage],
+                deadline: Optional[float] = None,
+                cancel_token: Optional[CancelToken] = None,
+                on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Invoke the model and return the response text, honoring deadline and cancellation.
+
+    Without deadline, cancel_token and on_token this is llm.invoke().
+    Otherwise the response is streamed and checked between chunks, and the
+    HTTP client is closed when the token is cancelled or the deadline
+    passes, which drops the connection and makes Ollama stop generating.
+    on_token(text) is called with each chunk as it arrives.
+
+    Raises:
+        QueryCancelled / DeadlineExceeded
+    """
+    if deadline is None and cancel_token is None and on_token is None:
+        return llm.invoke(prompt).content
+
+    check_interrupted(deadline, cancel_token)
+    unregister = cancel_token.register(lambda: _close_client(llm)) if cancel_token else None
+    timer = None
+    if deadline is not None:
+        timer = threading.Timer(remaining_seconds(deadline), _close_client, args=(llm,))
+        timer.daemon = True
+        timer.start()
+
+    parts = []
+    try:
+        for chunk in llm.stream(prompt):
+            check_interrupted(deadline, cancel_token)
+            parts.append(chunk.content)
+            if on_token is not None and chunk.content:
+                on_token(chunk.content)
+    except (QueryCancelled, ResponseError):
+        raise
+    except Exception as e:
+        # A transport error caused by the abort is reported as the abort
+        check_interrupted(deadline, cancel_token)
+        if isinstance(e, httpx.TimeoutException):
+            raise DeadlineExceeded("Deadline exceeded waiting for the LLM") from e
+        raise
+    finally:
+        if unregister is not None:
+            unregister()
+        if timer is not None:
+            timer.cancel()
+    return "".join(parts)
+
+
+def invoke_for_sql(llm_factory: Callable[..., BaseChatModel], model_name: str,
+                   prompt: str | list[BaseMessage], structured: bool = False,
+                   deadline: Optional[float] = None,
+                   cancel_token: Optional[CancelToken] = None,
+                   priority: int = PRIORITY_INTERACTIVE,
+                   scheduler: Optional[LLMScheduler] = SCHEDULER,
+                   replicas: Optional[ReplicaPool] = REPLICAS,
+                   hedger: Optional[Hedger] = None,
+                   on_token: Optional[Callable[[str], None]] = None) -> tuple[str, str]:
+    """Invoke the model and return (sql, output_mode).
+
+    With structured=True the call passes SQL_OUTPUT_SCHEMA as Ollama's
+    `format`, so the answer is JSON and no fence stripping is needed. If
+    the server rejects the schema (older Ollama, unsupported model) the
+    model is remembered and called in text mode; if the response is not
+    valid JSON it is parsed as plain text. Both report OUTPUT_FALLBACK.
+
+    deadline and cancel_token are passed to invoke_text; the HTTP timeout
+    is set to the remaining budget. Each call waits for a scheduler slot
+    with the given priority (app/scheduler.py); scheduler=None calls the
+    server directly. With more than one replica in the pool, the call is
+    routed by app/replicas.py and llm_factory receives its base_url.
+
+    With a hedger (app/hedging.py), a slow call gets a duplicate on another
+    replica or the hedger's backup model; the first answer wins. With a
+    single replica and no distinct backup model the call is not hedged:
+    the duplicate would only add load to the server that is already slow.
+
+    on_token(text) receives the raw response chunks as they are generated
+    (of the primary only, when hedged), for progressive display; the
+    returned SQL is the authoritative result.
+    """
+    pooled = replicas is not None and len(replicas.replicas) > 1
+
+    def attempt(model: str, prompt: str | list[BaseMessage], token: Optional[CancelToken],
+                format_option: dict, used: list[str], avoid: frozenset[str] = frozenset(),
+                on_token: Optional[Callable[[str], None]] = None) -> str:
+        def on_replica(base_url: Optional[str]) -> str:
+            # Built after queueing so the HTTP timeout is the budget left now
+            options = {**format_option, **timeout_options(deadline)}
+            if base_url is not None:
+                options["base_url"] = base_url
+                used.append(base_url)
+            return invoke_text(llm_factory(model, **options), prompt, deadline, token, on_token)
+
+        with scheduler.slot(priority, deadline, token) if scheduler else nullcontext():
+            t0 = time.time()
+            content = replicas.call(model, on_replica, avoid) if pooled else on_replica(None)
+        METRICS.observe("llm.seconds", time.time() - t0)
+        return content
+
+    backup_model = (hedger.backup_model or model_name) if hedger is not None else model_name
+    hedged = hedger is not None and (pooled or backup_model != model_name)
+
+    def call(prompt: str | list[BaseMessage], **format_option) -> str:
+        primary_urls: list[str] = []
+        if not hedged:
+            return attempt(model_name, prompt, cancel_token, format_option, primary_urls,
+                           on_token=on_token)
+        return hedger.run(
+            lambda token: attempt(model_name, prompt, token, format_option, primary_urls,
+                                  on_token=on_token),
+            lambda token: attempt(backup_model, prompt, token, format_option, [],
+                                  frozenset(primary_urls)),
+            cancel_token,
+        )
+
+    if structured and model_name not in _STRUCTURED_UNSUPPORTED:
+        try:
+            content = call(_with_instruction(prompt, STRUCTURED_OUTPUT_INSTRUCTION),
+                           format=SQL_OUTPUT_SCHEMA)
+        except ResponseError as e:
+            if not _rejects_format(e):
+                raise
+            print(f"  Structured output unsupported for {model_name}: {e}")
+            _STRUCTURED_UNSUPPORTED.add(model_name)
+        else:
+            sql = parse_structured_sql(content)
+            if sql is not None:
+                return sql, OUTPUT_STRUCTURED
+            return extract_sql(content), OUTPUT_FALLBACK
+
+    content = call(prompt)
+    return extract_sql(content), OUTPUT_FALLBACK if structured else OUTPUT_TEXT
+
+
+def build_cached_suffix(question: str, relevant_tables: Optional[list[str]] = None,
+                        value_hints: str = "", examples: str = "",
+                        prompt_type: str = "") -> str:
+    """Build the per-question suffix for the cache-friendly layout.
+
+    The schema_filter selection is passed as a hint rather than as a
+    filtered schema, so the schema block in the prefix never changes.
+    prompt_type PROMPT_COT asks for reasoning before the query.
+    """
+    hints = []
+    if relevant_tables:
+        hints.append(f"Tables most likely needed: {', '.join(relevant_tables)}")
+    if value_hints:
+        hints.append(value_hints)
+    if examples:
+        hints.append(f"Examples of similar questions:\n\n{examples}")
+    hint_text = "\n\n".join(hints) + "\n\n" if hints else ""
+    template = CACHED_SUFFIX_COT if prompt_type == PROMPT_COT else CACHED_SUFFIX_GENERIC
+    return template.format(hints=hint_text, question=question)
+
+
+def build_messages(prefix: str, suffix: str) -> list[BaseMessage]:
+    """Lay out a prompt as a stable system prefix and a variable user suffix."""
+    return [SystemMessage(content=prefix), HumanMessage(content=suffix)]
+
+
+def prompt_eval_stats(response) -> dict:
+    """Read Ollama timing metadata from a ChatOllama response.
+
+    Returns:
+        dict with prompt_eval_count (prompt tokens actually evaluated, i.e.
+        not served from the KV cache), prompt_eval_seconds, eval_seconds
+        and load_seconds. Missing fields are reported as 0.
+    """
+    meta = getattr(response, "response_metadata", {}) or {}
+    return {
+        "prompt_eval_count": meta.get("prompt_eval_count", 0) or 0,
+        "prompt_eval_seconds": (meta.get("prompt_eval_duration", 0) or 0) / 1e9,
+        "eval_seconds": (meta.get("eval_duration", 0) or 0) / 1e9,
+        "load_seconds": (meta.get("load_duration", 0) or 0) / 1e9,
+    }
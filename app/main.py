@@ -8,20 +8,35 @@ Features:
 - Query execution against SQLite databases
 - Schema explorer with table relationships
 - Error handling with retry display
+- Live progress: selected tables, SQL tokens, validation, first rows, retries
+- Streaming CSV/Parquet export of the full result
 - Ollama connectivity check
 """
 
-import requests
+import os
+import queue
+import tempfile
+from typing import Optional
+
 import streamlit as st
 import pandas as pd
 
 from app.config import (
     DEFAULT_DB_PATH,
     DEFAULT_MODEL,
-    OLLAMA_BASE_URL,
+    REQUEST_TIMEOUT_SECONDS,
 )
 from app.database import create_db_engine, get_schema_info
-from app.agent import build_agent, AgentState
+from app.agent import build_agent, new_state, stream_agent
+from app.cancellation import CancelToken, deadline_in, remaining_seconds, run_cancellable
+from app.singleflight import FLIGHTS, flight_key
+from app.replicas import REPLICAS
+from app.warmup import warmup_status
+from app.health import HEALTH
+from app.export import EXPORT_FORMATS, export_query
+from app.value_index import default_index_path
+from app.few_shot import default_store_path
+from app.query_log import default_log_path
 
 
 # ──────────────────────────────────────────────────────────────
@@ -55,20 +70,28 @@ TABLE_DESCRIPTIONS = {
 # ──────────────────────────────────────────────────────────────
 # Ollama connectivity check
 # ──────────────────────────────────────────────────────────────
-def check_ollama() -> tuple[bool, str]:
-    """Check if Ollama is running and the model is available."""
-    try:
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        if response.status_code == 200:
-            models = [m["name"] for m in response.json().get("models", [])]
-            if DEFAULT_MODEL in models or any(DEFAULT_MODEL in m for m in models):
-                return True, f"Connected. Model: {DEFAULT_MODEL}"
-            return False, f"Model {DEFAULT_MODEL} not found. Available: {models}"
-        return False, f"Ollama returned status {response.status_code}"
-    except requests.exceptions.ConnectionError:
-        return False, f"Cannot connect to Ollama at {OLLAMA_BASE_URL}"
-    except Exception as e:
-        return False, f"Error: {e}"
+def describe_load_state(model_name: str) -> str:
+    """Load state and last warm-up time from app/warmup.py, e.g. "loaded, warm-up 4.2s"."""
+    status = warmup_status(model_name)
+    state = {True: "loaded", False: "not loaded, warming up", None: "load state unknown"}[status["loaded"]]
+    if status["warmup_seconds"] is not None:
+        state += f", warm-up {status['warmup_seconds']:.1f}s"
+    return state
+
+
+def check_ollama() -> tuple[Optional[bool], str]:
+    """Ollama status from the background monitor (app/health.py); never blocks.
+
+    Returns (None, message) until the first probe has finished.
+    """
+    HEALTH.start()
+    status = HEALTH.status()
+    message = status["message"]
+    if status["ok"]:
+        message += f" ({describe_load_state(DEFAULT_MODEL)}, {status['latency_seconds'] * 1000:.0f} ms)"
+    if status["stale"]:
+        message += " — status is stale"
+    return status["ok"], message
 
 
 # ──────────────────────────────────────────────────────────────
@@ -78,7 +101,17 @@ def check_ollama() -> tuple[bool, str]:
 def get_agent(db_path: str, model_name: str):
     """Build and cache the agent for the given database and model."""
     engine = create_db_engine(db_path)
-    return build_agent(engine, model_name), engine
+    agent = build_agent(
+        engine,
+        model_name,
+        value_index_path=default_index_path(db_path),
+        example_store_path=default_store_path(db_path),
+        cache_prompt_prefix=True,
+        query_log_path=default_log_path(db_path),
+        warm_up=True,
+    )
+    REPLICAS.start()
+    return agent, engine
 
 
 @st.cache_data
@@ -156,6 +189,122 @@ def render_schema_explorer(schema_info: dict):
                 st.caption(f"Foreign keys: {fk_text}")
 
 
+# ──────────────────────────────────────────────────────────────
+# Live progress component
+# ──────────────────────────────────────────────────────────────
+class LiveProgress:
+    """Render stream_agent events as they arrive, so users see the SQL
+    being written instead of a spinner for the whole LLM latency."""
+
+    def __init__(self):
+        self.status = st.status("Selecting tables...", expanded=True)
+        with self.status:
+            self.tables = st.empty()
+            self.sql = st.empty()
+            self.validation = st.empty()
+            self.preview = st.empty()
+            self.retries = st.empty()
+        self.text = ""
+        self.text_node = None
+
+    def drain(self, events: queue.Queue) -> None:
+        """Render every event queued by the worker thread so far."""
+        while True:
+            try:
+                self.handle(events.get_nowait())
+            except queue.Empty:
+                return
+
+    def handle(self, event: dict) -> None:
+        if event["event"] == "token":
+            # A new generation (repair, next cascade tier) starts a new buffer
+            if event["node"] != self.text_node:
+                self.text, self.text_node = "", event["node"]
+            self.text += event["text"]
+            self.sql.code(self.text, language="sql")
+            return
+
+        node, update = event["node"], event["update"]
+        if node == "schema_filter":
+            self.tables.caption(f"Tables: {', '.join(update.get('relevant_tables', []))}")
+            self.status.update(label="Generating SQL...")
+        elif node in ("generate_sql", "postprocess_query"):
+            self.sql.code(update.get("generated_sql", ""), language="sql")
+            self.status.update(label="Validating...")
+        elif node == "validate_query":
+            if update.get("is_valid"):
+                self.validation.caption("SQL is valid")
+                self.status.update(label="Executing...")
+            else:
+                self.text = ""
+                self.validation.warning(f"Validation failed: {update.get('validation_error', '')}")
+        elif node == "execute_query":
+            if update.get("error"):
+                self.text = ""
+                self.preview.warning(f"Execution error: {update['error']}")
+            elif update.get("results"):
+                self.preview.dataframe(update["results"][:5].to_arrow(), use_container_width=True)
+        elif node == "handle_error":
+            self.text = ""
+            self.sql.code(update.get("generated_sql", ""), language="sql")
+            self.retries.caption(f"Retry {update.get('retry_count', 0)}: repaired SQL")
+            self.status.update(label="Validating repaired SQL...")
+        elif node == "escalate":
+            self.text = ""
+            self.retries.caption("Escalating to the next model")
+            self.status.update(label="Generating SQL...")
+
+    def finish(self, failed: bool = False) -> None:
+        if failed:
+            self.status.update(label="Failed", state="error")
+        else:
+            self.status.update(label="Done", state="complete", expanded=False)
+
+
+# ──────────────────────────────────────────────────────────────
+# Export component
+# ──────────────────────────────────────────────────────────────
+def render_export(sql: str):
+    """Export the full result of the last query (not just the displayed rows).
+
+    The query is re-run and written in batches to a temporary file
+    (app/export.py) within the per-query budget; a rerun cancels it.
+
+    Only the export itself is streamed: st.download_button reads the whole
+    file into memory to serve it, so the finished file is held by the
+    Streamlit process. For results too large for that, use the API's
+    GET /query/{query_id}/export, which streams the response body.
+    """
+    st.subheader("Export full result")
+    fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    if not st.button("Export"):
+        return
+
+    _, engine = get_agent(str(DEFAULT_DB_PATH), DEFAULT_MODEL)
+    cancel_token = CancelToken()
+    deadline = deadline_in(REQUEST_TIMEOUT_SECONDS)
+    progress = st.empty()
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as f:
+        path = f.name
+    try:
+        stats = run_cancellable(
+            lambda: export_query(engine, sql, path, fmt, deadline, cancel_token),
+            cancel_token,
+            on_tick=lambda elapsed: progress.caption(f"Exporting for {elapsed:.0f}s..."),
+        )
+        progress.empty()
+        st.caption(f"{stats['rows']:,} row(s), {stats['bytes'] / 2**20:.1f} MB in {stats['seconds']:.1f}s")
+        with open(path, "rb") as f:
+            st.download_button(f"Download {fmt.upper()}", f, file_name=f"query.{fmt}",
+                               mime=EXPORT_FORMATS[fmt])
+    except Exception as e:
+        progress.empty()
+        st.error(f"Export failed: {e}")
+    finally:
+        # download_button has read the file into memory
+        os.unlink(path)
+
+
 # ──────────────────────────────────────────────────────────────
 # Main app
 # ──────────────────────────────────────────────────────────────
@@ -173,9 +322,13 @@ def main():
         ollama_ok, ollama_msg = check_ollama()
         if ollama_ok:
             st.success(ollama_msg)
+        elif ollama_ok is None:
+            st.info(ollama_msg)
         else:
             st.error(ollama_msg)
             st.stop()
+        # Build the agent on page load so model warm-up starts before the first question
+        get_agent(str(DEFAULT_DB_PATH), DEFAULT_MODEL)
 
         st.divider()
 
@@ -206,62 +359,97 @@ def main():
     col1, col2 = st.columns([1, 5])
     with col1:
         run_clicked = st.button("Run Query", type="primary", disabled=not question)
+    with col2:
+        # Clicking reruns the script, which cancels the running query (see below)
+        st.button("Cancel")
+
+    # A query still running from the previous script run is aborted
+    previous_token = st.session_state.pop("cancel_token", None)
+    if previous_token is not None:
+        previous_token.cancel()
 
     # Run query
     if run_clicked and question:
-        with st.spinner("Generating SQL..."):
-            # Initialize agent
-            agent, engine = get_agent(str(DEFAULT_DB_PATH), DEFAULT_MODEL)
-
-            # Prepare initial state
-            initial_state: AgentState = {
-                "question": question,
-                "relevant_tables": [],
-                "schema_text": "",
-                "raw_sql": "",
-                "generated_sql": "",
-                "is_valid": False,
-                "validation_error": "",
-                "results": None,
-                "error": "",
-                "retry_count": 0,
-                "model_name": DEFAULT_MODEL,
-            }
-
-            # Run agent
-            try:
-                result = agent.invoke(initial_state)
-
-                # Display SQL
-                st.subheader("Generated SQL")
-                st.code(result["generated_sql"], language="sql")
-
-                # Display retry info if any
-                if result["retry_count"] > 0:
-                    st.warning(f"Query required {result['retry_count']} retry(s)")
-
-                # Display results or error
-                if result["error"]:
-                    st.error(f"Execution error: {result['error']}")
-                elif result["results"] is not None:
-                    st.subheader("Results")
-                    if result["results"]:
-                        df = pd.DataFrame(result["results"])
-                        st.dataframe(df, use_container_width=True)
-                        st.caption(f"{len(result['results'])} row(s) returned")
-                    else:
-                        st.info("Query returned no results")
-
-                    # Add to history
-                    st.session_state.history.append({
-                        "question": question,
-                        "sql": result["generated_sql"],
-                    })
-                elif result["validation_error"]:
-                    st.error(f"Validation failed: {result['validation_error']}")
-
-            except Exception as e:
-                st.error(f"Agent error: {e}")
+        # Initialize agent
+        agent, engine = get_agent(str(DEFAULT_DB_PATH), DEFAULT_MODEL)
+
+        cancel_token = CancelToken()
+        st.session_state.cancel_token = cancel_token
+        deadline = deadline_in(REQUEST_TIMEOUT_SECONDS)
+        progress = st.empty()
+        live = LiveProgress()
+        events: queue.Queue = queue.Queue()
+
+        # Sessions asking the same question at the same time share one
+        # run; only the session that started it sees live progress
+        def run_agent(shared_token: CancelToken) -> dict:
+            initial_state = new_state(question, DEFAULT_MODEL,
+                                      timeout=remaining_seconds(deadline), cancel_token=shared_token)
+            for event in stream_agent(agent, initial_state):
+                if event["event"] == "final":
+                    return event["state"]
+                events.put(event)
+
+        def on_tick(elapsed: float) -> None:
+            progress.caption(f"Running for {elapsed:.0f}s...")
+            live.drain(events)
+
+        # Run agent in a worker thread. Updating the progress display lets
+        # Streamlit interrupt this script on rerun; run_cancellable then
+        # cancels the token, aborting the Ollama call and SQLite statement.
+        try:
+            result, _ = run_cancellable(
+                lambda: FLIGHTS.do(flight_key(question, DEFAULT_MODEL, str(DEFAULT_DB_PATH)),
+                                   run_agent, cancel_token, deadline),
+                cancel_token,
+                on_tick=on_tick,
+                tick_seconds=0.1,
+            )
+            live.drain(events)
+            live.finish()
+            progress.empty()
+            st.session_state.pop("cancel_token", None)
+
+            # Display SQL
+            st.subheader("Generated SQL")
+            st.code(result["generated_sql"], language="sql")
+
+            if result.get("answered_by"):
+                st.caption(f"Answered by {result['answered_by']}")
+
+            # Display retry info if any
+            if result["retry_count"] > 0:
+                st.warning(f"Query required {result['retry_count']} retry(s)")
+            if result.get("stop_reason"):
+                st.caption(f"Stopped: {result['stop_reason']}")
+
+            # Display results or error
+            if result["error"]:
+                st.error(f"Execution error: {result['error']}")
+            elif result["results"] is not None:
+                st.subheader("Results")
+                if result["results"]:
+                    # Arrow table with column names and types (app/resultset.py)
+                    st.dataframe(result["results"].to_arrow(), use_container_width=True)
+                    st.caption(f"{len(result['results'])} row(s) returned")
+                else:
+                    st.info("Query returned no results")
+
+                # Add to history
+                st.session_state.history.append({
+                    "question": question,
+                    "sql": result["generated_sql"],
+                })
+                st.session_state.last_sql = result["generated_sql"]
+            elif result["validation_error"]:
+                st.error(f"Validation failed: {result['validation_error']}")
+
+        except Exception as e:
+            live.finish(failed=True)
+            st.error(f"Agent error: {e}")
+
+    if st.session_state.get("last_sql"):
+        render_export(st.session_state.last_sql)
 
     # Example questions
     with st.expander("Example questions"):
@@ -0,0 +1,95 @@
+"""In-process metrics for the SQL Query Agent.
+
+A small thread-safe registry of counters and bounded latency samples.
+Agent nodes and the LLM layer record into the process-wide METRICS
+instance; the UI, API and evaluation scripts read snapshot() from it.
+Metric names are dotted strings, e.g. "cascade.llama3.1:8b.hits".
+"""
+
+import threading
+from collections import defaultdict, deque
+
+# Samples kept per latency series (enough for stable p99 estimates)
+MAX_SAMPLES = 1000
+
+
+class Metrics:
+    """Thread-safe counters and latency samples."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def incr(self, name: str, value: float = 1) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set a point-in-time value (queue depth, in-flight requests)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample (typically a latency in seconds)."""
+        with self._lock:
+            self._samples[name].append(value)
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> float:
+        with self._lock:
+            return self._gauges.get(name, 0)
+
+    def percentile(self, name: str, q: float) -> float | None:
+        """Return the q-th percentile (0-100) of recorded samples, or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def summary(self, name: str) -> dict:
+        """Return count, mean, p50, p95 and p99 for a sample series."""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return {"count": 0}
+
+        def pick(q):
+            return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+        return {
+            "count": len(samples),
+            "mean": sum(samples) / len(samples),
+            "p50": pick(50),
+            "p95": pick(95),
+            "p99": pick(99),
+        }
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """Return all counters, gauges and sample summaries whose name starts with prefix."""
+        with self._lock:
+            counters = {k: v for k, v in self._counters.items() if k.startswith(prefix)}
+            gauges = {k: v for k, v in self._gauges.items() if k.startswith(prefix)}
+            sample_names = [k for k in self._samples if k.startswith(prefix)]
+        return {
+            "counters": counters,
+            "gauges": gauges,
+            "latency": {name: self.summary(name) for name in sample_names},
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+
+# Process-wide registry
+METRICS = Metrics()
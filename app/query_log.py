@@ -0,0 +1,143 @@
+"""Sidecar log of executed SQL (the workload the index advisor mines).
+
+execute_query records every statement that ran successfully, as executed
+(after LIMIT pushdown and any optimizer rewrite). Statements are keyed by
+their normalized text, so a query the agent generates again and again is
+one row with an execution count and total execution time, and the log
+stays small.
+
+The agent logs through query_log_writer(): executions are queued and a
+background thread commits them in one transaction every
+QUERY_LOG_FLUSH_SECONDS, so a request never waits on the sidecar (or
+fails because it is locked or read-only). The log is best-effort
+telemetry: a batch that cannot be written is reported and dropped.
+"""
+
+import atexit
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import QUERY_LOG_FLUSH_SECONDS, QUERY_LOG_SUFFIX
+from app.metrics import METRICS, Metrics
+from app.retry_policy import normalize_sql
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS queries (
+    norm TEXT PRIMARY KEY,
+    sql TEXT NOT NULL,
+    executions INTEGER NOT NULL,
+    total_seconds REAL NOT NULL,
+    last_executed REAL NOT NULL
+);
+"""
+
+
+def default_log_path(db_path: str | Path) -> Path:
+    """Return the sidecar log path for a database (chinook.db -> chinook.queries.db)."""
+    return Path(db_path).with_suffix(QUERY_LOG_SUFFIX)
+
+
+def _open_log(log_path: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(log_path))
+    conn.executescript(_SCHEMA_SQL)
+    return conn
+
+
+def record_queries(log_path: str | Path, executions: list[tuple[str, float, float]]) -> None:
+    """Count (sql, seconds, executed_at) executions in one transaction."""
+    rows = []
+    for sql, seconds, executed_at in executions:
+        sql = sql.strip().rstrip(";")
+        rows.append((normalize_sql(sql), sql, seconds, executed_at))
+    conn = _open_log(log_path)
+    try:
+        conn.executemany(
+            "INSERT INTO queries (norm, sql, executions, total_seconds, last_executed) "
+            "VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (norm) DO UPDATE SET sql = excluded.sql, executions = executions + 1, "
+            "total_seconds = total_seconds + excluded.total_seconds, "
+            "last_executed = excluded.last_executed",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def record_query(log_path: str | Path, sql: str, seconds: float) -> None:
+    """Count one successful execution of sql taking seconds (synchronously)."""
+    record_queries(log_path, [(sql, seconds, time.time())])
+
+
+class QueryLogWriter:
+    """Queue executions and commit them in batches from a daemon thread."""
+
+    def __init__(self, log_path: str | Path, flush_seconds: float = QUERY_LOG_FLUSH_SECONDS,
+                 metrics: Metrics = METRICS):
+        self.log_path = log_path
+        self.flush_seconds = flush_seconds
+        self._metrics = metrics
+        self._pending: list[tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, sql: str, seconds: float) -> None:
+        """Queue one execution; returns immediately."""
+        with self._lock:
+            self._pending.append((sql, seconds, time.time()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        """Write everything queued so far (also run at exit)."""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                record_queries(self.log_path, batch)
+            except Exception as e:
+                print(f"  Query log write failed, {len(batch)} execution(s) dropped: {e}")
+                self._metrics.incr("query_log.errors")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+_writers: dict[str, QueryLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def query_log_writer(log_path: str | Path) -> QueryLogWriter:
+    """The process-wide writer for a log file (one per path, flushed at exit)."""
+    key = str(Path(log_path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = QueryLogWriter(log_path)
+            atexit.register(writer.flush)
+        return writer
+
+
+def load_workload(log_path: str | Path, limit: Optional[int] = None) -> list[dict]:
+    """Logged statements, most executed first, as {sql, executions, total_seconds}."""
+    if not Path(log_path).exists():
+        return []
+    conn = sqlite3.connect(f"file:{log_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT sql, executions, total_seconds FROM queries "
+            "ORDER BY executions DESC, total_seconds DESC LIMIT ?",
+            (-1 if limit is None else limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"sql": sql, "executions": n, "total_seconds": seconds} for sql, n, seconds in rows]
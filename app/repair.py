@@ -0,0 +1,174 @@
+"""Compact, diff-oriented repair prompts for the handle_error node.
+
+ERROR_REPAIR_GENERIC and ERROR_REPAIR_SQLCODER resend the whole
+schema_text with every retry, so a repair costs as much prefill as the
+original generation. The builder here keeps only what the fix needs:
+
+- the tables and columns the failed SQL references (plus their key
+  columns, so joins can still be written)
+- where the error is (line and caret for parse errors, the token SQLite
+  complained about)
+- for an unknown table or column, the closest-matching schema names
+
+and caps the schema part at REPAIR_TOKEN_BUDGET.
+"""
+
+import difflib
+import re
+
+import sqlglot
+from sqlglot import exp
+
+from app.config import REPAIR_TOKEN_BUDGET, ERROR_REPAIR_COMPACT, ERROR_REPAIR_SQLCODER
+from app.few_shot import estimate_tokens
+
+_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_UNKNOWN = re.compile(r"no such (table|column): ([\w.\"\[\]`]+)", re.IGNORECASE)
+_PARSE_POSITION = re.compile(r"Line (\d+), Col: (\d+)")
+_NEAR_TOKEN = re.compile(r'near "([^"]+)"')
+
+
+def referenced_identifiers(sql: str) -> tuple[set[str], set[str]]:
+    """Return (table names, column names) referenced in a SQL string.
+
+    Uses the sqlglot AST when the SQL parses; for SQL that does not (the
+    usual case for syntax errors) every identifier-like token is returned
+    in both sets and matched against the schema by the caller.
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="sqlite")
+    except (sqlglot.errors.ParseError, sqlglot.errors.TokenError):
+        tree = None
+    if tree is None:
+        tokens = set(_IDENTIFIER.findall(sql))
+        return tokens, tokens
+    tables = {t.name for t in tree.find_all(exp.Table)}
+    columns = {c.name for c in tree.find_all(exp.Column)}
+    return tables, columns
+
+
+def unknown_identifier(error: str) -> tuple[str, str] | None:
+    """Return (kind, name) from "no such table/column: X" errors, else None."""
+    match = _UNKNOWN.search(error or "")
+    if match is None:
+        return None
+    name = match.group(2).strip('"[]`')
+    return match.group(1).lower(), name.split(".")[-1]
+
+
+def error_location(sql: str, error: str) -> str:
+    """Point at the failing part of the SQL, or return "" if the error has no position."""
+    error = _ANSI.sub("", error or "")
+    lines = sql.splitlines() or [""]
+
+    position = _PARSE_POSITION.search(error)
+    if position is not None:
+        line_no, col = int(position.group(1)), int(position.group(2))
+        line = lines[min(line_no, len(lines)) - 1]
+        return f"{line}\n{' ' * max(col - 1, 0)}^"
+
+    near = _NEAR_TOKEN.search(error)
+    if near is not None:
+        token = near.group(1)
+        for line in lines:
+            index = line.find(token)
+            if index >= 0:
+                return f"{line}\n{' ' * index}^"
+    return ""
+
+
+def closest_matches(name: str, kind: str, schema_info: dict, n: int = 3) -> list[str]:
+    """Schema names closest to an unknown identifier ("Table" or "Table.Column TYPE")."""
+    if kind == "table":
+        candidates = {t: t for t in schema_info}
+    else:
+        candidates = {}
+        for table, info in schema_info.items():
+            for col in info["columns"]:
+                candidates.setdefault(col["name"], f"{table}.{col['name']} {col['type']}")
+    lowered = {c.lower(): c for c in candidates}
+    matches = difflib.get_close_matches(name.lower(), lowered, n=n, cutoff=0.5)
+    if kind == "table":
+        return [candidates[lowered[m]] for m in matches]
+    # Every table holding the matched column name
+    return [
+        f"{table}.{col['name']} {col['type']}"
+        for m in matches
+        for table, info in schema_info.items()
+        for col in info["columns"]
+        if col["name"] == lowered[m]
+    ][:n * 2]
+
+
+def build_compact_schema(schema_info: dict, sql: str, token_budget: int = REPAIR_TOKEN_BUDGET) -> str:
+    """CREATE TABLE lines for the tables in the failed SQL, restricted to used and key columns.
+
+    Tables are added in schema order until token_budget is reached. Falls
+    back to all columns of a table when none of its columns is referenced
+    (e.g. SELECT *).
+    """
+    tables, columns = referenced_identifiers(sql)
+    tables_lower = {t.lower() for t in tables}
+    columns_lower = {c.lower() for c in columns}
+
+    lines, used = [], 0
+    for table, info in schema_info.items():
+        if table.lower() not in tables_lower:
+            continue
+        keys = set(info.get("pk") or [])
+        for fk in info.get("fks", []):
+            keys.update(fk.get("constrained_columns", []))
+        cols = [c for c in info["columns"]
+                if c["name"].lower() in columns_lower or c["name"] in keys]
+        if not any(c["name"].lower() in columns_lower for c in info["columns"]):
+            cols = info["columns"]
+        col_defs = ", ".join(f"{c['name']} {c['type']}" for c in cols)
+        line = f"CREATE TABLE {table} ({col_defs});"
+        cost = estimate_tokens(line)
+        if lines and used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def build_repair_prompt(state: dict, schema_info: dict, model_name: str,
+                        token_budget: int = REPAIR_TOKEN_BUDGET) -> str:
+    """Build a compact repair prompt for the failed SQL in state.
+
+    sqlcoder keeps its own ERROR_REPAIR_SQLCODER layout (DEC-003) with the
+    compact schema; other models get ERROR_REPAIR_COMPACT.
+    """
+    sql = state["generated_sql"]
+    error = _ANSI.sub("", state.get("error", "") or state.get("validation_error", ""))
+    error = error.splitlines()[0] if error else ""
+
+    schema_text = build_compact_schema(schema_info, sql, token_budget)
+    unknown = unknown_identifier(error)
+    if unknown is not None:
+        kind, name = unknown
+        matches = closest_matches(name, kind, schema_info)
+        if matches:
+            schema_text += f"\n-- Closest matches for {kind} {name}: {', '.join(matches)}"
+        else:
+            schema_text += f"\n-- No {kind} similar to {name} exists"
+    if not schema_text.strip():
+        schema_text = "-- Tables: " + ", ".join(schema_info)
+
+    if "sqlcoder" in model_name:
+        return ERROR_REPAIR_SQLCODER.format(
+            schema_text=schema_text,
+            question=state["question"],
+            generated_sql=sql,
+            error=error,
+        )
+
+    location = error_location(sql, state.get("error", "") or state.get("validation_error", ""))
+    return ERROR_REPAIR_COMPACT.format(
+        question=state["question"],
+        generated_sql=sql,
+        error=error,
+        location=f"At:\n{location}\n\n" if location else "",
+        schema_text=schema_text,
+    )
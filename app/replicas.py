@@ -0,0 +1,215 @@
+"""Load balancing across Ollama replicas.
+
+OLLAMA_BASE_URLS lists one or more Ollama servers. ReplicaPool routes each
+LLM call to:
+
+1. a replica that is not ejected, preferring
+2. replicas that already have the model loaded (model affinity: a cold
+   replica pays several seconds of load time), then
+3. the fewest outstanding requests, rotating between ties.
+
+A background thread polls each replica's /api/ps every
+HEALTH_CHECK_INTERVAL_SECONDS, refreshing its loaded models. After
+REPLICA_EJECT_FAILURES consecutive failures (failed health checks or
+connection errors on real calls) a replica is ejected for
+REPLICA_EJECT_SECONDS; a successful health check brings it back early. A
+call that cannot reach its replica is retried once on each other replica
+before the error is raised.
+
+With a single URL this reduces to the previous behavior: every call goes
+to OLLAMA_BASE_URL.
+"""
+
+import itertools
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+import httpx
+
+from app.config import (
+    OLLAMA_BASE_URLS,
+    HEALTH_CHECK_INTERVAL_SECONDS,
+    HEALTH_CHECK_TIMEOUT_SECONDS,
+    REPLICA_EJECT_FAILURES,
+    REPLICA_EJECT_SECONDS,
+)
+from app.metrics import METRICS, Metrics
+
+T = TypeVar("T")
+
+# Errors meaning the replica could not be reached (not a model or prompt
+# problem); the ollama client raises ConnectionError for non-streaming calls
+REPLICA_ERRORS = (httpx.TransportError, ConnectionError)
+
+
+class Replica:
+    """State of one Ollama server."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.failures = 0                # Consecutive failures
+        self.ejected_until = 0.0         # time.time() until which no calls are routed here
+        self.loaded_models: set[str] = set()
+        self.last_check = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "url": self.url,
+            "available": self.available(now),
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+def fetch_loaded_models(url: str, timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS) -> set[str]:
+    """Models currently loaded on an Ollama server (GET /api/ps)."""
+    response = httpx.get(f"{url.rstrip('/')}/api/ps", timeout=timeout)
+    response.raise_for_status()
+    return {m.get("name") or m.get("model") for m in response.json().get("models", [])}
+
+
+class ReplicaPool:
+    """Least-outstanding routing with model affinity, health checks and ejection."""
+
+    def __init__(self, urls: list[str], metrics: Metrics = METRICS,
+                 check_interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+                 eject_failures: int = REPLICA_EJECT_FAILURES,
+                 eject_seconds: float = REPLICA_EJECT_SECONDS,
+                 fetch_models: Callable[[str], set[str]] = fetch_loaded_models):
+        if not urls:
+            raise ValueError("ReplicaPool needs at least one URL")
+        self.replicas = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self.eject_failures = eject_failures
+        self.eject_seconds = eject_seconds
+        self._fetch_models = fetch_models
+        self._metrics = metrics
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ── Routing ──────────────────────────────────────────────
+    def pick(self, model_name: str, exclude: frozenset[str] = frozenset()) -> Replica:
+        """Choose a replica for a call to model_name (does not reserve it).
+
+        Ejected replicas are only chosen when no other replica is left, so
+        calls still go somewhere when every replica looks unhealthy.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = [r for r in self.replicas if r.url not in exclude] or self.replicas
+            available = [r for r in candidates if r.available(now)] or candidates
+            offset = next(self._rotation)
+            n = len(self.replicas)
+            return min(available, key=lambda r: (
+                model_name not in r.loaded_models,
+                r.outstanding,
+                (self.replicas.index(r) - offset) % n,
+            ))
+
+    def call(self, model_name: str, fn: Callable[[str], T],
+             avoid: frozenset[str] = frozenset()) -> T:
+        """Run fn(base_url) on a chosen replica, failing over on connection errors.
+
+        Replicas in avoid (e.g. the one serving the primary of a hedged
+        call) are only used when no other replica is left.
+        """
+        tried: set[str] = set(avoid)
+        while True:
+            replica = self.pick(model_name, frozenset(tried))
+            tried.add(replica.url)
+            with self._lock:
+                replica.outstanding += 1
+            self._metrics.incr(f"replicas.{replica.url}.requests")
+            try:
+                result = fn(replica.url)
+            except REPLICA_ERRORS:
+                self.record_failure(replica)
+                if tried.issuperset(r.url for r in self.replicas):
+                    raise
+                self._metrics.incr("replicas.failover")
+                continue
+            finally:
+                with self._lock:
+                    replica.outstanding -= 1
+            self.record_success(replica, model_name)
+            return result
+
+    # ── Health ───────────────────────────────────────────────
+    def record_success(self, replica: Replica, model_name: Optional[str] = None) -> None:
+        with self._lock:
+            replica.failures = 0
+            replica.ejected_until = 0.0
+            if model_name:
+                # Ollama keeps the model loaded after serving it
+                replica.loaded_models.add(model_name)
+
+    def record_failure(self, replica: Replica) -> None:
+        with self._lock:
+            replica.failures += 1
+            eject = replica.failures >= self.eject_failures and replica.available(time.time())
+            if eject:
+                replica.ejected_until = time.time() + self.eject_seconds
+        if eject:
+            print(f"  Replica {replica.url} ejected for {self.eject_seconds:.0f}s")
+            self._metrics.incr("replicas.ejections")
+
+    def check(self, replica: Replica) -> bool:
+        """Poll one replica's /api/ps; returns True if it answered."""
+        try:
+            models = self._fetch_models(replica.url)
+        except Exception:
+            self.record_failure(replica)
+            return False
+        finally:
+            replica.last_check = time.time()
+        with self._lock:
+            replica.loaded_models = set(models)
+        self.record_success(replica)
+        return True
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            self.check(replica)
+        self._report()
+
+    def _report(self) -> None:
+        now = time.time()
+        self._metrics.set_gauge("replicas.available",
+                                sum(r.available(now) for r in self.replicas))
+
+    # ── Background thread ────────────────────────────────────
+    def start(self) -> None:
+        """Start the health-check thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.check_interval + 1)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.check_all()
+            self._stop.wait(self.check_interval)
+
+    def snapshot(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [r.as_dict(now) for r in self.replicas]
+
+
+# Process-wide pool over OLLAMA_BASE_URLS
+REPLICAS = ReplicaPool(OLLAMA_BASE_URLS)
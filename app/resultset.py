@@ -0,0 +1,147 @@
+"""Compact columnar query results.
+
+AgentState.results used to be a list of per-row lists: one list object
+per row plus one Python object per cell, converted again by the eval
+harness before comparison and serialization. ResultSet stores a result
+column-wise instead:
+
+- integer and float columns without NULLs as typed arrays (array.array
+  "q"/"d", 8 bytes per value, no per-cell objects)
+- any other column as a plain list of the driver's values, unchanged
+
+Rows are produced on demand by zipping the columns, so iteration, len()
+and indexing stay cheap, and ResultSet compares equal to a list of rows
+with the same values (existing callers and tests keep working). It is
+hashable for result comparison, serializes to JSON and CSV directly,
+and converts to an Arrow table without copying its typed columns
+(to_arrow, for st.dataframe and exports).
+"""
+
+import csv
+import io
+import json
+import sys
+from array import array
+from typing import Iterator, Optional, Sequence, TextIO
+
+import pyarrow as pa
+
+from app.frames import column_array
+
+_TYPECODES = {int: "q", float: "d"}
+_ARROW_TYPES = {"q": pa.int64(), "d": pa.float64()}
+
+
+def _pack_column(values: Sequence) -> array | list:
+    """Typed array for an all-int or all-float column, else a list."""
+    if values:
+        kind = type(values[0])
+        if kind in _TYPECODES and all(type(v) is kind for v in values):
+            try:
+                return array(_TYPECODES[kind], values)
+            except OverflowError:
+                pass
+    return list(values)
+
+
+class ResultSet:
+    """Query result stored as per-column arrays, with column names."""
+
+    __slots__ = ("columns", "_data", "_length", "_hash")
+
+    def __init__(self, columns: list[str], data: list[array | list]):
+        if len(columns) != len(data):
+            raise ValueError(f"{len(columns)} column names for {len(data)} columns")
+        self.columns = list(columns)
+        self._data = data
+        self._length = len(data[0]) if data else 0
+        self._hash: Optional[int] = None
+
+    @classmethod
+    def from_rows(cls, columns: list[str], rows: Sequence[Sequence]) -> "ResultSet":
+        """Build from driver rows (tuples, lists or SQLAlchemy Rows)."""
+        transposed = list(zip(*rows)) if rows else [() for _ in columns]
+        return cls(columns, [_pack_column(values) for values in transposed])
+
+    # ── Row access ───────────────────────────────────────────
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[tuple]:
+        if not self._data:
+            return iter(())
+        return zip(*self._data)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return ResultSet(self.columns, [column[index] for column in self._data])
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("ResultSet index out of range")
+        return tuple(column[index] for column in self._data)
+
+    def column(self, name: str) -> array | list:
+        """Values of one column (a typed array for numeric columns)."""
+        return self._data[self.columns.index(name)]
+
+    def rows(self) -> list[list]:
+        """Rows as lists (the previous AgentState layout)."""
+        return [list(row) for row in self]
+
+    # ── Comparison ───────────────────────────────────────────
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ResultSet):
+            return self.columns == other.columns and self._key() == other._key()
+        if isinstance(other, list):
+            return len(other) == self._length and all(
+                list(row) == list(expected) for row, expected in zip(self, other))
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash((tuple(self.columns), self._key()))
+        return self._hash
+
+    def _key(self) -> tuple:
+        return tuple(tuple(column) for column in self._data)
+
+    def __repr__(self) -> str:
+        return f"ResultSet(columns={self.columns}, rows={self._length})"
+
+    # ── Serialization ────────────────────────────────────────
+    def to_dict(self) -> dict:
+        return {"columns": self.columns, "rows": self.rows()}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), default=str)
+
+    def to_csv(self, out: Optional[TextIO] = None) -> Optional[str]:
+        """Write header and rows as CSV to out, or return them as a string."""
+        buffer = out if out is not None else io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        writer.writerows(self)
+        return None if out is not None else buffer.getvalue()
+
+    def to_arrow(self) -> pa.Table:
+        """Arrow table; typed columns are wrapped without copying."""
+        arrays = []
+        for column in self._data:
+            if isinstance(column, array):
+                arrays.append(pa.Array.from_buffers(_ARROW_TYPES[column.typecode], len(column),
+                                                    [None, pa.py_buffer(column)]))
+            else:
+                arrays.append(column_array(column))
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column data."""
+        size = 0
+        for column in self._data:
+            if isinstance(column, array):
+                size += column.itemsize * len(column)
+            else:
+                size += sys.getsizeof(column) + sum(sys.getsizeof(v) for v in column)
+        return size
@@ -0,0 +1,108 @@
+"""Adaptive retry policy for the handle_error loop.
+
+check_validation and should_retry used to retry any failure up to
+MAX_RETRIES. The policy here classifies each failure with the EXP-001
+error taxonomy (categorize_error in scripts/eval_harness.py, ED-3), gives
+each category its own repair budget (RETRY_BUDGETS) and stops early when
+the repaired SQL repeats a query that already failed, since another LLM
+call with the same prompt is unlikely to produce anything new.
+
+handle_error appends one entry per repair round to state["retry_history"];
+decide_retry() is called by the routing functions. It also stops when
+the request was cancelled, ran past its deadline, or has less time left
+than a typical LLM call (see app/cancellation.py).
+"""
+
+import re
+
+from app.cancellation import interruption, remaining_seconds
+from app.config import MAX_RETRIES, RETRY_BUDGETS, RETRY_MIN_SECONDS
+from app.metrics import METRICS, Metrics
+
+# Categories shared with categorize_error (EXP-001, ED-3), plus the two
+# failure kinds only the agent sees before execution
+CATEGORY_SCHEMA_LINKING = "schema_linking"
+CATEGORY_SYNTAX = "syntax"
+CATEGORY_DIALECT = "dialect"
+CATEGORY_HALLUCINATION = "hallucination"
+CATEGORY_BLOCKED = "blocked"
+CATEGORY_EMPTY = "empty"
+CATEGORY_UNKNOWN = "unknown"
+
+# stop_reason values (besides "" for a successful run)
+STOP_MAX_RETRIES = "max_retries"
+STOP_REPEATED_SQL = "repeated_sql"
+STOP_BUDGET = "budget_exhausted"
+STOP_LOW_TIME = "insufficient_time"
+
+
+def classify_error(error: str) -> str:
+    """Classify a validation or execution error message.
+
+    Same priority as categorize_error: schema linking before syntax before
+    dialect before hallucination.
+    """
+    err = (error or "").lower()
+    if not err:
+        return CATEGORY_UNKNOWN
+    if "write operation blocked" in err:
+        return CATEGORY_BLOCKED
+    if "empty sql" in err:
+        return CATEGORY_EMPTY
+    if "no such column" in err or "ambiguous" in err:
+        return CATEGORY_SCHEMA_LINKING
+    if "syntax error" in err or "parse" in err or "unexpected token" in err \
+            or "incomplete input" in err or "expecting" in err:
+        return CATEGORY_SYNTAX
+    if "no such function" in err or "not supported" in err or "unrecognized token" in err:
+        return CATEGORY_DIALECT
+    if "no such table" in err:
+        return CATEGORY_HALLUCINATION
+    return CATEGORY_UNKNOWN
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form used to detect repeated SQL across rounds."""
+    return re.sub(r"\s+", " ", (sql or "").strip().rstrip(";")).lower()
+
+
+def expected_llm_seconds(metrics: Metrics = METRICS) -> float:
+    """Typical LLM call time: median of observed calls, at least RETRY_MIN_SECONDS."""
+    return max(RETRY_MIN_SECONDS, metrics.percentile("llm.seconds", 50) or 0.0)
+
+
+def decide_retry(state) -> tuple[bool, str]:
+    """Decide whether another repair round is worth an LLM call.
+
+    Returns:
+        (True, category) to retry, or (False, stop_reason) to stop, where
+        stop_reason is the reason interruption() reports for a cancelled
+        or expired request ("cancelled" / "deadline_exceeded", defined in
+        app/cancellation.py), or this module's STOP_LOW_TIME,
+        STOP_MAX_RETRIES, STOP_REPEATED_SQL or "budget_exhausted:<category>".
+    """
+    error = state.get("error") or state.get("validation_error") or ""
+    category = classify_error(error)
+    history = state.get("retry_history") or []
+
+    interrupted = interruption(state.get("deadline"), state.get("cancel_token"))
+    if interrupted:
+        return False, interrupted
+    remaining = remaining_seconds(state.get("deadline"))
+    if remaining is not None and remaining < expected_llm_seconds():
+        return False, STOP_LOW_TIME
+    if state.get("retry_count", 0) >= MAX_RETRIES:
+        return False, STOP_MAX_RETRIES
+    if history and normalize_sql(state.get("generated_sql", "")) in {h["sql"] for h in history}:
+        return False, STOP_REPEATED_SQL
+
+    spent = sum(h["category"] == category for h in history)
+    if spent >= RETRY_BUDGETS.get(category, MAX_RETRIES):
+        return False, f"{STOP_BUDGET}:{category}"
+    return True, category
+
+
+def history_entry(state) -> dict:
+    """Record the failure a repair round is about to address (used by handle_error)."""
+    error = state.get("error") or state.get("validation_error") or ""
+    return {"sql": normalize_sql(state.get("generated_sql", "")), "category": classify_error(error)}
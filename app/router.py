@@ -0,0 +1,195 @@
+"""Question-difficulty router: picks the prompt strategy before generation.
+
+EXP-002 showed that the prompt strategy that works best depends on the
+question, while COT_PROMPT costs far more tokens than GENERIC_PROMPT. The
+router extracts a handful of features from the question and the
+schema_filter output (number of tables, aggregation words, negation, ...)
+and a nearest-centroid classifier maps them to zero-shot, few-shot or
+CoT. It is pure Python and trained from saved ablation results JSON
+(scripts/train_router.py); the model is a small JSON file.
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+from typing import Iterable
+
+from app.config import PROMPT_ZERO_SHOT, PROMPT_FEW_SHOT, PROMPT_COT, PROMPT_DYNAMIC_FEW_SHOT
+
+# Prompt strategies from cheapest to most expensive; ties go to the cheaper one
+ROUTES = [PROMPT_ZERO_SHOT, PROMPT_FEW_SHOT, PROMPT_COT]
+
+AGGREGATION_WORDS = {
+    "count", "many", "number", "total", "sum", "average", "avg", "mean",
+    "maximum", "minimum", "max", "min", "revenue", "spent",
+}
+GROUPING_WORDS = {"each", "per", "by", "every", "group"}
+SUPERLATIVE_WORDS = {"most", "least", "top", "best", "worst", "highest", "lowest"}
+NEGATION_WORDS = {"not", "never", "no", "without", "none", "nobody", "except"}
+COMPARISON_PHRASES = ("more than", "less than", "fewer than", "at least", "at most",
+                      "greater than", "only for", "only those")
+
+FEATURE_NAMES = [
+    "n_tables",
+    "n_words",
+    "aggregation",
+    "grouping",
+    "superlative",
+    "negation",
+    "comparison",
+    "numbers",
+]
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+# ──────────────────────────────────────────────────────────────
+# Features
+# ──────────────────────────────────────────────────────────────
+def extract_features(question: str, relevant_tables: Iterable[str] = ()) -> list[float]:
+    """Feature vector (ordered as FEATURE_NAMES) for a question.
+
+    relevant_tables is schema_filter's selection, including FK-related
+    tables, so it grows with the number of joins the question implies.
+    """
+    text = question.lower()
+    words = _WORD.findall(text)
+    word_set = set(words)
+    return [
+        float(len(list(relevant_tables))),
+        float(len(words)),
+        float(sum(w in AGGREGATION_WORDS for w in words)),
+        float(len(word_set & GROUPING_WORDS)),
+        float(len(word_set & SUPERLATIVE_WORDS)),
+        float(len(word_set & NEGATION_WORDS) + text.count("n't")),
+        float(sum(phrase in text for phrase in COMPARISON_PHRASES)),
+        float(sum(w.isdigit() for w in words)),
+    ]
+
+
+# ──────────────────────────────────────────────────────────────
+# Nearest-centroid classifier
+# ──────────────────────────────────────────────────────────────
+def train_router(samples: list[tuple[list[float], str]]) -> dict:
+    """Fit a nearest-centroid router on (features, route) samples.
+
+    Features are standardized with the training mean and standard
+    deviation so that word counts do not dominate binary-ish features.
+
+    Returns:
+        JSON-serializable model: feature names, mean, scale, centroids
+        per route and the number of training samples per route.
+    """
+    if not samples:
+        raise ValueError("Router needs at least one training sample")
+
+    n_features = len(FEATURE_NAMES)
+    columns = list(zip(*(features for features, _ in samples)))
+    mean = [sum(col) / len(col) for col in columns]
+    scale = [
+        math.sqrt(sum((v - m) ** 2 for v in col) / len(col)) or 1.0
+        for col, m in zip(columns, mean)
+    ]
+
+    grouped: dict[str, list[list[float]]] = {}
+    for features, route in samples:
+        scaled = [(v - m) / s for v, m, s in zip(features, mean, scale)]
+        grouped.setdefault(route, []).append(scaled)
+
+    centroids = {
+        route: [sum(vec[i] for vec in vectors) / len(vectors) for i in range(n_features)]
+        for route, vectors in grouped.items()
+    }
+    return {
+        "features": FEATURE_NAMES,
+        "mean": mean,
+        "scale": scale,
+        "centroids": centroids,
+        "counts": {route: len(vectors) for route, vectors in grouped.items()},
+    }
+
+
+def predict_route(model: dict, features: list[float]) -> str:
+    """Return the route whose centroid is nearest (ties go to the cheaper route)."""
+    scaled = [(v - m) / s for v, m, s in zip(features, model["mean"], model["scale"])]
+    best_route, best_distance = PROMPT_ZERO_SHOT, math.inf
+    for route in sorted(model["centroids"], key=_route_cost):
+        centroid = model["centroids"][route]
+        distance = sum((a - b) ** 2 for a, b in zip(scaled, centroid))
+        if distance < best_distance:
+            best_route, best_distance = route, distance
+    return best_route
+
+
+def save_router(model: dict, path: str | Path) -> None:
+    with open(path, "w") as f:
+        json.dump(model, f, indent=2)
+
+
+def load_router(path: str | Path) -> dict:
+    """Load a router model; rejects other feature sets and single-route models."""
+    with open(path) as f:
+        model = json.load(f)
+    if model.get("features") != FEATURE_NAMES:
+        raise ValueError(f"Router model {path} was trained on different features")
+    if len(model.get("centroids", {})) < 2:
+        raise ValueError(f"Router model {path} has fewer than two routes; it cannot route")
+    return model
+
+
+def _route_cost(route: str) -> int:
+    return ROUTES.index(route) if route in ROUTES else len(ROUTES)
+
+
+# ──────────────────────────────────────────────────────────────
+# Training data from ablation results (EXP-002 JSON)
+# ──────────────────────────────────────────────────────────────
+def route_labels_from_ablation(results: dict) -> dict[str, str]:
+    """Label each query with the cheapest prompt type reaching its best accuracy.
+
+    A prompt type scores one point per schema configuration (full,
+    selective) in which the query was execution-accurate. Dynamic few-shot
+    runs count as few-shot. Queries no configuration answered are labelled
+    zero-shot: a more expensive prompt did not help them.
+
+    Args:
+        results: Parsed ablation_results_*.json (scripts/run_ablation.py)
+
+    Returns:
+        dict mapping query_id -> route
+    """
+    scores: dict[str, dict[str, int]] = {}
+    for config_name, runs in results["detailed_results"].items():
+        prompt_type = next((p for p in sorted(ROUTES + [PROMPT_DYNAMIC_FEW_SHOT], key=len, reverse=True)
+                            if config_name.startswith(p + "_")), None)
+        if prompt_type is None:
+            continue
+        if prompt_type == PROMPT_DYNAMIC_FEW_SHOT:
+            prompt_type = PROMPT_FEW_SHOT
+        for run in runs:
+            per_query = scores.setdefault(run["query_id"], dict.fromkeys(ROUTES, 0))
+            per_query[prompt_type] += bool(run["execution_accurate"])
+
+    return {
+        query_id: max(ROUTES, key=lambda route: (per_query[route], -_route_cost(route)))
+        for query_id, per_query in scores.items()
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Graph node
+# ──────────────────────────────────────────────────────────────
+def make_route_question(model: dict):
+    """Create a route_question node that sets state["prompt_type"].
+
+    Runs after schema_filter so relevant_tables is available.
+    """
+
+    def route_question(state) -> dict:
+        features = extract_features(state["question"], state.get("relevant_tables") or [])
+        route = predict_route(model, features)
+        print(f"  Route: {route}")
+        return {"prompt_type": route}
+
+    return route_question
@@ -0,0 +1,119 @@
+"""Client-side admission control and priority scheduling for Ollama calls.
+
+An Ollama server processes at most OLLAMA_NUM_PARALLEL requests at
+once; extra requests queue inside the server with no notion of priority
+or deadline, and latency for everyone degrades. LLMScheduler keeps the
+number of in-flight calls at the servers' combined limit (per replica in
+OLLAMA_BASE_URLS, see app/replicas.py) and orders the rest:
+
+- lower priority values go first (PRIORITY_INTERACTIVE for the UI and API,
+  PRIORITY_BATCH for evaluation, ablation and batch jobs), FIFO within a
+  priority
+- a waiting call whose deadline passes or whose CancelToken is cancelled
+  leaves the queue with DeadlineExceeded / QueryCancelled instead of
+  reaching the server late
+
+The scheduler is per process: it orders calls made by the Streamlit
+sessions, API requests or scripts sharing SCHEDULER.
+
+Queue depth and in-flight count are gauges, wait time a latency series and
+dropped calls a counter in METRICS (prefix "llm.queue").
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.cancellation import CancelToken, check_interrupted, interruption, remaining_seconds
+from app.config import OLLAMA_BASE_URLS, OLLAMA_NUM_PARALLEL
+from app.metrics import METRICS, Metrics
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class LLMScheduler:
+    """Concurrency cap with a priority queue of waiting calls."""
+
+    def __init__(self, max_concurrency: int = OLLAMA_NUM_PARALLEL,
+                 metrics: Metrics = METRICS, name: str = "llm.queue"):
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._running = 0
+        self._metrics = metrics
+        self._name = name
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None,
+             cancel_token: Optional[CancelToken] = None) -> Iterator[None]:
+        """Hold one of max_concurrency slots for the duration of an LLM call.
+
+        Raises:
+            QueryCancelled / DeadlineExceeded if the call is cancelled or its
+            deadline passes while it is still queued
+        """
+        self.acquire(priority, deadline, cancel_token)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None,
+                cancel_token: Optional[CancelToken] = None) -> None:
+        check_interrupted(deadline, cancel_token)
+        t0 = time.time()
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            self._report()
+
+        # Wake the waiters so a cancelled call leaves the queue immediately
+        unregister = cancel_token.register(self._wake) if cancel_token else None
+        try:
+            with self._cond:
+                while self._waiting[0] != ticket or self._running >= self.max_concurrency:
+                    if interruption(deadline, cancel_token):
+                        self._waiting.remove(ticket)
+                        heapq.heapify(self._waiting)
+                        self._metrics.incr(f"{self._name}.dropped")
+                        self._report()
+                        self._cond.notify_all()
+                        check_interrupted(deadline, cancel_token)
+                    self._cond.wait(remaining_seconds(deadline))
+                heapq.heappop(self._waiting)
+                self._running += 1
+                self._report()
+                # Another slot may still be free for the next ticket
+                self._cond.notify_all()
+        finally:
+            if unregister is not None:
+                unregister()
+        self._metrics.observe(f"{self._name}.wait_seconds", time.time() - t0)
+
+    def release(self) -> None:
+        with self._cond:
+            self._running -= 1
+            self._report()
+            self._cond.notify_all()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+
+    def _report(self) -> None:
+        self._metrics.set_gauge(f"{self._name}.depth", len(self._waiting))
+        self._metrics.set_gauge(f"{self._name}.inflight", self._running)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"inflight": self._running, "queued": len(self._waiting),
+                    "max_concurrency": self.max_concurrency}
+
+
+# Process-wide scheduler for the Ollama replicas in OLLAMA_BASE_URLS
+SCHEDULER = LLMScheduler(OLLAMA_NUM_PARALLEL * len(OLLAMA_BASE_URLS))
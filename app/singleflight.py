@@ -0,0 +1,140 @@
+"""Single-flight coalescing of identical in-flight agent runs.
+
+A dashboard refresh or several users asking the same question at once
+would each run schema_filter, generate_sql and execute_query. SingleFlight
+lets the first caller for a key (normalized question, model, database)
+run the agent while concurrent callers with the same key wait for and
+share its result, or its exception.
+
+Cancellation: the shared run gets its own CancelToken. A caller whose own
+token is cancelled (or whose deadline passes) stops waiting with
+QueryCancelled and detaches, whichever way it left; the shared run is
+only cancelled once every attached caller has gone, so one impatient
+client cannot abort the others.
+"""
+
+import re
+import threading
+from typing import Callable, Hashable, Optional, TypeVar
+
+from app.cancellation import CancelToken, check_interrupted
+from app.metrics import METRICS, Metrics
+
+T = TypeVar("T")
+
+# How often waiting callers check their own token and deadline
+WAIT_POLL_SECONDS = 0.05
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question."""
+    return re.sub(r"\s+", " ", question or "").strip().rstrip("?.!").strip().lower()
+
+
+def flight_key(question: str, model_name: str, database: str) -> tuple[str, str, str]:
+    """Coalescing key: runs with equal keys produce the same answer."""
+    return normalize_question(question), model_name, database
+
+
+class _Flight:
+    """One in-flight run and the callers attached to it."""
+
+    def __init__(self):
+        self.token = CancelToken()
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+
+    def __init__(self, metrics: Metrics = METRICS, name: str = "singleflight"):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._metrics = metrics
+        self._name = name
+
+    def do(self, key: Hashable, fn: Callable[[CancelToken], T],
+           cancel_token: Optional[CancelToken] = None,
+           deadline: Optional[float] = None) -> tuple[T, bool]:
+        """Run fn(shared_token) once per key among concurrent callers.
+
+        Args:
+            key: coalescing key (see flight_key)
+            fn: the work; receives the shared run's CancelToken
+            cancel_token: this caller's token; cancelling it detaches the caller
+            deadline: this caller's deadline for waiting on a shared run
+
+        Returns:
+            (result, shared) where shared is True if this caller attached
+            to another caller's run
+
+        Raises:
+            Whatever fn raised, for every attached caller; QueryCancelled /
+            DeadlineExceeded if this caller gave up waiting
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            flight.waiters += 1
+        self._metrics.incr(f"{self._name}.calls")
+        if not leader:
+            self._metrics.incr(f"{self._name}.coalesced")
+
+        # Set once this caller has detached, so the token callback and the
+        # wait loop's exception path never both count it
+        detached = threading.Event()
+        unregister = (cancel_token.register(lambda: self._detach(key, flight, detached))
+                      if cancel_token else None)
+        try:
+            if leader:
+                try:
+                    flight.result = fn(flight.token)
+                except BaseException as e:
+                    flight.error = e
+                finally:
+                    with self._lock:
+                        if self._flights.get(key) is flight:
+                            del self._flights[key]
+                    flight.done.set()
+            else:
+                try:
+                    while not flight.done.wait(WAIT_POLL_SECONDS):
+                        check_interrupted(deadline, cancel_token)
+                except BaseException:
+                    # Deadline passed (or the wait was otherwise unwound)
+                    self._detach(key, flight, detached)
+                    raise
+        finally:
+            if unregister is not None:
+                unregister()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, not leader
+
+    def _detach(self, key: Hashable, flight: _Flight, detached: threading.Event) -> None:
+        """A caller gave up; cancel the shared run when nobody is left waiting."""
+        with self._lock:
+            if detached.is_set():
+                return
+            detached.set()
+            flight.waiters -= 1
+            abandoned = flight.waiters <= 0
+            if abandoned and self._flights.get(key) is flight:
+                # New callers start a fresh run instead of joining a cancelled one
+                del self._flights[key]
+        if abandoned:
+            flight.token.cancel()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+# Process-wide instance shared by Streamlit sessions
+FLIGHTS = SingleFlight()
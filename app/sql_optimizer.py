@@ -0,0 +1,202 @@
+"""Optimizer pass over validated SQL, verified on a sampled database.
+
+LLM SQL often uses patterns SQLite plans badly: NOT IN (subquery),
+correlated scalar subqueries, redundant DISTINCT, SELECT * in derived
+tables, joins to tables that contribute nothing. optimize_sql
+(app/sql_rewrite.py) proposes rewrites; SqlOptimizer adopts one only
+after checking it on a SampleDatabase:
+
+- the original and each candidate (sqlglot rules plus SQLite rewrites,
+  and the SQLite rewrites alone) run on the sample
+- a candidate must return the same rows (as a multiset) and the original
+  must return at least one, otherwise there is nothing to compare
+- the fastest equivalent candidate wins if it is at least
+  OPTIMIZER_MIN_SPEEDUP times faster than the original (best of
+  OPTIMIZER_TIMING_REPEATS runs)
+
+The adopted SQL keeps the original's result column names. Each adopted
+rewrite is logged with its speedup on the sample and recorded in METRICS
+("optimizer.rewritten", "optimizer.speedup"); rejected candidates count
+in "optimizer.rejected". Timings on the sample are an estimate of the
+speedup on the full database, not a measurement of it.
+
+The pass spends the request's own budget before execute_query starts, so
+it is skipped ("optimizer.skipped") when less than
+OPTIMIZER_MIN_REMAINING_SECONDS are left, and the whole verification is
+bounded by OPTIMIZER_MAX_SECONDS, the request deadline and its cancel
+token: sample statements are aborted when any of them runs out, and the
+original SQL is used.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import Engine, text
+
+from app.cancellation import CancelToken, interruption, remaining_seconds
+from app.config import (
+    OPTIMIZER_MAX_SECONDS,
+    OPTIMIZER_MIN_REMAINING_SECONDS,
+    OPTIMIZER_MIN_SPEEDUP,
+    OPTIMIZER_SAMPLE_ROWS,
+    OPTIMIZER_TIMING_REPEATS,
+    OPTIMIZER_VERIFY_SECONDS,
+)
+from app.metrics import METRICS, Metrics
+from app.sql_rewrite import SchemaFacts, optimize_sql, rename_outputs
+
+
+class SampleDatabase:
+    """In-memory SQLite copy of the schema and indexes with the first rows_per_table rows per table.
+
+    Built on first use. A prefix of each table keeps most foreign keys
+    resolvable (Chinook ids are dense), unlike a random sample.
+    """
+
+    def __init__(self, engine: Engine, rows_per_table: int = OPTIMIZER_SAMPLE_ROWS):
+        self.engine = engine
+        self.rows_per_table = rows_per_table
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        with self.engine.connect() as source:
+            objects = source.execute(text(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE type IN ('table', 'index') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+            )).fetchall()
+            tables = [o for o in objects if o.type == "table" and not o.sql.upper().startswith("CREATE VIRTUAL")]
+            for table in tables:
+                conn.execute(table.sql)
+                rows = source.execute(text(
+                    f"SELECT * FROM [{table.name}] LIMIT {self.rows_per_table}")).fetchall()
+                if rows:
+                    placeholders = ", ".join("?" * len(rows[0]))
+                    conn.executemany(f"INSERT INTO [{table.name}] VALUES ({placeholders})",
+                                     [tuple(row) for row in rows])
+            for index in objects:
+                if index.type == "index":
+                    try:
+                        conn.execute(index.sql)
+                    except sqlite3.Error:
+                        pass  # index on a skipped (virtual or shadow) table
+        conn.commit()
+        return conn
+
+    def run(self, sql: str, timeout: float = OPTIMIZER_VERIFY_SECONDS,
+            deadline: Optional[float] = None,
+            cancel_token: Optional[CancelToken] = None) -> tuple[list[str], list[tuple], float]:
+        """Execute sql on the sample; returns column names, rows and seconds.
+
+        The statement is aborted after timeout seconds, at deadline (a
+        time.time() value) or when cancel_token is cancelled; waiting for
+        another request's statement on the sample counts against them too.
+
+        Raises sqlite3.Error, including "interrupted" when aborted.
+        """
+        remaining = remaining_seconds(deadline)
+        wait = timeout if remaining is None else max(0.0, min(timeout, remaining))
+        if not self._lock.acquire(timeout=wait):
+            raise sqlite3.OperationalError("sample database busy")
+        try:
+            if self._conn is None:
+                self._conn = self._build()
+            stop_at = time.perf_counter() + timeout
+            self._conn.set_progress_handler(
+                lambda: time.perf_counter() > stop_at or bool(interruption(deadline, cancel_token)), 1000)
+            try:
+                t0 = time.perf_counter()
+                cursor = self._conn.execute(sql)
+                rows = cursor.fetchall()
+                elapsed = time.perf_counter() - t0
+            finally:
+                self._conn.set_progress_handler(None, 0)
+        finally:
+            self._lock.release()
+        return [d[0] for d in cursor.description], rows, elapsed
+
+
+class SqlOptimizer:
+    """Rewrite validated SQL into a faster equivalent verified on a sample."""
+
+    def __init__(self, engine: Engine, schema_info: dict, sample: Optional[SampleDatabase] = None,
+                 min_speedup: float = OPTIMIZER_MIN_SPEEDUP,
+                 repeats: int = OPTIMIZER_TIMING_REPEATS,
+                 max_seconds: float = OPTIMIZER_MAX_SECONDS, metrics: Metrics = METRICS):
+        self.schema_info = schema_info
+        self.facts = SchemaFacts(schema_info)
+        self.sample = sample if sample is not None else SampleDatabase(engine)
+        self.min_speedup = min_speedup
+        self.repeats = repeats
+        self.max_seconds = max_seconds
+        self._metrics = metrics
+
+    def _timed(self, sql: str, deadline: float,
+               cancel_token: Optional[CancelToken]) -> tuple[list[str], list[tuple], float]:
+        best = float("inf")
+        for _ in range(self.repeats):
+            names, rows, elapsed = self.sample.run(sql, deadline=deadline, cancel_token=cancel_token)
+            best = min(best, elapsed)
+        return names, rows, best
+
+    def candidates(self, sql: str) -> list[str]:
+        """Distinct proposed rewrites: with sqlglot's rules, then SQLite rewrites only."""
+        proposals = [optimize_sql(sql, self.schema_info, self.facts),
+                     optimize_sql(sql, self.schema_info, self.facts, rules=())]
+        return list(dict.fromkeys(p for p in proposals if p is not None))
+
+    def optimize(self, sql: str, deadline: Optional[float] = None,
+                 cancel_token: Optional[CancelToken] = None) -> Optional[dict]:
+        """Verified rewrite of sql as {sql, speedup, original_seconds, optimized_seconds}, or None.
+
+        None as well when the request (deadline, cancel_token) has too
+        little budget left for the pass or runs out during it.
+        """
+        remaining = remaining_seconds(deadline)
+        if interruption(deadline, cancel_token) or (
+                remaining is not None and remaining < OPTIMIZER_MIN_REMAINING_SECONDS):
+            self._metrics.incr("optimizer.skipped")
+            return None
+        candidates = self.candidates(sql)
+        if not candidates:
+            return None
+        pass_deadline = time.time() + self.max_seconds
+        if deadline is not None:
+            pass_deadline = min(pass_deadline, deadline)
+        try:
+            names, expected, original_seconds = self._timed(sql, pass_deadline, cancel_token)
+        except sqlite3.Error:
+            return None
+        if not expected:
+            return None
+        expected_rows = Counter(expected)
+
+        best = None
+        for candidate in candidates:
+            try:
+                candidate = rename_outputs(candidate, names)
+                candidate_names, rows, seconds = self._timed(candidate, pass_deadline, cancel_token)
+            except (sqlite3.Error, ValueError):
+                if interruption(pass_deadline, cancel_token):
+                    return None  # out of budget, not a rejected rewrite
+                self._metrics.incr("optimizer.rejected")
+                continue
+            if candidate_names != names or Counter(rows) != expected_rows:
+                self._metrics.incr("optimizer.rejected")
+                continue
+            if best is None or seconds < best["optimized_seconds"]:
+                best = {"sql": candidate, "optimized_seconds": seconds}
+
+        if best is None:
+            return None
+        speedup = original_seconds / max(best["optimized_seconds"], 1e-9)
+        if speedup < self.min_speedup:
+            self._metrics.incr("optimizer.rejected")
+            return None
+        self._metrics.incr("optimizer.rewritten")
+        self._metrics.observe("optimizer.speedup", speedup)
+        return {**best, "speedup": speedup, "original_seconds": original_seconds}
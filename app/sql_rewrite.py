@@ -0,0 +1,337 @@
+"""AST rewrites applied to validated SQL before execution.
+
+LIMIT pushdown: execute_query fetches only RESULT_MAX_ROWS rows, but for
+a query with ORDER BY SQLite still sorts the whole result before the
+first row comes out. A LIMIT on the outermost SELECT lets it keep a
+top-N sorter of RESULT_MAX_ROWS rows instead and stop early.
+
+The rewrite never changes the rows execute_query returns:
+
+- an existing literal LIMIT at or below the page size is kept; a larger
+  one is tightened (its OFFSET is kept)
+- a LIMIT that is not an integer literal is left alone
+- an aggregate without GROUP BY returns one row anyway and is not touched
+- only the outermost query is changed (for UNION/INTERSECT/EXCEPT, the
+  compound query as a whole), never a subquery or CTE
+
+Callers that need the full result (API pagination, exports) run
+generated_sql, not the rewritten executed_sql.
+
+Optimizer rewrites (optimize_sql, used by the optional optimize_query
+node through app/sql_optimizer.py): patterns LLMs write that SQLite
+plans badly, rewritten on the qualified AST with the schema from
+get_schema_info. sqlglot's own rules unnest correlated subqueries, merge
+derived tables and prune their SELECT * projections; on top of them:
+
+- x NOT IN (SELECT c ...) becomes NOT EXISTS (SELECT 1 ... AND c = x)
+  when x and c are NOT NULL columns (with a NULL on either side the two
+  forms differ)
+- DISTINCT is dropped inside IN/EXISTS subqueries, and on a single-table
+  SELECT that projects the table's whole primary key
+- a join that contributes no columns is removed when it can neither
+  filter nor duplicate rows: a LEFT JOIN on the joined table's full
+  primary key, or an inner join along a NOT NULL foreign key to it
+
+optimize_sql only proposes a rewrite; callers verify it before use.
+"""
+
+from typing import Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.dialects.dialect import Dialect
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer import optimize
+from sqlglot.optimizer.eliminate_ctes import eliminate_ctes
+from sqlglot.optimizer.eliminate_joins import eliminate_joins
+from sqlglot.optimizer.eliminate_subqueries import eliminate_subqueries
+from sqlglot.optimizer.merge_subqueries import merge_subqueries
+from sqlglot.optimizer.pushdown_predicates import pushdown_predicates
+from sqlglot.optimizer.pushdown_projections import pushdown_projections
+from sqlglot.optimizer.qualify import qualify
+from sqlglot.optimizer.simplify import simplify
+from sqlglot.optimizer.unnest_subqueries import unnest_subqueries
+from sqlglot.tokens import Token, TokenType
+
+
+def _single_row_aggregate(select: exp.Select) -> bool:
+    """SELECT with aggregate projections and no GROUP BY (always one row)."""
+    if select.args.get("group"):
+        return False
+    for projection in select.expressions:
+        for agg in projection.find_all(exp.AggFunc):
+            if agg.find_ancestor(exp.Window) is None and agg.find_ancestor(exp.Select) is select:
+                return True
+    return False
+
+
+def _literal_limit(query: exp.Query) -> Optional[int]:
+    """Value of the query's LIMIT if it is an integer literal, else None."""
+    limit = query.args.get("limit")
+    value = limit.expression if isinstance(limit, exp.Limit) else None
+    if isinstance(value, exp.Literal) and not value.is_string and value.this.isdigit():
+        return int(value.this)
+    return None
+
+
+def _outer_limit_count(tokens: list) -> Optional[Token]:
+    """The row-count token of the outermost LIMIT (LIMIT n, LIMIT n OFFSET m, LIMIT m, n)."""
+    depth, limit_at = 0, None
+    for i, token in enumerate(tokens):
+        if token.token_type == TokenType.L_PAREN:
+            depth += 1
+        elif token.token_type == TokenType.R_PAREN:
+            depth -= 1
+        elif token.token_type == TokenType.LIMIT and depth == 0:
+            limit_at = i
+    if limit_at is None:
+        return None
+    count = limit_at + 1
+    if count + 2 < len(tokens) and tokens[count + 1].token_type == TokenType.COMMA:
+        count += 2
+    return tokens[count] if tokens[count].token_type == TokenType.NUMBER else None
+
+
+def push_down_limit(sql: str, max_rows: int) -> Optional[str]:
+    """Return sql with its outermost LIMIT set to at most max_rows, or None if unchanged.
+
+    The decision is made on the sqlglot AST, but the SQL text is only
+    spliced (the LIMIT count replaced or a LIMIT appended), never
+    regenerated: SQLite names an unaliased result column after its text
+    as written, so count(*) must not come back as COUNT(*).
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="sqlite")
+        tokens = [t for t in Dialect.get_or_raise("sqlite").tokenize(sql)
+                  if t.token_type != TokenType.SEMICOLON]
+    except SqlglotError:
+        return None
+    if not isinstance(tree, (exp.Select, exp.SetOperation)):
+        return None
+    if isinstance(tree, exp.Select) and _single_row_aggregate(tree):
+        return None
+
+    if tree.args.get("limit") is not None:
+        current = _literal_limit(tree)
+        count = _outer_limit_count(tokens)
+        if current is None or current <= max_rows or count is None:
+            return None
+        return sql[:count.start] + str(max_rows) + sql[count.end + 1:]
+    return sql[:tokens[-1].end + 1] + f" LIMIT {max_rows}"
+
+
+# ──────────────────────────────────────────────────────────────
+# Optimizer rewrites
+# ──────────────────────────────────────────────────────────────
+# sqlglot rules run after the SQLite-specific rewrites below; simplify
+# cleans up what unnesting leaves behind (WHERE TRUE, NOT NOT). normalize
+# (CNF expansion) is left out: it reshapes predicates without making
+# SQLite faster.
+SQLGLOT_RULES = (
+    pushdown_projections,
+    unnest_subqueries,
+    pushdown_predicates,
+    eliminate_subqueries,
+    merge_subqueries,
+    eliminate_joins,
+    eliminate_ctes,
+    simplify,
+)
+
+
+def _is_rowid_alias(column: dict, pk: list[str]) -> bool:
+    """INTEGER PRIMARY KEY: an alias of the rowid, never NULL though reported nullable."""
+    return pk == [column["name"]] and str(column["type"]).upper() == "INTEGER"
+
+
+class SchemaFacts:
+    """What the rewrites need from get_schema_info, keyed by lower-case names."""
+
+    def __init__(self, schema_info: dict):
+        self.types = {
+            table.lower(): {c["name"].lower(): str(c["type"]) for c in info["columns"]}
+            for table, info in schema_info.items()
+        }
+        self.not_null = {
+            (table.lower(), c["name"].lower())
+            for table, info in schema_info.items()
+            for c in info["columns"]
+            if not c.get("nullable", True) or _is_rowid_alias(c, info["pk"])
+        }
+        self.pk = {table.lower(): {c.lower() for c in info["pk"]} for table, info in schema_info.items()}
+        # (table, column) -> (referred table, referred column) for single-column FKs
+        self.fks = {
+            (table.lower(), fk["constrained_columns"][0].lower()):
+                (fk["referred_table"].lower(), fk["referred_columns"][0].lower())
+            for table, info in schema_info.items()
+            for fk in info["fks"]
+            if len(fk["constrained_columns"]) == 1 and fk.get("referred_table")
+        }
+
+
+def table_aliases(tree: exp.Expression) -> Optional[dict]:
+    """alias -> table name over the whole tree; None if an alias is reused for different tables."""
+    aliases: dict[str, str] = {}
+    for table in tree.find_all(exp.Table):
+        alias, name = table.alias_or_name.lower(), table.name.lower()
+        if aliases.setdefault(alias, name) != name:
+            return None
+    return aliases
+
+
+def _column_table(column: exp.Column, aliases: dict) -> Optional[tuple[str, str]]:
+    table = aliases.get(column.table.lower()) if column.table else None
+    return (table, column.name.lower()) if table else None
+
+
+def _is_plain_select(query: exp.Expression) -> bool:
+    return (isinstance(query, exp.Select) and not query.args.get("group")
+            and not query.args.get("having") and not query.args.get("limit"))
+
+
+def _from_key() -> str:
+    return "from_" if "from_" in exp.Select.arg_types else "from"
+
+
+def not_in_to_not_exists(tree: exp.Expression, facts: SchemaFacts) -> exp.Expression:
+    """x NOT IN (SELECT c FROM ...) -> NOT EXISTS (SELECT 1 FROM ... WHERE ... AND c = x)."""
+    aliases = table_aliases(tree)
+    if aliases is None:
+        return tree
+    for node in list(tree.find_all(exp.Not)):
+        predicate = node.this
+        if not isinstance(predicate, exp.In) or not isinstance(predicate.args.get("query"), exp.Subquery):
+            continue
+        outer, inner = predicate.this, predicate.args["query"].this
+        if not isinstance(outer, exp.Column) or not _is_plain_select(inner) or len(inner.expressions) != 1:
+            continue
+        projected = inner.expressions[0].unalias()
+        if not isinstance(projected, exp.Column):
+            continue
+        if (_column_table(outer, aliases) not in facts.not_null
+                or _column_table(projected, aliases) not in facts.not_null):
+            continue
+        inner_sources = {t.alias_or_name.lower() for t in inner.find_all(exp.Table)}
+        if outer.table.lower() in inner_sources:
+            continue  # the outer column would be shadowed inside the subquery
+        exists = inner.copy()
+        exists.set("distinct", None)
+        exists.select(exp.Literal.number(1), append=False, copy=False)
+        exists.where(exp.EQ(this=projected.copy(), expression=outer.copy()), copy=False)
+        node.replace(exp.Not(this=exp.Exists(this=exists)))
+    return tree
+
+
+def drop_redundant_distinct(tree: exp.Expression, facts: SchemaFacts) -> exp.Expression:
+    """Remove DISTINCT where it cannot change the result."""
+    aliases = table_aliases(tree) or {}
+    for select in tree.find_all(exp.Select):
+        if not select.args.get("distinct") or select.args["distinct"].args.get("on"):
+            continue
+        parent = select.parent.parent if isinstance(select.parent, exp.Subquery) else select.parent
+        if isinstance(parent, exp.Exists) or (isinstance(parent, exp.In) and parent.args.get("query")
+                                              is select.parent):
+            select.set("distinct", None)
+            continue
+        source = select.args.get(_from_key())
+        if select.args.get("joins") or select.args.get("group") or source is None \
+                or not isinstance(source.this, exp.Table):
+            continue
+        table = aliases.get(source.this.alias_or_name.lower())
+        projected = {e.unalias().name.lower() for e in select.expressions
+                     if isinstance(e.unalias(), exp.Column)}
+        if table and facts.pk.get(table) and facts.pk[table] <= projected:
+            select.set("distinct", None)
+    return tree
+
+
+def _join_keys(on: exp.Expression, alias: str) -> Optional[list[tuple[exp.Column, exp.Column]]]:
+    """(joined column, other column) pairs if on is a conjunction of equalities across the join."""
+    pairs = []
+    for condition in on.flatten() if isinstance(on, exp.And) else [on]:
+        if not isinstance(condition, exp.EQ):
+            return None
+        left, right = condition.this, condition.expression
+        if not isinstance(left, exp.Column) or not isinstance(right, exp.Column):
+            return None
+        if right.table.lower() == alias:
+            left, right = right, left
+        if left.table.lower() != alias or right.table.lower() == alias:
+            return None
+        pairs.append((left, right))
+    return pairs
+
+
+def eliminate_unused_joins(tree: exp.Expression, facts: SchemaFacts) -> exp.Expression:
+    """Drop joins that contribute no columns and cannot filter or duplicate rows."""
+    aliases = table_aliases(tree)
+    if aliases is None:
+        return tree
+    for select in list(tree.find_all(exp.Select)):
+        for join in list(select.args.get("joins") or []):
+            joined = join.this
+            on = join.args.get("on")
+            if not isinstance(joined, exp.Table) or on is None or join.args.get("using"):
+                continue
+            side, kind = (join.side or "").upper(), (join.kind or "").upper()
+            if kind not in ("", "INNER", "OUTER") or side not in ("", "LEFT"):
+                continue
+            alias, table = joined.alias_or_name.lower(), joined.name.lower()
+            used = any(column.table.lower() == alias for column in tree.find_all(exp.Column)
+                       if column.find_ancestor(exp.Join) is not join)
+            if used:
+                continue
+            pairs = _join_keys(on, alias)
+            if not pairs or {c.name.lower() for c, _ in pairs} != facts.pk.get(table):
+                continue
+            if side != "LEFT":
+                # Inner join: every row must have exactly one match, i.e. the
+                # other side is a NOT NULL foreign key to this primary key
+                if not all(_column_table(other, aliases) in facts.not_null
+                           and facts.fks.get(_column_table(other, aliases)) == (table, mine.name.lower())
+                           for mine, other in pairs):
+                    continue
+            join.pop()
+    return tree
+
+
+def optimize_sql(sql: str, schema_info: dict, facts: Optional[SchemaFacts] = None,
+                 rules: tuple = SQLGLOT_RULES) -> Optional[str]:
+    """Proposed faster equivalent of a SELECT, or None if nothing changed or it does not qualify.
+
+    rules=() applies only the SQLite-specific rewrites.
+    """
+    facts = facts or SchemaFacts(schema_info)
+    try:
+        tree = sqlglot.parse_one(sql, read="sqlite")
+        if not isinstance(tree, (exp.Select, exp.SetOperation)):
+            return None
+        baseline = qualify(tree, schema=facts.types, dialect="sqlite", quote_identifiers=False)
+        tree = drop_redundant_distinct(baseline.copy(), facts)
+        if rules:
+            tree = optimize(tree, schema=facts.types, dialect="sqlite", rules=rules)
+        # After unnesting, so the NOT EXISTS stays a correlated probe
+        tree = not_in_to_not_exists(tree, facts)
+        tree = eliminate_unused_joins(tree, facts)
+    except (SqlglotError, KeyError, ValueError):
+        # The optimizer is best-effort: anything it cannot resolve runs as generated
+        return None
+    if tree == baseline:
+        return None
+    return tree.sql(dialect="sqlite")
+
+
+def rename_outputs(sql: str, names: list[str]) -> str:
+    """Alias the outermost projections of sql to names (the original result columns)."""
+    tree = sqlglot.parse_one(sql, read="sqlite")
+    select = tree
+    while isinstance(select, exp.SetOperation):
+        select = select.this
+    if len(select.expressions) != len(names):
+        raise ValueError(f"{len(select.expressions)} projections for {len(names)} names")
+    select.set("expressions", [
+        projection if projection.alias_or_name == name
+        else exp.alias_(projection.unalias(), name, quoted=not name.isidentifier())
+        for projection, name in zip(select.expressions, names)
+    ])
+    return tree.sql(dialect="sqlite")
@@ -0,0 +1,259 @@
+"""FTS5 value index for literal grounding of question terms.
+
+Questions mention literal values ("Brazil", "Jazz", "AC/DC") and the model
+has to guess which column holds them. This module keeps a sidecar SQLite
+database with an FTS5 table over the distinct values of every text column,
+and maps question n-grams to (table, column, value) hits so schema_filter
+can state exactly where each value lives.
+
+The index is built once and refreshed incrementally: each indexed column
+stores a fingerprint of its table (row count + max rowid), and only columns
+whose table changed are re-indexed on the next refresh.
+"""
+
+import re
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Callable
+
+from sqlalchemy import Engine, text
+
+from app.config import (
+    VALUE_INDEX_SUFFIX,
+    VALUE_INDEX_MAX_NGRAM,
+    VALUE_INDEX_MAX_HITS,
+    VALUE_INDEX_MAX_VALUE_LENGTH,
+    VALUE_INDEX_MAX_DISTINCT,
+)
+
+# Column types whose values are worth indexing (NVARCHAR, TEXT, CLOB, ...)
+TEXT_TYPE_MARKERS = ("CHAR", "TEXT", "CLOB")
+
+# Question words that never identify a value on their own
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "by", "with", "from",
+    "and", "or", "not", "no", "is", "are", "was", "were", "be", "has", "have",
+    "how", "many", "much", "what", "which", "who", "whose", "where", "when",
+    "list", "show", "find", "give", "get", "all", "each", "every", "any",
+    "top", "most", "least", "more", "less", "than", "total", "number",
+    "me", "my", "that", "this", "there", "their", "they", "it", "its",
+    "do", "does", "did", "ever", "never", "only", "per",
+}
+
+_SCHEMA_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS value_fts USING fts5(
+    value,
+    norm UNINDEXED,
+    tbl UNINDEXED,
+    col UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS value_index_meta (
+    tbl TEXT NOT NULL,
+    col TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    n_values INTEGER NOT NULL,
+    PRIMARY KEY (tbl, col)
+);
+"""
+
+
+def default_index_path(db_path: str | Path) -> Path:
+    """Return the sidecar index path for a database (chinook.db -> chinook.values.db)."""
+    return Path(db_path).with_suffix(VALUE_INDEX_SUFFIX)
+
+
+def normalize_value(value: str) -> str:
+    """Lowercase, strip diacritics and collapse punctuation to single spaces.
+
+    Mirrors the FTS5 unicode61 tokenizer so that "AC/DC" and "ac dc" or
+    "São Paulo" and "sao paulo" normalize to the same string.
+    """
+    decomposed = unicodedata.normalize("NFKD", value.lower())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(re.findall(r"[^\W_]+", stripped))
+
+
+def get_text_columns(schema_info: dict) -> list[tuple[str, str]]:
+    """Return (table, column) pairs for all text-typed columns in the schema."""
+    pairs = []
+    for table_name, info in schema_info.items():
+        for col in info["columns"]:
+            col_type = str(col.get("type", "")).upper()
+            if any(marker in col_type for marker in TEXT_TYPE_MARKERS):
+                pairs.append((table_name, col["name"]))
+    return pairs
+
+
+def _table_fingerprint(conn, table_name: str) -> str:
+    """Cheap change detector for a table: row count and max rowid."""
+    try:
+        row = conn.execute(text(f"SELECT COUNT(*), MAX(rowid) FROM [{table_name}]")).fetchone()
+    except Exception:
+        # WITHOUT ROWID tables have no rowid; fall back to the row count
+        row = conn.execute(text(f"SELECT COUNT(*), NULL FROM [{table_name}]")).fetchone()
+    return f"{row[0]}:{row[1]}"
+
+
+def _open_index(index_path: str | Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(index_path))
+    conn.executescript(_SCHEMA_SQL)
+    return conn
+
+
+def refresh_value_index(engine: Engine, schema_info: dict, index_path: str | Path) -> dict:
+    """Build or incrementally update the sidecar value index.
+
+    Columns whose table fingerprint is unchanged since the last refresh are
+    skipped, so calling this at every startup is cheap once the index exists.
+
+    Returns:
+        dict with counts of re-indexed, unchanged and skipped (too many
+        distinct values) columns, total values inserted, and elapsed seconds.
+    """
+    t0 = time.time()
+    stats = {"indexed": 0, "unchanged": 0, "skipped": 0, "values": 0, "seconds": 0.0}
+    text_columns = get_text_columns(schema_info)
+
+    index = _open_index(index_path)
+    try:
+        existing = {
+            (tbl, col): fp
+            for tbl, col, fp in index.execute("SELECT tbl, col, fingerprint FROM value_index_meta")
+        }
+
+        # Drop columns that no longer exist in the source schema
+        for tbl, col in set(existing) - set(text_columns):
+            index.execute("DELETE FROM value_fts WHERE tbl = ? AND col = ?", (tbl, col))
+            index.execute("DELETE FROM value_index_meta WHERE tbl = ? AND col = ?", (tbl, col))
+
+        with engine.connect() as conn:
+            fingerprints = {}
+            for table_name, col_name in text_columns:
+                if table_name not in fingerprints:
+                    fingerprints[table_name] = _table_fingerprint(conn, table_name)
+                fingerprint = fingerprints[table_name]
+
+                if existing.get((table_name, col_name)) == fingerprint:
+                    stats["unchanged"] += 1
+                    continue
+
+                rows = conn.execute(text(
+                    f"SELECT DISTINCT [{col_name}] FROM [{table_name}] "
+                    f"WHERE [{col_name}] IS NOT NULL AND length([{col_name}]) <= :max_len "
+                    f"LIMIT :cap"
+                ), {"max_len": VALUE_INDEX_MAX_VALUE_LENGTH, "cap": VALUE_INDEX_MAX_DISTINCT + 1}).fetchall()
+
+                index.execute("DELETE FROM value_fts WHERE tbl = ? AND col = ?", (table_name, col_name))
+                if len(rows) > VALUE_INDEX_MAX_DISTINCT:
+                    # Free-text columns (emails, notes) are not useful as filter values
+                    n_values = -1
+                    stats["skipped"] += 1
+                else:
+                    values = [(str(r[0]), normalize_value(str(r[0])), table_name, col_name) for r in rows]
+                    index.executemany(
+                        "INSERT INTO value_fts (value, norm, tbl, col) VALUES (?, ?, ?, ?)", values
+                    )
+                    n_values = len(values)
+                    stats["indexed"] += 1
+                    stats["values"] += n_values
+
+                index.execute(
+                    "INSERT OR REPLACE INTO value_index_meta (tbl, col, fingerprint, n_values) "
+                    "VALUES (?, ?, ?, ?)",
+                    (table_name, col_name, fingerprint, n_values),
+                )
+
+        index.commit()
+    finally:
+        index.close()
+
+    stats["seconds"] = time.time() - t0
+    return stats
+
+
+def question_ngrams(question: str, max_n: int = VALUE_INDEX_MAX_NGRAM) -> list[tuple[int, int, str]]:
+    """Return (start, end, ngram) spans of the normalized question, longest first.
+
+    N-grams made only of stopwords or digits are dropped; they would match
+    too many values to be useful as grounding.
+    """
+    tokens = normalize_value(question).split()
+    spans = []
+    for n in range(min(max_n, len(tokens)), 0, -1):
+        for start in range(len(tokens) - n + 1):
+            gram = tokens[start:start + n]
+            if all(t in STOPWORDS or t.isdigit() for t in gram):
+                continue
+            if n == 1 and len(gram[0]) < 2:
+                continue
+            spans.append((start, start + n, " ".join(gram)))
+    return spans
+
+
+def lookup_values(index_path: str | Path, question: str,
+                  max_hits: int = VALUE_INDEX_MAX_HITS) -> list[tuple[str, str, str]]:
+    """Map question n-grams to (table, column, value) hits.
+
+    A hit requires the whole normalized value to equal the n-gram, so
+    "Jazz" grounds Genre.Name = 'Jazz' but not every track title that
+    contains the word. Longer n-grams win: once "iron maiden" matches,
+    "iron" and "maiden" are not looked up on their own.
+    """
+    if not Path(index_path).exists():
+        return []
+
+    hits = []
+    seen = set()
+    covered = set()
+    conn = sqlite3.connect(f"file:{index_path}?mode=ro", uri=True)
+    try:
+        for start, end, gram in question_ngrams(question):
+            if covered.issuperset(range(start, end)):
+                continue
+            # The exact-norm filter must run in SQL: a common token can
+            # match far more values than the LIMIT, and the exact value
+            # may rank anywhere among them
+            rows = conn.execute(
+                "SELECT value, tbl, col FROM value_fts WHERE value_fts MATCH ? AND norm = ? LIMIT 50",
+                (f'value : "{gram}"', gram),
+            ).fetchall()
+            matched = False
+            for value, tbl, col in rows:
+                if (tbl, col, value) in seen:
+                    continue
+                seen.add((tbl, col, value))
+                hits.append((tbl, col, value))
+                matched = True
+            if matched:
+                covered.update(range(start, end))
+            if len(hits) >= max_hits:
+                break
+    finally:
+        conn.close()
+
+    return hits[:max_hits]
+
+
+def make_value_lookup(index_path: str | Path) -> Callable[[str], list[tuple[str, str, str]]]:
+    """Create a question -> hits lookup bound to a sidecar index (for schema_filter)."""
+
+    def value_lookup(question: str) -> list[tuple[str, str, str]]:
+        return lookup_values(index_path, question)
+
+    return value_lookup
+
+
+def format_value_hits(hits: list[tuple[str, str, str]]) -> str:
+    """Render hits as SQL comments for the schema context in prompts."""
+    by_value: dict[str, list[str]] = {}
+    for tbl, col, value in hits:
+        by_value.setdefault(value, []).append(f"{tbl}.{col}")
+
+    lines = ["-- Values mentioned in the question:"]
+    for value, locations in by_value.items():
+        quoted = value.replace("'", "''")
+        lines.append(f"-- '{quoted}' appears in {', '.join(locations)}")
+    return "\n".join(lines)
@@ -0,0 +1,141 @@
+"""Model warm-up and keep-alive.
+
+The first question after startup, or after Ollama evicted the model,
+waits several seconds for llama3.1:8b to load: the worst latency users
+see. ModelWarmer avoids it:
+
+- at agent build time each model gets a throwaway request (num_predict=1)
+  whose system message is the stable schema prefix, so the weights are
+  loaded and the prefix is already in Ollama's KV cache for the first
+  real question
+- every call sets keep_alive=OLLAMA_KEEP_ALIVE (create_llm), so Ollama
+  keeps the model resident instead of unloading it after 5 minutes idle
+- a background thread polls /api/ps on every replica and warms the
+  primary model (the first one, which answers every question) again when
+  it is no longer loaded (evicted by another model, server restart).
+  Cascade tiers after it are warmed once at startup but not kept loaded:
+  on a server that holds one model at a time, re-warming every tier
+  would just evict the others in turn
+
+warmup_status() exposes load state and the last warm-up time for the UI
+(check_ollama in app/main.py).
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+
+from app.config import HEALTH_CHECK_INTERVAL_SECONDS, OLLAMA_BASE_URLS
+from app.llm import build_messages, create_llm
+from app.metrics import METRICS, Metrics
+from app.replicas import fetch_loaded_models
+
+# User message of the warm-up request; any short text works
+WARMUP_QUESTION = "Reply with OK."
+
+_status_lock = threading.Lock()
+_status: dict[str, dict] = {}
+
+
+def warmup_status(model_name: str) -> dict:
+    """Load state of a model: loaded (True/False/None if unknown), warmup_seconds, warmed_at, error."""
+    with _status_lock:
+        return dict(_status.get(model_name, {"loaded": None, "warmup_seconds": None,
+                                             "warmed_at": None, "error": ""}))
+
+
+def _update_status(model_name: str, **fields) -> None:
+    with _status_lock:
+        entry = _status.setdefault(model_name, {"loaded": None, "warmup_seconds": None,
+                                                "warmed_at": None, "error": ""})
+        entry.update(fields)
+
+
+class ModelWarmer:
+    """Preload models, keep them resident and re-warm them after eviction."""
+
+    def __init__(self, models: list[str], prompt_prefix: Optional[str] = None,
+                 llm_factory: Callable[..., BaseChatModel] = create_llm,
+                 base_urls: list[str] = OLLAMA_BASE_URLS,
+                 fetch_models: Callable[[str], set[str]] = fetch_loaded_models,
+                 check_interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+                 metrics: Metrics = METRICS):
+        self.models = list(models)
+        self.prompt_prefix = prompt_prefix
+        self.base_urls = list(base_urls)
+        self.check_interval = check_interval
+        self._llm_factory = llm_factory
+        self._fetch_models = fetch_models
+        self._metrics = metrics
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, model_name: str, base_url: Optional[str] = None) -> Optional[float]:
+        """Send the warm-up request; returns its duration, or None if it failed."""
+        options = {"num_predict": 1}
+        if base_url is not None and len(self.base_urls) > 1:
+            options["base_url"] = base_url
+        # sqlcoder does not use the cached prefix layout (DEC-003)
+        if self.prompt_prefix and "sqlcoder" not in model_name:
+            prompt = build_messages(self.prompt_prefix, WARMUP_QUESTION)
+        else:
+            prompt = [HumanMessage(content=WARMUP_QUESTION)]
+
+        t0 = time.time()
+        try:
+            self._llm_factory(model_name, **options).invoke(prompt)
+        except Exception as e:
+            print(f"  Warm-up of {model_name} failed: {e}")
+            _update_status(model_name, error=str(e))
+            return None
+        elapsed = time.time() - t0
+        print(f"  Warmed up {model_name} in {elapsed:.1f}s")
+        self._metrics.observe(f"warmup.{model_name}.seconds", elapsed)
+        _update_status(model_name, loaded=True, warmup_seconds=elapsed, warmed_at=time.time(), error="")
+        return elapsed
+
+    def warm_all(self) -> None:
+        # Primary last, so it is the one left loaded if only one fits
+        for base_url in self.base_urls:
+            for model in reversed(self.models):
+                self.warm(model, base_url)
+
+    def check(self) -> None:
+        """Update load state; re-warm the primary model if /api/ps no longer lists it."""
+        for base_url in self.base_urls:
+            try:
+                loaded = self._fetch_models(base_url)
+            except Exception:
+                for model in self.models:
+                    _update_status(model, loaded=None)
+                continue
+            for model in self.models:
+                if model in loaded:
+                    _update_status(model, loaded=True)
+                    continue
+                _update_status(model, loaded=False)
+                if model == self.models[0]:
+                    self._metrics.incr(f"warmup.{model}.rewarms")
+                    self.warm(model, base_url)
+
+    # ── Background thread ────────────────────────────────────
+    def start(self) -> None:
+        """Warm all models, then keep checking, in a daemon thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.check_interval + 1)
+
+    def _run(self) -> None:
+        self.warm_all()
+        while not self._stop.wait(self.check_interval):
+            self.check()
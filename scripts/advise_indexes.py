@@ -0,0 +1,80 @@
+"""Recommend indexes for the logged query workload (app/index_advisor.py).
+
+Reads the query log next to the database (chinook.db -> chinook.queries.db,
+written by execute_query), ranks candidate indexes by estimated benefit
+and prints their CREATE INDEX statements. With --apply, writes a copy of
+the database with the indexes (chinook.db -> chinook.indexed.db) and
+times every logged statement on the original and the copy.
+
+Usage (from project root):
+    python scripts/advise_indexes.py [db_path] [--apply]
+"""
+
+import statistics
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DEFAULT_DB_PATH, INDEX_ADVISOR_MAX_QUERIES
+from app.database import create_db_engine, get_schema_info
+from app.index_advisor import advise_indexes, apply_indexes
+from app.query_log import default_log_path, load_workload
+
+REPEATS = 3
+
+
+def workload_seconds(db_path: Path, workload: list[dict]) -> float:
+    """Execution-weighted time of the workload (median of REPEATS per statement)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    total = 0.0
+    try:
+        for entry in workload:
+            timings = []
+            for _ in range(REPEATS):
+                t0 = time.perf_counter()
+                try:
+                    conn.execute(entry["sql"]).fetchall()
+                except sqlite3.Error:
+                    break
+                timings.append(time.perf_counter() - t0)
+            if timings:
+                total += statistics.median(timings) * entry["executions"]
+    finally:
+        conn.close()
+    return total
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--apply"]
+    db_path = Path(args[0]) if args else DEFAULT_DB_PATH
+    log_path = default_log_path(db_path)
+    workload = load_workload(log_path, INDEX_ADVISOR_MAX_QUERIES)
+    if not workload:
+        print(f"No logged queries in {log_path}")
+        return
+
+    schema_info = get_schema_info(create_db_engine(str(db_path)))
+    recommendations = advise_indexes(db_path, schema_info, workload)
+    executions = sum(entry["executions"] for entry in workload)
+    print(f"\n{len(workload)} statements ({executions} executions) from {log_path}\n")
+    if not recommendations:
+        print("No index improves the logged workload")
+        return
+    print(f"{'#':>2} {'Benefit (rows)':>15} {'Statements':>11} {'Executions':>11}  Index")
+    for i, r in enumerate(recommendations, 1):
+        print(f"{i:>2} {r['benefit']:>15,.0f} {r['statements']:>11} {r['executions']:>11}  {r['sql']}")
+
+    if "--apply" in sys.argv:
+        copy_path = apply_indexes(db_path, recommendations)
+        before = workload_seconds(db_path, workload)
+        after = workload_seconds(copy_path, workload)
+        print(f"\nWrote {copy_path}")
+        print(f"Workload time: {before * 1000:.1f}ms -> {after * 1000:.1f}ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
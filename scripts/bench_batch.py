@@ -0,0 +1,59 @@
+"""Batched prompting benchmark: throughput versus batch size.
+
+Runs the EXP-001 questions through app/batch.py at several batch sizes
+and reports questions per minute, how many questions were answered by
+the batch call (the rest fell back to the single-question agent) and
+execution accuracy against the EXP-001 ground truth. Batch size 1 is the
+one-prompt-per-question baseline.
+
+Usage (from project root, Ollama running):
+    python scripts/bench_batch.py               # sizes 1, 2, 4, 7, 14
+    python scripts/bench_batch.py 1 5 14
+"""
+
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DEFAULT_DB_PATH, DEFAULT_MODEL
+from app.database import create_db_engine
+from app.batch import build_batch_runner
+from scripts.eval_harness import compare_results
+from scripts.run_ablation import TEST_SUITE, compute_ground_truth
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1, 2, 4, 7, 14]
+
+    engine = create_db_engine(str(DEFAULT_DB_PATH))
+    ground_truth = compute_ground_truth(engine)
+    questions = [tq.question for tq in TEST_SUITE]
+    n = len(questions)
+
+    rows = []
+    for size in sizes:
+        print(f"\n--- batch size {size} ---")
+        run_batch = build_batch_runner(engine, DEFAULT_MODEL, batch_size=size)
+        t0 = time.time()
+        outcomes = run_batch(questions)
+        elapsed = time.time() - t0
+
+        ex = sum(compare_results(o["results"], ground_truth.get(tq.id), tq.id)
+                 for o, tq in zip(outcomes, TEST_SUITE))
+        from_batch = sum(o["source"] == "batch" for o in outcomes)
+        rows.append((size, elapsed, n / elapsed * 60, from_batch, ex))
+
+    print("\n" + "=" * 62)
+    print(f"  Batched prompting: {DEFAULT_MODEL}, {n} questions")
+    print("=" * 62)
+    print(f"{'Batch':>6} {'Wall':>9} {'Q/min':>8} {'From batch':>11} {'EX':>7}")
+    print("-" * 62)
+    for size, elapsed, qpm, from_batch, ex in rows:
+        print(f"{size:>6} {elapsed:>8.1f}s {qpm:>8.1f} {from_batch:>7}/{n:<3} {ex:>4}/{n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""LIMIT pushdown benchmark: execute_query time with and without the rewrite.
+
+execute_query fetches RESULT_MAX_ROWS rows. Without a LIMIT, SQLite
+still has to sort (or group and sort) the whole result before the first
+row is returned; with the pushed-down LIMIT it keeps a top-N sorter and
+stops early. Each query is run through run_query both ways on a scaled
+Chinook and the median of REPEATS runs is reported. The fetched rows are
+checked to be identical.
+
+Usage (from project root):
+    python scripts/bench_limit_pushdown.py            # factor 30
+    python scripts/bench_limit_pushdown.py 60
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.agent import run_query
+from app.config import RESULT_MAX_ROWS
+from app.database import create_db_engine
+from app.sql_rewrite import push_down_limit
+from scripts.scale_chinook import build_scaled_chinook
+
+REPEATS = 5
+
+QUERIES = {
+    "order by": "SELECT Name, Milliseconds FROM Track ORDER BY Milliseconds DESC",
+    "join + order by": (
+        "SELECT t.Name, a.Title, t.UnitPrice FROM Track t "
+        "JOIN Album a ON t.AlbumId = a.AlbumId ORDER BY t.Name"),
+    "group by + order by": (
+        "SELECT AlbumId, SUM(Milliseconds) AS total FROM Track "
+        "GROUP BY AlbumId ORDER BY total DESC"),
+    "no order by": "SELECT Name, Composer FROM Track",
+}
+
+
+def median_seconds(engine, sql: str) -> tuple[float, list]:
+    timings, rows = [], []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        rows = run_query(engine, sql)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings), rows
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    db_path = Path(tempfile.gettempdir()) / f"chinook_x{factor}.db"
+    if not db_path.exists():
+        print(f"Building {db_path}...")
+        build_scaled_chinook(factor, db_path)
+    engine = create_db_engine(str(db_path))
+
+    print("\n" + "=" * 66)
+    print(f"  run_query ({RESULT_MAX_ROWS} rows) on Chinook x{factor}, median of {REPEATS}")
+    print("=" * 66)
+    print(f"{'Query':<22} {'Before':>10} {'After':>10} {'Speedup':>9}  Same rows")
+    print("-" * 66)
+    for name, sql in QUERIES.items():
+        limited = push_down_limit(sql, RESULT_MAX_ROWS) or sql
+        before, expected = median_seconds(engine, sql)
+        after, rows = median_seconds(engine, limited)
+        print(f"{name:<22} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms "
+              f"{before / after:>8.1f}x  {rows == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Optimizer pass benchmark: LLM-style SQL before and after optimize_query.
+
+For each query, SqlOptimizer (app/sql_optimizer.py) proposes rewrites and
+verifies them on its sample; the adopted rewrite (if any) and the original
+are then timed through run_query on the full scaled Chinook, median of
+REPEATS runs. The sample speedup is what the agent logs; the full-database
+speedup shows how well it predicts the real one.
+
+Usage (from project root):
+    python scripts/bench_optimizer.py            # factor 30
+    python scripts/bench_optimizer.py 60
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.agent import run_query
+from app.database import create_db_engine, get_schema_info
+from app.sql_optimizer import SqlOptimizer
+from scripts.scale_chinook import build_scaled_chinook
+
+REPEATS = 5
+
+QUERIES = {
+    "NOT IN": "SELECT Name FROM Track WHERE TrackId NOT IN (SELECT TrackId FROM InvoiceLine)",
+    "correlated count": (
+        "SELECT a.Title, (SELECT COUNT(*) FROM Track t WHERE t.AlbumId = a.AlbumId) AS tracks "
+        "FROM Album a ORDER BY tracks DESC"),
+    "unused join": (
+        "SELECT COUNT(*) FROM Track t JOIN MediaType m ON t.MediaTypeId = m.MediaTypeId "
+        "LEFT JOIN Genre g ON t.GenreId = g.GenreId"),
+    "SELECT * subquery": (
+        "SELECT Name FROM (SELECT * FROM Track WHERE Milliseconds > 300000) t WHERE t.GenreId = 1"),
+    "redundant DISTINCT": "SELECT DISTINCT InvoiceId, CustomerId, Total FROM Invoice",
+}
+
+
+def median_seconds(engine, sql: str) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        run_query(engine, sql, max_rows=10**9)
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings)
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    db_path = Path(tempfile.gettempdir()) / f"chinook_x{factor}.db"
+    if not db_path.exists():
+        print(f"Building {db_path}...")
+        build_scaled_chinook(factor, db_path)
+    engine = create_db_engine(str(db_path))
+    optimizer = SqlOptimizer(engine, get_schema_info(engine))
+
+    print("\n" + "=" * 76)
+    print(f"  Full result via run_query on Chinook x{factor}, median of {REPEATS}")
+    print("=" * 76)
+    print(f"{'Query':<20} {'Adopted':>8} {'Sample':>8} {'Before':>10} {'After':>10} {'Speedup':>9}")
+    print("-" * 76)
+    for name, sql in QUERIES.items():
+        outcome = optimizer.optimize(sql)
+        before = median_seconds(engine, sql)
+        if outcome is None:
+            print(f"{name:<20} {'no':>8} {'-':>8} {before * 1000:>8.1f}ms {'-':>10} {'-':>9}")
+            continue
+        after = median_seconds(engine, outcome["sql"])
+        print(f"{name:<20} {'yes':>8} {outcome['speedup']:>7.1f}x {before * 1000:>8.1f}ms "
+              f"{after * 1000:>8.1f}ms {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
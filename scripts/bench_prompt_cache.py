@@ -0,0 +1,83 @@
+"""Prompt-eval benchmark: interleaved prompts vs cache-friendly layout.
+
+Sends the EXP-001 questions to Ollama twice: once with the original
+single-prompt layout (GENERIC_PROMPT with the per-question filtered
+schema), once with the stable-prefix layout (CACHED_PREFIX_GENERIC as the
+system message, question as a short suffix). Reports the prompt tokens
+Ollama actually evaluated and the prompt-eval time, read from the
+response metadata. With a stable prefix, every call after the first only
+evaluates the suffix.
+
+Usage (from project root, Ollama running):
+    python scripts/bench_prompt_cache.py [model_name]
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DEFAULT_DB_PATH, DEFAULT_MODEL, GENERIC_PROMPT, CACHED_PREFIX_GENERIC
+from app.database import create_db_engine, get_schema_info, get_sample_rows, build_schema_text
+from app.agent import make_schema_filter
+from app.llm import create_llm, build_cached_suffix, build_messages, prompt_eval_stats
+from scripts.run_ablation import TEST_SUITE
+
+
+def run_layout(llm, prompts: list) -> list[dict]:
+    """Invoke the LLM for each prompt and collect prompt-eval stats."""
+    stats = []
+    for tq, prompt in zip(TEST_SUITE, prompts):
+        response = llm.invoke(prompt)
+        s = prompt_eval_stats(response)
+        print(f"  [{tq.id}] evaluated {s['prompt_eval_count']:>5} tokens "
+              f"in {s['prompt_eval_seconds']:.2f}s")
+        stats.append(s)
+    return stats
+
+
+def summarize(name: str, stats: list[dict]) -> None:
+    steady = stats[1:] or stats
+    print(f"{name:<14} "
+          f"{sum(s['prompt_eval_count'] for s in steady) / len(steady):>10.0f} "
+          f"{sum(s['prompt_eval_seconds'] for s in steady) / len(steady):>11.2f}s "
+          f"{stats[0]['prompt_eval_seconds']:>10.2f}s "
+          f"{sum(s['prompt_eval_seconds'] for s in stats):>9.1f}s")
+
+
+def main():
+    model_name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL
+
+    engine = create_db_engine(str(DEFAULT_DB_PATH))
+    schema_info = get_schema_info(engine)
+    sample_tables = [t for t in schema_info.keys()
+                     if t in ("Artist", "Album", "Track", "Customer", "Invoice", "InvoiceLine")]
+    schema_filter = make_schema_filter(schema_info, get_sample_rows(engine, sample_tables))
+
+    interleaved, cached = [], []
+    prefix = CACHED_PREFIX_GENERIC.format(schema_text=build_schema_text(schema_info))
+    for tq in TEST_SUITE:
+        filtered = schema_filter({"question": tq.question})
+        interleaved.append(GENERIC_PROMPT.format(
+            schema_text=filtered["schema_text"], question=tq.question))
+        cached.append(build_messages(prefix, build_cached_suffix(
+            tq.question, relevant_tables=filtered["relevant_tables"])))
+
+    llm = create_llm(model_name)
+
+    print(f"Interleaved layout ({model_name})")
+    interleaved_stats = run_layout(llm, interleaved)
+    print(f"Cache-friendly layout ({model_name})")
+    cached_stats = run_layout(llm, cached)
+
+    print("=" * 62)
+    print(f"{'Layout':<14} {'Avg tokens':>10} {'Avg eval':>12} {'First':>11} {'Total':>10}")
+    print("-" * 62)
+    summarize("interleaved", interleaved_stats)
+    summarize("cached", cached_stats)
+    print("(Avg columns exclude the first call, which pays the full prefill.)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Result representation benchmark: Python row lists versus Arrow frames.
+
+Fetches a large result from a scaled Chinook (Track x30, about 105k rows)
+two ways and reports fetch + DataFrame time and memory:
+
+- lists: fetchall() into lists of Python lists, then pd.DataFrame(rows)
+  (the previous execute_query/UI path)
+- arrow: fetch_batches() into Arrow record batches (app/frames.py), then
+  to_pandas() for comparison; st.dataframe takes the table directly
+- resultset: the columnar ResultSet stored in AgentState
+  (app/resultset.py), then to_arrow().to_pandas()
+
+Python-heap memory is the tracemalloc peak; Arrow buffers live outside
+the Python heap and are reported with pyarrow.total_allocated_bytes().
+
+Usage (from project root):
+    python scripts/bench_results.py            # factor 30
+    python scripts/bench_results.py 60
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import pandas as pd
+import pyarrow as pa
+from sqlalchemy import text
+
+from app.database import create_db_engine
+from app.frames import fetch_batches
+from app.resultset import ResultSet
+from scripts.scale_chinook import build_scaled_chinook
+
+QUERY = "SELECT * FROM Track"
+
+
+def fetch_table(result) -> pa.Table:
+    """All rows of an executed statement as one Arrow table."""
+    tables = [pa.Table.from_batches([batch]) for batch in fetch_batches(result)]
+    # A column that is all NULL in the first batch is typed by a later one
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def measure(fn) -> tuple[float, int, int, object]:
+    """Run fn(); return (seconds, Python heap peak, Arrow bytes held, result)."""
+    arrow_before = pa.total_allocated_bytes()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, pa.total_allocated_bytes() - arrow_before, result
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    db_path = Path(tempfile.gettempdir()) / f"chinook_x{factor}.db"
+    if not db_path.exists():
+        print(f"Building {db_path}...")
+        build_scaled_chinook(factor, db_path)
+    engine = create_db_engine(str(db_path))
+
+    def lists():
+        with engine.connect() as conn:
+            rows = [list(row) for row in conn.execute(text(QUERY)).fetchall()]
+        return rows, pd.DataFrame(rows)
+
+    def arrow():
+        with engine.connect() as conn:
+            table = fetch_table(conn.execute(text(QUERY)))
+        return table, table.to_pandas()
+
+    def resultset():
+        with engine.connect() as conn:
+            result = conn.execute(text(QUERY))
+            rs = ResultSet.from_rows(list(result.keys()), result.fetchall())
+        return rs, rs.to_arrow().to_pandas()
+
+    print("\n" + "=" * 74)
+    print(f"  {QUERY} on Chinook x{factor}")
+    print("=" * 74)
+    print(f"{'Path':<9} {'Rows':>8} {'Fetch+frame':>12} {'Py heap peak':>14} {'Arrow bytes':>12} {'Held':>10}")
+    print("-" * 74)
+    for name, fn in (("lists", lists), ("arrow", arrow), ("resultset", resultset)):
+        elapsed, peak, arrow_bytes, (data, df) = measure(fn)
+        held = _list_bytes(data) if isinstance(data, list) else data.nbytes
+        print(f"{name:<9} {len(df):>8} {elapsed:>11.2f}s {peak / 2**20:>12.1f}MB "
+              f"{arrow_bytes / 2**20:>10.1f}MB {held / 2**20:>8.1f}MB")
+    print("\nHeld: memory of the retained result, including per-cell Python objects")
+
+
+def _list_bytes(rows: list[list]) -> int:
+    """Approximate size of a list-of-lists result including its cell objects."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+    return size
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Snapshot engine benchmark: file-backed versus in-memory snapshot mode.
+
+For Chinook and a scaled copy, reports for each engine mode:
+
+- startup: create_db_engine() plus the first query (for the snapshot,
+  the backup into memory)
+- latency: median and p95 of run_query over REPEATS runs per query, on
+  one thread
+- throughput: queries per second with THREADS threads sharing the engine
+
+The OS page cache is warm for the file engine (the file was just read),
+so the difference is the file layer itself: system calls, file locking
+and SQLite's per-connection page cache.
+
+Usage (from project root):
+    python scripts/bench_snapshot.py            # factor 30
+    python scripts/bench_snapshot.py 60
+"""
+
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.agent import run_query
+from app.config import DEFAULT_DB_PATH
+from app.database import create_db_engine
+from scripts.scale_chinook import build_scaled_chinook
+
+REPEATS = 200
+THREADS = 8
+
+QUERIES = {
+    "point lookup": "SELECT Name FROM Track WHERE TrackId = 1234",
+    "filter": "SELECT FirstName, LastName FROM Customer WHERE Country = 'Brazil'",
+    "join + group": (
+        "SELECT g.Name, COUNT(*) FROM Track t JOIN Genre g ON t.GenreId = g.GenreId "
+        "GROUP BY g.Name ORDER BY 2 DESC"),
+    "top-N": "SELECT Name FROM Track ORDER BY Milliseconds DESC LIMIT 20",
+}
+
+
+def startup_seconds(db_path: Path, mode: str) -> tuple[float, object]:
+    t0 = time.perf_counter()
+    engine = create_db_engine(str(db_path), mode=mode)
+    run_query(engine, "SELECT 1")
+    return time.perf_counter() - t0, engine
+
+
+def latency(engine, sql: str) -> tuple[float, float]:
+    timings = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        run_query(engine, sql)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def throughput(engine) -> float:
+    sqls = list(QUERIES.values())
+
+    def worker():
+        for i in range(REPEATS // 4):
+            run_query(engine, sqls[i % len(sqls)])
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return THREADS * (REPEATS // 4) / (time.perf_counter() - t0)
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    scaled = Path(tempfile.gettempdir()) / f"chinook_x{factor}.db"
+    if not scaled.exists():
+        print(f"Building {scaled}...")
+        build_scaled_chinook(factor, scaled)
+
+    for db_path in (DEFAULT_DB_PATH, scaled):
+        size = db_path.stat().st_size / 2**20
+        print("\n" + "=" * 70)
+        print(f"  {db_path.name} ({size:.1f}MB), {REPEATS} runs per query, {THREADS} threads")
+        print("=" * 70)
+        startup_seconds(db_path, "file")  # imports and first-use setup, not measured
+        engines = {}
+        for mode in ("file", "snapshot"):
+            seconds, engines[mode] = startup_seconds(db_path, mode)
+            print(f"  startup {mode:<9} {seconds * 1000:8.1f}ms")
+        print(f"\n{'Query':<14} {'file p50':>9} {'p95':>8} {'snap p50':>9} {'p95':>8} {'Speedup':>8}")
+        print("-" * 70)
+        for name, sql in QUERIES.items():
+            (f50, f95), (s50, s95) = latency(engines["file"], sql), latency(engines["snapshot"], sql)
+            print(f"{name:<14} {f50 * 1000:>7.2f}ms {f95 * 1000:>6.2f}ms "
+                  f"{s50 * 1000:>7.2f}ms {s95 * 1000:>6.2f}ms {f50 / s50:>7.2f}x")
+        file_qps, snapshot_qps = throughput(engines["file"]), throughput(engines["snapshot"])
+        print(f"\n  throughput: file {file_qps:.0f} q/s, snapshot {snapshot_qps:.0f} q/s")
+
+
+if __name__ == "__main__":
+    main()
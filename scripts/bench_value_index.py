@@ -0,0 +1,84 @@
+"""Value index benchmark: build, incremental refresh and lookup latency.
+
+Builds the FTS5 value index (app/value_index.py) over a scaled-up Chinook,
+then measures a no-op refresh, an incremental refresh after appending rows
+to one table, and lookup latency for the EXP-001 questions.
+
+Usage (from project root):
+    python scripts/bench_value_index.py            # factors 1, 10, 50
+    python scripts/bench_value_index.py 1 20 100
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import text
+
+from app.database import create_db_engine, get_schema_info
+from app.value_index import default_index_path, refresh_value_index, lookup_values
+from scripts.run_ablation import TEST_SUITE
+from scripts.scale_chinook import build_scaled_chinook
+
+
+def bench_factor(factor: int, workdir: Path) -> dict:
+    """Run the benchmark for one scale factor and return timings."""
+    db_path = build_scaled_chinook(factor, workdir / f"chinook_x{factor}.db")
+    index_path = default_index_path(db_path)
+    engine = create_db_engine(str(db_path))
+    schema_info = get_schema_info(engine)
+
+    full = refresh_value_index(engine, schema_info, index_path)
+    noop = refresh_value_index(engine, schema_info, index_path)
+
+    with engine.connect() as conn:
+        conn.execute(text(
+            "INSERT INTO Artist (Name) SELECT Name || ' (live)' FROM Artist LIMIT 100"
+        ))
+        conn.commit()
+    incremental = refresh_value_index(engine, schema_info, index_path)
+
+    lookup_ms = []
+    for tq in TEST_SUITE:
+        t0 = time.perf_counter()
+        lookup_values(index_path, tq.question)
+        lookup_ms.append((time.perf_counter() - t0) * 1000)
+    lookup_ms.sort()
+
+    return {
+        "factor": factor,
+        "values": full["values"],
+        "build_s": full["seconds"],
+        "noop_s": noop["seconds"],
+        "incremental_s": incremental["seconds"],
+        "incremental_cols": incremental["indexed"],
+        "index_mb": index_path.stat().st_size / 1e6,
+        "lookup_p50_ms": lookup_ms[len(lookup_ms) // 2],
+        "lookup_max_ms": lookup_ms[-1],
+    }
+
+
+def main():
+    factors = [int(a) for a in sys.argv[1:]] or [1, 10, 50]
+
+    print("=" * 78)
+    print("  Value index benchmark (FTS5 sidecar)")
+    print("=" * 78)
+    print(f"{'Factor':>6} {'Values':>9} {'Build':>8} {'No-op':>8} {'Incr':>8} "
+          f"{'Cols':>5} {'Size':>8} {'p50':>8} {'Max':>8}")
+    print("-" * 78)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for factor in factors:
+            r = bench_factor(factor, Path(tmp))
+            print(f"{r['factor']:>6} {r['values']:>9} {r['build_s']:>7.2f}s {r['noop_s']:>7.3f}s "
+                  f"{r['incremental_s']:>7.3f}s {r['incremental_cols']:>5} {r['index_mb']:>6.1f}MB "
+                  f"{r['lookup_p50_ms']:>6.2f}ms {r['lookup_max_ms']:>6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,13 @@ from dataclasses import dataclass, asdict
 from typing import Any, Optional
 from pathlib import Path
 
+from app.config import MAX_RETRIES
+from app.retry_policy import STOP_MAX_RETRIES
+from app.scheduler import PRIORITY_BATCH
+from app.hedging import hedge_stats
+from app.metrics import Metrics
+from app.resultset import ResultSet
+
 
 @dataclass
 class EvalResult:
@@ -28,6 +35,12 @@ class EvalResult:
     execution_accurate: bool = False
     post_processing_applied: bool = False
     retry_count: int = 0
+    handle_error_calls: int = 0
+    repair_seconds: float = 0.0
+    output_mode: Optional[str] = None
+    answered_by: Optional[str] = None
+    prompt_type: Optional[str] = None
+    stop_reason: Optional[str] = None
     latency_seconds: float = 0.0
     actual_result: Any = None
     error: Optional[str] = None
@@ -46,9 +59,11 @@ def check_sql_parsable(sql: str) -> bool:
 
 
 def to_plain(val):
-    """Convert SQLAlchemy Row objects to plain Python types."""
+    """Convert SQLAlchemy Row objects and ResultSets to plain Python types."""
     if val is None:
         return None
+    if isinstance(val, ResultSet):
+        return val.rows()
     if hasattr(val, '_mapping'):
         return tuple(val)
     if isinstance(val, list):
@@ -190,17 +205,32 @@ def run_evaluation(model_name: str, test_suite: list, ground_truth: dict,
             "validation_error": "",
             "results": None,
             "error": "",
+            "priority": PRIORITY_BATCH,
         }
 
         start = time.time()
         try:
             raw_sql_captured = None
+            output_mode = None
+            handle_error_calls = 0
+            repair_seconds = 0.0
             final_state = {}
 
+            # Each event arrives when its node finishes, so the gap since the
+            # previous event is that node's duration
+            last_event = time.time()
             for event in graph.stream(initial_state):
+                now = time.time()
+                node_seconds, last_event = now - last_event, now
                 for node_name, update in event.items():
-                    if node_name == "generate_sql":
+                    if node_name == "route_question":
+                        er.prompt_type = update.get("prompt_type")
+                    elif node_name == "generate_sql":
                         raw_sql_captured = update.get("generated_sql")
+                        output_mode = update.get("output_mode")
+                    elif node_name == "handle_error":
+                        handle_error_calls += 1
+                        repair_seconds += node_seconds
                     final_state.update(update)
 
             er.latency_seconds = time.time() - start
@@ -209,6 +239,11 @@ def run_evaluation(model_name: str, test_suite: list, ground_truth: dict,
             er.actual_result = final_state.get("results")
             er.error = final_state.get("error") or None
             er.retry_count = final_state.get("retry_count", 0)
+            er.handle_error_calls = handle_error_calls
+            er.repair_seconds = repair_seconds
+            er.output_mode = output_mode
+            er.answered_by = final_state.get("answered_by") or None
+            er.stop_reason = final_state.get("stop_reason") or None
 
             # Metrics
             er.raw_parsable = check_sql_parsable(er.raw_sql) if er.raw_sql else False
@@ -253,7 +288,10 @@ def run_evaluation(model_name: str, test_suite: list, ground_truth: dict,
         "Effective Parsability":   sum(r.effectively_parsable for r in eval_results),
         "Retry Rate":              sum(r.retry_count > 0 for r in eval_results),
         "Post-Processing Rate":    sum(r.post_processing_applied for r in eval_results),
+        "Structured Output":       sum(r.output_mode == "structured" for r in eval_results),
     }
+    handle_error_calls = sum(r.handle_error_calls for r in eval_results)
+    saved_calls = saved_llm_calls(eval_results)
     avg_latency = sum(r.latency_seconds for r in eval_results) / n if n else 0
 
     if verbose:
@@ -262,6 +300,13 @@ def run_evaluation(model_name: str, test_suite: list, ground_truth: dict,
         print(f"  {'─'*66}")
         for name, count in metrics.items():
             print(f"  {name:<28s} {count:>2}/{n}  ({count/n*100:5.1f}%)")
+        print(f"  {'Handle-Error Calls':<28s} {handle_error_calls:>2}")
+        print(f"  {'Saved LLM Calls':<28s} {saved_calls:>2}")
+        repairs = repair_stats(eval_results)
+        if repairs["repaired_queries"]:
+            print(f"  {'Repair Success':<28s} {repairs['repair_success']:>2}/{repairs['repaired_queries']}"
+                  f"  (accurate {repairs['repair_accurate']})")
+            print(f"  {'Avg Repair Latency':<28s} {repairs['avg_repair_latency']:>6.1f}s")
         print(f"  {'Avg Latency':<28s} {avg_latency:>6.1f}s")
 
         # Per-difficulty breakdown
@@ -272,11 +317,109 @@ def run_evaluation(model_name: str, test_suite: list, ground_truth: dict,
                 ex = sum(r.execution_accurate for r in subset)
                 lat = sum(r.latency_seconds for r in subset) / len(subset)
                 print(f"  {diff:<8s} EX={ex}/{len(subset)}  Avg latency={lat:.1f}s")
+
+        # Per-tier breakdown (cascade mode only)
+        tiers = tier_breakdown(eval_results)
+        if tiers:
+            print(f"  {'─'*66}")
+            for tier, t in tiers.items():
+                print(f"  {tier:<20s} answered={t['n']}  EX={t['execution_accuracy']}"
+                      f"  Avg latency={t['avg_latency']:.1f}s")
         print(f"{'='*70}")
 
     return eval_results
 
 
+def repair_stats(eval_results: list) -> dict:
+    """Success rate and latency of the handle_error loop.
+
+    Run the suite once with the full repair templates and once with
+    build_agent(compact_repair=True) and compare the two dicts.
+    repair_success counts repaired queries that ended up executing,
+    repair_accurate those that also matched the ground truth.
+    """
+    repaired = [r for r in eval_results if r.handle_error_calls > 0]
+    calls = sum(r.handle_error_calls for r in repaired)
+    return {
+        "repaired_queries": len(repaired),
+        "repair_calls": calls,
+        "repair_success": sum(r.effectively_parsable for r in repaired),
+        "repair_accurate": sum(r.execution_accurate for r in repaired),
+        "avg_repair_latency": sum(r.repair_seconds for r in repaired) / calls if calls else 0.0,
+    }
+
+
+def saved_llm_calls(eval_results: list) -> int:
+    """Repair calls the retry policy skipped compared to always retrying.
+
+    A query the policy stopped early (repeated SQL, exhausted category
+    budget) would otherwise have used MAX_RETRIES handle_error calls.
+    """
+    return sum(
+        MAX_RETRIES - r.handle_error_calls
+        for r in eval_results
+        if r.stop_reason and r.stop_reason != STOP_MAX_RETRIES
+    )
+
+
+def tier_breakdown(eval_results: list) -> dict:
+    """Group results by the cascade tier that answered (empty outside cascade mode)."""
+    tiers = {}
+    for r in eval_results:
+        if r.answered_by:
+            tiers.setdefault(r.answered_by, []).append(r)
+    return {
+        tier: {
+            "n": len(subset),
+            "execution_accuracy": sum(r.execution_accurate for r in subset),
+            "avg_latency": sum(r.latency_seconds for r in subset) / len(subset),
+        }
+        for tier, subset in tiers.items()
+    }
+
+
+def handle_error_savings(baseline: list, candidate: list) -> dict:
+    """Compare handle_error usage between two runs of the same test suite.
+
+    Typical use: baseline with free-text generation, candidate with
+    structured output. "eliminated" is the number of repair LLM calls the
+    candidate did not need; the syntax counts show how many of the
+    baseline's failures were raw parsability problems.
+    """
+    base_calls = sum(r.handle_error_calls for r in baseline)
+    cand_calls = sum(r.handle_error_calls for r in candidate)
+    return {
+        "baseline_handle_error_calls": base_calls,
+        "candidate_handle_error_calls": cand_calls,
+        "eliminated": base_calls - cand_calls,
+        "baseline_syntax_errors": sum(r.error_category == "syntax" for r in baseline),
+        "candidate_syntax_errors": sum(r.error_category == "syntax" for r in candidate),
+        "baseline_raw_unparsable": sum(bool(r.raw_sql) and not r.raw_parsable for r in baseline),
+        "candidate_raw_unparsable": sum(bool(r.raw_sql) and not r.raw_parsable for r in candidate),
+    }
+
+
+def latency_comparison(baseline: list, candidate: list) -> dict:
+    """Compare per-query latency percentiles between two runs of the same test suite.
+
+    Typical use: baseline without hedging, candidate with
+    build_agent(hedge=True); p99_improvement is the tail latency saved.
+    """
+    def percentiles(results: list) -> dict:
+        metrics = Metrics()
+        for r in results:
+            metrics.observe("latency", r.latency_seconds)
+        return metrics.summary("latency")
+
+    base, cand = percentiles(baseline), percentiles(candidate)
+    return {
+        "baseline": base,
+        "candidate": cand,
+        "p50_improvement": base.get("p50", 0.0) - cand.get("p50", 0.0),
+        "p99_improvement": base.get("p99", 0.0) - cand.get("p99", 0.0),
+    }
+
+
 def save_results(eval_results: list, output_path: Path) -> None:
     """Save evaluation results to JSON for later analysis."""
     data = {
@@ -288,12 +431,20 @@ def save_results(eval_results: list, output_path: Path) -> None:
             "effective_parsability": sum(r.effectively_parsable for r in eval_results),
             "retry_rate": sum(r.retry_count > 0 for r in eval_results),
             "post_processing_rate": sum(r.post_processing_applied for r in eval_results),
+            "structured_output_rate": sum(r.output_mode == "structured" for r in eval_results),
+            "handle_error_calls": sum(r.handle_error_calls for r in eval_results),
+            "saved_llm_calls": saved_llm_calls(eval_results),
+            "repair": repair_stats(eval_results),
             "avg_latency": sum(r.latency_seconds for r in eval_results) / len(eval_results)
                 if eval_results else 0,
         },
         "per_difficulty": {},
+        "per_tier": tier_breakdown(eval_results),
         "results": [],
     }
+    hedging = hedge_stats()
+    if hedging["calls"]:
+        data["hedging"] = hedging
 
     for diff in ["Easy", "Medium", "Hard"]:
         subset = [r for r in eval_results if r.difficulty == diff]
@@ -317,6 +468,12 @@ def save_results(eval_results: list, output_path: Path) -> None:
             "execution_accurate": r.execution_accurate,
             "post_processing_applied": r.post_processing_applied,
             "retry_count": r.retry_count,
+            "handle_error_calls": r.handle_error_calls,
+            "repair_seconds": round(r.repair_seconds, 2),
+            "output_mode": r.output_mode,
+            "answered_by": r.answered_by,
+            "prompt_type": r.prompt_type,
+            "stop_reason": r.stop_reason,
             "latency_seconds": round(r.latency_seconds, 2),
             "actual_result": _serialize_result(r.actual_result),
             "error": r.error,
@@ -333,6 +490,8 @@ def _serialize_result(result):
     """Convert result to JSON-serializable format."""
     if result is None:
         return None
+    if isinstance(result, ResultSet):
+        return result.rows()
     if isinstance(result, list):
         return [_serialize_result(r) for r in result]
     if isinstance(result, tuple):
@@ -1,7 +1,11 @@
 """EXP-002 Ablation Study Runner
 
 Systematic ablation study to measure the impact of prompt engineering choices.
-Tests prompt variants (zero-shot, few-shot, CoT) and schema context (full, selective).
+Tests prompt variants (zero-shot, few-shot, dynamic few-shot, CoT) and schema
+context (full, selective).
+
+Dynamic few-shot retrieves examples from a store seeded with
+data/few_shot_seed.json; a test question never retrieves itself.
 
 Usage (from project root):
     python scripts/run_ablation.py
@@ -12,6 +16,7 @@ Results saved to: data/experiments/s02_ablation/
 import sys
 import time
 import json
+import tempfile
 from pathlib import Path
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -29,6 +34,8 @@ from app.config import (
     PROMPT_ZERO_SHOT,
     PROMPT_FEW_SHOT,
     PROMPT_COT,
+    PROMPT_DYNAMIC_FEW_SHOT,
+    FEW_SHOT_SEED_PATH,
     SCHEMA_FULL,
     SCHEMA_SELECTIVE,
     get_ablation_prompt,
@@ -41,6 +48,8 @@ from app.database import (
     build_column_map,
     postprocess_sql,
 )
+from app.few_shot import load_seed_examples, retrieve_examples, format_examples
+from app.scheduler import PRIORITY_BATCH, SCHEDULER
 from scripts.eval_harness import compare_results, check_sql_parsable
 
 from langchain_ollama import ChatOllama
@@ -237,14 +246,30 @@ def run_single_query(
     llm: ChatOllama,
     column_map: dict,
     engine,
+    example_store: Path | None = None,
 ) -> dict:
-    """Run a single query and return results."""
+    """Run a single query and return results.
+
+    Latency includes example retrieval for PROMPT_DYNAMIC_FEW_SHOT, which is
+    also reported separately as retrieval_ms.
+    """
     prompt_template = get_ablation_prompt(prompt_type, model_name)
-    prompt = prompt_template.format(schema_text=schema_text, question=question)
 
     t0 = time.time()
+    retrieval_ms = 0.0
+    if prompt_type == PROMPT_DYNAMIC_FEW_SHOT and "sqlcoder" not in model_name:
+        t_retrieve = time.perf_counter()
+        examples = retrieve_examples(example_store, question, exclude_question=question)
+        retrieval_ms = (time.perf_counter() - t_retrieve) * 1000
+        prompt = prompt_template.format(
+            schema_text=schema_text, examples=format_examples(examples), question=question
+        )
+    else:
+        prompt = prompt_template.format(schema_text=schema_text, question=question)
+
     try:
-        response = llm.invoke(prompt)
+        with SCHEDULER.slot(PRIORITY_BATCH):
+            response = llm.invoke(prompt)
         latency = time.time() - t0
 
         raw_sql = response.content.strip()
@@ -270,7 +295,10 @@ def run_single_query(
             "results": results,
             "error": error,
             "latency": latency,
+            "retrieval_ms": retrieval_ms,
             "raw_parsable": check_sql_parsable(raw_sql),
+            # An execution error is what would send the agent to handle_error
+            "needs_retry": error is not None,
         }
 
     except Exception as e:
@@ -280,7 +308,9 @@ def run_single_query(
             "results": None,
             "error": str(e),
             "latency": time.time() - t0,
+            "retrieval_ms": retrieval_ms,
             "raw_parsable": False,
+            "needs_retry": True,
         }
 
 
@@ -292,6 +322,8 @@ ABLATION_CONFIGS = [
     {"prompt_type": PROMPT_ZERO_SHOT, "schema_type": SCHEMA_SELECTIVE},
     {"prompt_type": PROMPT_FEW_SHOT, "schema_type": SCHEMA_FULL},
     {"prompt_type": PROMPT_FEW_SHOT, "schema_type": SCHEMA_SELECTIVE},
+    {"prompt_type": PROMPT_DYNAMIC_FEW_SHOT, "schema_type": SCHEMA_FULL},
+    {"prompt_type": PROMPT_DYNAMIC_FEW_SHOT, "schema_type": SCHEMA_SELECTIVE},
     {"prompt_type": PROMPT_COT, "schema_type": SCHEMA_FULL},
     {"prompt_type": PROMPT_COT, "schema_type": SCHEMA_SELECTIVE},
 ]
@@ -324,6 +356,10 @@ def main():
     # Full schema text (for SCHEMA_FULL)
     full_schema_text = build_schema_text(schema_info)
 
+    # Seed-only example store (for PROMPT_DYNAMIC_FEW_SHOT)
+    example_store = Path(tempfile.mkdtemp()) / "ablation.examples.db"
+    load_seed_examples(example_store, FEW_SHOT_SEED_PATH)
+
     # Results storage
     all_results = {}
 
@@ -354,6 +390,7 @@ def main():
                 llm=llm,
                 column_map=column_map,
                 engine=engine,
+                example_store=example_store,
             )
 
             # Check accuracy
@@ -375,25 +412,30 @@ def main():
     print("\n" + "=" * 70)
     print("  ABLATION RESULTS SUMMARY")
     print("=" * 70)
-    print(f"{'Configuration':<30} {'EX':>5} {'VV':>5} {'Latency':>8}")
-    print("-" * 50)
+    print(f"{'Configuration':<30} {'EX':>5} {'VV':>5} {'Retry':>5} {'Latency':>8} {'Retrieval':>10}")
+    print("-" * 68)
 
     summary_data = []
     for config_name, results in all_results.items():
         ex = sum(r["execution_accurate"] for r in results)
         vv = sum(r["raw_parsable"] for r in results)
+        retry = sum(r["needs_retry"] for r in results)
         avg_lat = sum(r["latency"] for r in results) / len(results)
-        print(f"{config_name:<30} {ex:>2}/14 {vv:>2}/14 {avg_lat:>7.1f}s")
+        avg_retrieval = sum(r["retrieval_ms"] for r in results) / len(results)
+        print(f"{config_name:<30} {ex:>2}/14 {vv:>2}/14 {retry:>2}/14 {avg_lat:>7.1f}s "
+              f"{avg_retrieval:>8.2f}ms")
         summary_data.append({
             "config": config_name,
             "execution_accuracy": ex,
             "syntax_validity": vv,
+            "retries": retry,
             "avg_latency": round(avg_lat, 2),
+            "avg_retrieval_ms": round(avg_retrieval, 3),
         })
 
     # Best configuration
     best = max(summary_data, key=lambda x: x["execution_accuracy"])
-    print("-" * 50)
+    print("-" * 68)
     print(f"Best: {best['config']} (EX={best['execution_accuracy']}/14)")
 
     # Save results
@@ -417,6 +459,8 @@ def main():
                     "execution_accurate": r["execution_accurate"],
                     "raw_parsable": r["raw_parsable"],
                     "latency": round(r["latency"], 2),
+                    "retrieval_ms": round(r["retrieval_ms"], 3),
+                    "needs_retry": r["needs_retry"],
                     "final_sql": r["final_sql"],
                     "error": r["error"],
                 }
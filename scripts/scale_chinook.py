@@ -0,0 +1,69 @@
+"""Scaled-up Chinook builder for benchmarks.
+
+Copies chinook.db and multiplies every table that has a single INTEGER
+primary key by a scale factor. Copies get fresh primary keys and text
+values suffixed with " #k", so distinct-value counts grow with the factor;
+foreign keys keep pointing at the original rows, which keeps joins valid.
+
+Usage (from project root):
+    python scripts/scale_chinook.py 20 /tmp/chinook_x20.db
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DEFAULT_DB_PATH
+
+
+def build_scaled_chinook(factor: int, dst_path: str | Path,
+                         src_path: str | Path = DEFAULT_DB_PATH) -> Path:
+    """Write a copy of src_path scaled by `factor` to dst_path and return its path."""
+    dst_path = Path(dst_path)
+    if dst_path.exists():
+        dst_path.unlink()
+
+    src = sqlite3.connect(str(src_path))
+    dst = sqlite3.connect(str(dst_path))
+    src.backup(dst)
+    src.close()
+
+    tables = [r[0] for r in dst.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+    for table in tables:
+        columns = dst.execute(f"PRAGMA table_info([{table}])").fetchall()
+        pk_cols = [c for c in columns if c[5] > 0]
+        if len(pk_cols) != 1 or "INT" not in pk_cols[0][2].upper():
+            continue  # Junction tables (PlaylistTrack) keep their original size
+        pk = pk_cols[0][1]
+        max_id = dst.execute(f"SELECT MAX([{pk}]) FROM [{table}]").fetchone()[0] or 0
+
+        for k in range(1, factor):
+            select_exprs = []
+            for _, name, col_type, _, _, _ in columns:
+                if name == pk:
+                    select_exprs.append(f"[{name}] + {k * max_id}")
+                elif any(m in col_type.upper() for m in ("CHAR", "TEXT", "CLOB")):
+                    select_exprs.append(f"[{name}] || ' #{k}'")
+                else:
+                    select_exprs.append(f"[{name}]")
+            col_list = ", ".join(f"[{c[1]}]" for c in columns)
+            dst.execute(
+                f"INSERT INTO [{table}] ({col_list}) "
+                f"SELECT {', '.join(select_exprs)} FROM [{table}] WHERE [{pk}] <= {max_id}"
+            )
+    dst.commit()
+    dst.close()
+    return dst_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python scripts/scale_chinook.py <factor> <output.db>")
+        sys.exit(1)
+    out = build_scaled_chinook(int(sys.argv[1]), sys.argv[2])
+    print(f"Scaled Chinook written to {out}")
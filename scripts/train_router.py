@@ -0,0 +1,117 @@
+"""Train the question-difficulty router from EXP-002 ablation results.
+
+Each EXP-001 question is labelled with the cheapest prompt type that
+reached its best accuracy in the ablation JSON (route_labels_from_ablation),
+features come from the question and the agent's schema_filter selection,
+and a nearest-centroid model is saved to ROUTER_MODEL_PATH. Nothing is
+saved when every question gets the same label: such a model could only
+ever pick one prompt type.
+
+Also reports leave-one-out routing on the ablation data: execution
+accuracy and latency the agent would have had with routed prompts
+compared to always using one prompt type.
+
+Usage (from project root):
+    python scripts/train_router.py [ablation_results.json]
+
+Defaults to the latest file in data/experiments/s02_ablation/.
+"""
+
+import sys
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.config import DEFAULT_DB_PATH, ROUTER_MODEL_PATH
+from app.database import create_db_engine, get_schema_info
+from app.agent import make_schema_filter
+from app.router import (
+    ROUTES,
+    extract_features,
+    train_router,
+    predict_route,
+    save_router,
+    route_labels_from_ablation,
+)
+from scripts.run_ablation import TEST_SUITE
+
+ABLATION_DIR = PROJECT_ROOT / "data" / "experiments" / "s02_ablation"
+
+
+def per_route_outcomes(results: dict) -> dict:
+    """Mean accuracy and latency per (query_id, route) over schema configurations."""
+    outcomes = {}
+    for config_name, runs in results["detailed_results"].items():
+        route = next((r for r in ROUTES if config_name == r or config_name.startswith(r + "_")), None)
+        if route is None:
+            continue
+        for run in runs:
+            o = outcomes.setdefault((run["query_id"], route), {"ex": [], "latency": []})
+            o["ex"].append(float(run["execution_accurate"]))
+            o["latency"].append(run["latency"])
+    return {key: {"ex": sum(o["ex"]) / len(o["ex"]),
+                  "latency": sum(o["latency"]) / len(o["latency"])}
+            for key, o in outcomes.items()}
+
+
+def main():
+    if len(sys.argv) > 1:
+        results_path = Path(sys.argv[1])
+    else:
+        results_path = sorted(ABLATION_DIR.glob("ablation_results_*.json"))[-1]
+    with open(results_path) as f:
+        results = json.load(f)
+    print(f"Ablation results: {results_path.name}")
+
+    engine = create_db_engine(str(DEFAULT_DB_PATH))
+    schema_filter = make_schema_filter(get_schema_info(engine), {})
+
+    labels = route_labels_from_ablation(results)
+    samples = {}
+    for tq in TEST_SUITE:
+        if tq.id not in labels:
+            continue
+        selection = schema_filter({"question": tq.question})["relevant_tables"]
+        samples[tq.id] = (extract_features(tq.question, selection), labels[tq.id])
+
+    # Leave-one-out: route each question with a model trained on the others
+    outcomes = per_route_outcomes(results)
+    routed = {}
+    for query_id, (features, _) in samples.items():
+        others = [s for qid, s in samples.items() if qid != query_id]
+        routed[query_id] = predict_route(train_router(others), features) if others else ROUTES[0]
+
+    def score(choice: dict) -> tuple[float, float]:
+        picked = [outcomes[(qid, route)] for qid, route in choice.items() if (qid, route) in outcomes]
+        return (sum(o["ex"] for o in picked),
+                sum(o["latency"] for o in picked) / len(picked) if picked else 0.0)
+
+    print("=" * 52)
+    print(f"{'Strategy':<22} {'EX':>8} {'Avg latency':>14}")
+    print("-" * 52)
+    for route in ROUTES:
+        ex, latency = score({qid: route for qid in samples})
+        print(f"{'always ' + route:<22} {ex:>5.1f}/{len(samples)} {latency:>13.2f}s")
+    ex, latency = score(routed)
+    print(f"{'routed (LOO)':<22} {ex:>5.1f}/{len(samples)} {latency:>13.2f}s")
+    ex, latency = score({qid: label for qid, (_, label) in samples.items()})
+    print(f"{'oracle labels':<22} {ex:>5.1f}/{len(samples)} {latency:>13.2f}s")
+    print("-" * 52)
+    for qid, (_, label) in samples.items():
+        print(f"  {qid}: label={label:<10} routed={routed[qid]}")
+
+    model = train_router(list(samples.values()))
+    model["trained_on"] = results_path.name
+    if len(model["centroids"]) < 2:
+        # Every question got the same label: the router would be a no-op
+        print(f"\nNot saved: every question is labelled {next(iter(model['centroids']))} "
+              f"in {results_path.name}; rerun the ablation until prompt types differ")
+        sys.exit(1)
+    save_router(model, ROUTER_MODEL_PATH)
+    print(f"\nRouter saved to {ROUTER_MODEL_PATH} (samples per route: {model['counts']})")
+
+
+if __name__ == "__main__":
+    main()
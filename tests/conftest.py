@@ -1,9 +1,42 @@
 """Shared pytest fixtures for SQL Query Agent tests."""
 
 import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from pydantic import Field
 from sqlalchemy import create_engine, text
 
 
+class StubChatModel(FakeListChatModel):
+    """Chat model stub: returns canned responses in order and records prompts.
+
+    Pass stub.as_factory() as build_agent(llm_factory=...) so the agent runs
+    end to end without an Ollama server.
+    """
+
+    prompts: list = Field(default_factory=list)
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        return super()._call(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def as_factory(self):
+        return lambda model_name, **options: self
+
+
+@pytest.fixture
+def stub_llm():
+    """Return a builder for StubChatModel: stub_llm("SELECT 1", "SELECT 2")."""
+
+    def build(*responses: str) -> StubChatModel:
+        return StubChatModel(responses=list(responses))
+
+    return build
+
+
 @pytest.fixture
 def test_engine():
     """Create an in-memory SQLite database with a minimal test schema.
@@ -72,3 +105,26 @@ def test_column_map():
         "title": "Title",
         "album": "Album",
     }
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """File-backed SQLite engine for code that queries from worker threads.
+
+    The in-memory test_engine is empty on any thread but the one that
+    created it (API requests, stream_agent).
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT NOT NULL)"))
+        conn.execute(text("""
+            CREATE TABLE Album (
+                AlbumId INTEGER PRIMARY KEY,
+                Title TEXT NOT NULL,
+                ArtistId INTEGER REFERENCES Artist(ArtistId)
+            )
+        """))
+        for i in range(1, 8):
+            conn.execute(text("INSERT INTO Artist VALUES (:i, :name)"), {"i": i, "name": f"Artist {i}"})
+        conn.execute(text("INSERT INTO Album VALUES (1, 'For Those About To Rock', 1)"))
+    return engine
@@ -13,8 +13,16 @@ from app.agent import (
     check_validation,
     should_retry,
     make_schema_filter,
+    is_confident,
+    make_cascade_routing,
+    make_limit_query,
+    cascade_stats,
+    build_agent,
+    new_state,
+    stream_agent,
 )
 from app.config import MAX_RETRIES
+from app.metrics import METRICS
 
 
 def make_state(**kwargs) -> AgentState:
@@ -208,6 +216,16 @@ class TestAblationPrompts:
         assert "Reasoning:" in result
         assert "Tables needed:" in result
 
+    def test_dynamic_few_shot_has_examples_placeholder(self):
+        from app.config import (
+            get_ablation_prompt,
+            PROMPT_DYNAMIC_FEW_SHOT,
+            DYNAMIC_FEW_SHOT_PROMPT,
+        )
+        result = get_ablation_prompt(PROMPT_DYNAMIC_FEW_SHOT)
+        assert result == DYNAMIC_FEW_SHOT_PROMPT
+        assert "{examples}" in result
+
     def test_sqlcoder_overrides_ablation_type(self):
         from app.config import (
             get_ablation_prompt,
@@ -217,3 +235,128 @@ class TestAblationPrompts:
         # sqlcoder should always use its specific prompt format
         result = get_ablation_prompt(PROMPT_FEW_SHOT, model_name="sqlcoder:7b")
         assert result == SQLCODER_PROMPT
+
+
+class TestModelCascade:
+    """Tests for cascade mode (cheap model first, escalate on failure)."""
+
+    MODELS = ["small-model", "large-model"]
+
+    @pytest.fixture(autouse=True)
+    def reset_metrics(self):
+        METRICS.reset()
+        yield
+        METRICS.reset()
+
+    def build(self, engine, stubs):
+        return build_agent(engine, "unused", cascade_models=self.MODELS,
+                           llm_factory=lambda model_name, **options: stubs[model_name])
+
+    def test_confidence_check(self):
+        assert is_confident(make_state(results=[["AC/DC"]])) is True
+        assert is_confident(make_state(results=[])) is False
+        assert is_confident(make_state(results=[[None]])) is False
+        assert is_confident(make_state(results=None)) is False
+
+    def test_routing_escalates_before_last_tier(self):
+        route_validation, route_execution = make_cascade_routing(2)
+        assert route_validation(make_state(is_valid=False, model_tier=0)) == "escalate"
+        assert route_validation(make_state(is_valid=False, model_tier=1)) == "handle_error"
+        assert route_execution(make_state(error="no such table: X", model_tier=0)) == "escalate"
+        assert route_execution(make_state(results=[], model_tier=0)) == "escalate"
+        assert route_execution(make_state(results=[], model_tier=1)) == "cascade_done"
+        assert route_execution(make_state(results=[[1]], model_tier=0)) == "cascade_done"
+
+    def test_cheap_tier_answers(self, test_engine, stub_llm):
+        small, large = stub_llm("SELECT Name FROM Artist"), stub_llm("SELECT 1")
+        agent = self.build(test_engine, {"small-model": small, "large-model": large})
+
+        result = agent.invoke(new_state("List all artists", "unused"))
+
+        assert result["answered_by"] == "small-model"
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+        assert large.prompts == []
+
+    def test_escalates_on_execution_error(self, test_engine, stub_llm):
+        small = stub_llm("SELECT Name FROM Singer")
+        large = stub_llm("SELECT Name FROM Artist")
+        agent = self.build(test_engine, {"small-model": small, "large-model": large})
+
+        result = agent.invoke(new_state("List all artists", "unused"))
+
+        assert result["answered_by"] == "large-model"
+        assert result["model_tier"] == 1
+        assert result["retry_count"] == 0
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+
+    def test_escalates_on_empty_results(self, test_engine, stub_llm):
+        small = stub_llm("SELECT Name FROM Artist WHERE Name = 'ACDC'")
+        large = stub_llm("SELECT Name FROM Artist WHERE Name = 'AC/DC'")
+        agent = self.build(test_engine, {"small-model": small, "large-model": large})
+
+        result = agent.invoke(new_state("Find the artist AC/DC", "unused"))
+
+        assert result["answered_by"] == "large-model"
+        assert result["results"] == [["AC/DC"]]
+
+    def test_per_tier_stats(self, test_engine, stub_llm):
+        small = stub_llm("SELECT Name FROM Artist", "SELECT Name FROM Singer")
+        large = stub_llm("SELECT Title FROM Album")
+        agent = self.build(test_engine, {"small-model": small, "large-model": large})
+
+        agent.invoke(new_state("List all artists", "unused"))
+        agent.invoke(new_state("List all albums", "unused"))
+
+        small_stats, large_stats = cascade_stats(self.MODELS)
+        assert (small_stats["attempts"], small_stats["hits"], small_stats["escalations"]) == (2, 1, 1)
+        assert small_stats["hit_rate"] == 0.5
+        assert (large_stats["attempts"], large_stats["hits"]) == (1, 1)
+        assert large_stats["share"] == 0.5
+        assert small_stats["latency"]["count"] == 2
+
+
+class TestLimitQuery:
+    """LIMIT pushdown between validation and execution."""
+
+    def test_executed_sql_is_limited(self, test_engine, stub_llm):
+        llm = stub_llm("SELECT Name FROM Artist ORDER BY Name")
+        agent = build_agent(test_engine, "test-model", llm_factory=llm.as_factory())
+
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert result["generated_sql"] == "SELECT Name FROM Artist ORDER BY Name"
+        assert result["executed_sql"] == "SELECT Name FROM Artist ORDER BY Name LIMIT 20"
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+
+    def test_disabled(self):
+        limit_query = make_limit_query(None)
+        sql = "SELECT Name FROM Artist ORDER BY Name"
+        assert limit_query(make_state(generated_sql=sql)) == {"executed_sql": sql}
+
+
+class TestStreamAgent:
+    """Progressive events from stream_agent (streaming UI and API)."""
+
+    def test_tokens_then_nodes_then_final(self, file_engine, stub_llm):
+        llm = stub_llm("SELECT Name FROM Artist ORDER BY ArtistId LIMIT 2")
+        agent = build_agent(file_engine, "test-model", llm_factory=llm.as_factory())
+
+        events = list(stream_agent(agent, new_state("List all artists", "test-model")))
+
+        tokens = "".join(e["text"] for e in events if e["event"] == "token")
+        assert tokens == "SELECT Name FROM Artist ORDER BY ArtistId LIMIT 2"
+        nodes = [e["node"] for e in events if e["event"] == "node"]
+        assert nodes[:2] == ["schema_filter", "generate_sql"]
+        first_node = next(i for i, e in enumerate(events) if e.get("node") == "generate_sql")
+        assert events[first_node]["event"] == "token"  # tokens arrive before the node finishes
+        assert events[-1]["event"] == "final"
+        assert events[-1]["state"]["results"] == [["Artist 1"], ["Artist 2"]]
+
+    def test_invoke_does_not_stream(self, test_engine, stub_llm):
+        llm = stub_llm("SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=llm.as_factory())
+
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert result["stream_tokens"] is False
+        assert result["results"] == [["AC/DC"], ["Accept"]]
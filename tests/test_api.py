@@ -0,0 +1,221 @@
+"""Tests for the headless HTTP API (app/api.py), with a stub LLM."""
+
+import asyncio
+import json
+import threading
+
+import pytest
+from sqlalchemy import event
+from starlette.testclient import TestClient
+
+from app.api import (
+    AdmissionController,
+    ClosingStreamingResponse,
+    Overloaded,
+    cancel_on_disconnect,
+    create_app,
+    first_page,
+)
+from app.config import RESULT_MAX_ROWS
+from app.resultset import ResultSet
+from app.cancellation import CancelToken
+from tests.conftest import StubChatModel
+
+
+def make_client(engine, llm, **limits) -> TestClient:
+    return TestClient(create_app(engine, "llama3.1:8b", llm_factory=llm.as_factory(), **limits))
+
+
+class TestQuery:
+    """POST /query and result pagination."""
+
+    def test_returns_sql_and_first_page(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT Name FROM Artist ORDER BY ArtistId"))
+        response = client.post("/query", json={"question": "List all artists", "page_size": 3})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["generated_sql"] == "SELECT Name FROM Artist ORDER BY ArtistId"
+        assert body["results"] == [["Artist 1"], ["Artist 2"], ["Artist 3"]]
+        assert body["has_more"] is True
+        assert "cancel_token" not in body
+
+    def test_pages_by_query_id(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT Name FROM Artist ORDER BY ArtistId;"))
+        query_id = client.post("/query", json={"question": "List all artists", "page_size": 3}).json()["query_id"]
+
+        page3 = client.get(f"/query/{query_id}/rows", params={"page": 3, "page_size": 3}).json()
+        assert page3["results"] == [["Artist 7"]]
+        assert page3["has_more"] is False
+
+    def test_first_page_not_queried_again(self, file_engine, stub_llm):
+        statements = []
+        event.listen(file_engine, "before_cursor_execute",
+                     lambda conn, cursor, sql, *args: statements.append(sql))
+        client = make_client(file_engine, stub_llm("SELECT Name FROM Artist ORDER BY ArtistId"))
+        body = client.post("/query", json={"question": "List all artists", "page_size": 3}).json()
+
+        assert body["results"] == [["Artist 1"], ["Artist 2"], ["Artist 3"]]
+        assert not [sql for sql in statements if sql.startswith("SELECT * FROM (")]
+
+    def test_first_page_from_kept_rows(self):
+        kept = ResultSet.from_rows(["n"], [[i] for i in range(5)])
+        assert first_page(kept, 3) == ([[0], [1], [2]], True)
+        assert first_page(kept, 10) == ([[i] for i in range(5)], False)
+        full = ResultSet.from_rows(["n"], [[i] for i in range(RESULT_MAX_ROWS)])
+        assert first_page(full, RESULT_MAX_ROWS) is None
+
+    def test_unknown_query_id(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm())
+        assert client.get("/query/nope/rows").status_code == 404
+
+    def test_missing_question(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm())
+        assert client.post("/query", json={}).status_code == 400
+
+
+    def test_identical_concurrent_questions_coalesce(self, file_engine):
+        llm = StubChatModel(responses=["SELECT COUNT(*) FROM Artist"], sleep=0.02)
+        client = make_client(file_engine, llm)
+        bodies = []
+
+        def ask(question):
+            bodies.append(client.post("/query", json={"question": question}).json())
+
+        threads = [threading.Thread(target=ask, args=(q,))
+                   for q in ("How many artists?", "how many artists", "How many  artists?")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        assert len(llm.prompts) == 1
+        assert [b["results"] for b in bodies] == [[[7]]] * 3
+        assert sorted(b["coalesced"] for b in bodies) == [False, True, True]
+
+
+class TestDisconnect:
+    """cancel_on_disconnect() cancels a run whose client has gone."""
+
+    class FakeRequest:
+        def __init__(self, polls_before_disconnect: int):
+            self.polls = 0
+            self.polls_before_disconnect = polls_before_disconnect
+
+        async def is_disconnected(self) -> bool:
+            self.polls += 1
+            return self.polls > self.polls_before_disconnect
+
+    def test_cancels_token_on_disconnect(self):
+        request, token = self.FakeRequest(2), CancelToken()
+        asyncio.run(cancel_on_disconnect(request, token, interval=0))
+        assert token.cancelled
+        assert request.polls == 3
+
+    def test_stops_polling_once_cancelled(self):
+        request, token = self.FakeRequest(100), CancelToken()
+        token.cancel()
+        asyncio.run(cancel_on_disconnect(request, token, interval=0))
+        assert request.polls == 0
+
+
+class TestExport:
+    """GET /query/{query_id}/export streams the full result."""
+
+    def test_csv_export(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT Name FROM Artist ORDER BY ArtistId"))
+        query_id = client.post("/query", json={"question": "List all artists", "page_size": 2}).json()["query_id"]
+
+        response = client.get(f"/query/{query_id}/export", params={"format": "csv"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        lines = response.text.splitlines()
+        assert lines[0] == '"Name"' and len(lines) == 8
+        assert client.get("/health").json()["in_system"] == 0
+
+    def test_bad_format_and_unknown_id(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT Name FROM Artist"))
+        query_id = client.post("/query", json={"question": "List all artists"}).json()["query_id"]
+        assert client.get(f"/query/{query_id}/export", params={"format": "xlsx"}).status_code == 400
+        assert client.get("/query/nope/export").status_code == 404
+
+
+class TestStream:
+    """POST /query/stream NDJSON node events."""
+
+    def test_node_events_in_order(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT COUNT(*) FROM Artist"))
+        with client.stream("POST", "/query/stream", json={"question": "How many artists?"}) as response:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+
+        nodes = [line.get("node") for line in lines if "node" in line]
+        assert nodes[:2] == ["schema_filter", "generate_sql"]
+        assert "execute_query" in nodes
+        execute = next(line for line in lines if line.get("node") == "execute_query")
+        assert execute["update"]["results"] == [[7]]
+        assert lines[-1] == {"event": "done"}
+
+
+class TestBackpressure:
+    """Bounded queue and per-client limits answer 429."""
+
+    def test_queue_full(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT 1"), max_concurrency=1, max_queue=1)
+        admission = client.app.state.admission
+        admission.acquire("a")
+        admission.acquire("b")
+
+        response = client.post("/query", json={"question": "q"}, headers={"X-Client-Id": "c"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"]
+
+        admission.release("a")
+        assert client.post("/query", json={"question": "q"}, headers={"X-Client-Id": "c"}).status_code == 200
+
+    def test_per_client_limit(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT 1"), per_client_limit=1)
+        client.app.state.admission.acquire("busy")
+
+        assert client.post("/query", json={"question": "q"}, headers={"X-Client-Id": "busy"}).status_code == 429
+        assert client.post("/query", json={"question": "q"}, headers={"X-Client-Id": "idle"}).status_code == 200
+
+    def test_slots_released_after_request(self, file_engine, stub_llm):
+        client = make_client(file_engine, stub_llm("SELECT 1"))
+        client.post("/query", json={"question": "q"})
+        assert client.get("/health").json()["in_system"] == 0
+
+    @pytest.mark.parametrize("path", ["/query", "/query/stream"])
+    def test_bad_timeout_rejected_without_holding_a_slot(self, file_engine, stub_llm, path):
+        client = make_client(file_engine, stub_llm("SELECT 1"), per_client_limit=1)
+        for timeout in ("abc", -1, "nan"):
+            response = client.post(path, json={"question": "q", "timeout": timeout})
+            assert response.status_code == 400
+        assert client.get("/health").json()["in_system"] == 0
+        assert client.post(path, json={"question": "q", "timeout": "5"}).status_code == 200
+
+    def test_unstarted_stream_body_still_closed(self):
+        started, closed = [], []
+
+        async def body():
+            started.append(True)
+            yield b"x"
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            await asyncio.sleep(10)  # client gone before the response starts
+
+        response = ClosingStreamingResponse(body(), lambda: closed.append(True))
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send))
+        assert started == []
+        assert closed == [True]
+
+    def test_controller_counts(self):
+        admission = AdmissionController(max_concurrency=1, max_queue=1, per_client_limit=5)
+        admission.acquire("a")
+        admission.acquire("a")
+        assert admission.snapshot()["queued"] == 1
+        with pytest.raises(Overloaded):
+            admission.acquire("b")
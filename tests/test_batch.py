@@ -0,0 +1,63 @@
+"""Tests for app/batch.py (multi-question batched prompting)."""
+
+from app.batch import format_batch_questions, parse_batch_response, build_batch_runner
+
+
+class TestParseBatchResponse:
+    """Tests for parse_batch_response()."""
+
+    def test_plain_numbered_lines(self):
+        content = "1. SELECT COUNT(*) FROM Artist;\n2. SELECT Title FROM Album;"
+        assert parse_batch_response(content, 2) == {
+            1: "SELECT COUNT(*) FROM Artist",
+            2: "SELECT Title FROM Album",
+        }
+
+    def test_fenced_multiline_answers(self):
+        content = (
+            "**1.**\n```sql\nSELECT Name\nFROM Artist;\n```\n"
+            "**2.**\n```sql\nSELECT Title FROM Album;\n```"
+        )
+        answers = parse_batch_response(content, 2)
+        assert answers[1] == "SELECT Name\nFROM Artist"
+        assert answers[2] == "SELECT Title FROM Album"
+
+    def test_echoed_question_is_dropped(self):
+        content = "1) How many artists are there?\nSELECT COUNT(*) FROM Artist"
+        assert parse_batch_response(content, 1) == {1: "SELECT COUNT(*) FROM Artist"}
+
+    def test_ignores_out_of_range_and_duplicates(self):
+        content = "1. SELECT 1\n1. SELECT 2\n3. SELECT 3"
+        assert parse_batch_response(content, 2) == {1: "SELECT 1"}
+
+    def test_format_batch_questions(self):
+        assert format_batch_questions(["A?", "B?"]) == "1. A?\n2. B?"
+
+
+class TestBatchRunner:
+    """Tests for build_batch_runner() with a stub LLM."""
+
+    def test_all_answers_from_one_call(self, test_engine, stub_llm):
+        stub = stub_llm("1. SELECT COUNT(*) FROM Artist\n2. SELECT COUNT(*) FROM Album")
+        run_batch = build_batch_runner(test_engine, "test-model", batch_size=2,
+                                       llm_factory=stub.as_factory())
+
+        outcomes = run_batch(["How many artists?", "How many albums?"])
+
+        assert len(stub.prompts) == 1
+        assert [o["source"] for o in outcomes] == ["batch", "batch"]
+        assert outcomes[0]["results"] == [[2]]
+
+    def test_failed_answer_falls_back_to_single(self, test_engine, stub_llm):
+        stub = stub_llm(
+            "1. SELECT COUNT(*) FROM Artist\n2. SELECT COUNT(*) FROM Albums",  # batch
+            "SELECT COUNT(*) FROM Album",                                      # fallback
+        )
+        run_batch = build_batch_runner(test_engine, "test-model", batch_size=2,
+                                       llm_factory=stub.as_factory())
+
+        outcomes = run_batch(["How many artists?", "How many albums?"])
+
+        assert [o["source"] for o in outcomes] == ["batch", "single"]
+        assert outcomes[1]["results"] == [[2]]
+        assert len(stub.prompts) == 2
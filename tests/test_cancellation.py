@@ -0,0 +1,134 @@
+"""Tests for app/cancellation.py (deadlines and cancellation)."""
+
+import threading
+import time
+
+import pytest
+
+from app.agent import build_agent, new_state, run_query
+from app.cancellation import (
+    CancelToken,
+    QueryCancelled,
+    DeadlineExceeded,
+    STOP_CANCELLED,
+    STOP_DEADLINE,
+    deadline_in,
+    run_cancellable,
+)
+from app.llm import invoke_text
+from app.retry_policy import STOP_LOW_TIME, decide_retry
+from tests.conftest import StubChatModel
+
+# Counts to 10^9: runs for minutes unless interrupted
+SLOW_SQL = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) "
+            "SELECT COUNT(*) FROM c")
+
+
+def slow_model(response: str = "SELECT Name FROM Artist " * 20) -> StubChatModel:
+    """Stub that streams one character every 20 ms."""
+    return StubChatModel(responses=[response], sleep=0.02)
+
+
+class TestCancelToken:
+    """Tests for CancelToken."""
+
+    def test_callbacks_run_once(self):
+        token, calls = CancelToken(), []
+        token.register(lambda: calls.append("a"))
+        unregister = token.register(lambda: calls.append("b"))
+        unregister()
+        token.cancel()
+        token.cancel()
+        assert token.cancelled
+        assert calls == ["a"]
+
+    def test_register_after_cancel_runs_immediately(self):
+        token, calls = CancelToken(), []
+        token.cancel()
+        token.register(lambda: calls.append("late"))
+        assert calls == ["late"]
+
+
+class TestLlmCancellation:
+    """Tests for invoke_text() with deadline and token."""
+
+    def test_cancel_aborts_stream(self):
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        start = time.time()
+        with pytest.raises(QueryCancelled):
+            invoke_text(slow_model(), "Q", cancel_token=token)
+        assert time.time() - start < 1
+
+    def test_deadline_aborts_stream(self):
+        start = time.time()
+        with pytest.raises(DeadlineExceeded):
+            invoke_text(slow_model(), "Q", deadline=deadline_in(0.1))
+        assert time.time() - start < 1
+
+    def test_completes_within_deadline(self):
+        model = StubChatModel(responses=["SELECT 1"])
+        assert invoke_text(model, "Q", deadline=deadline_in(5), cancel_token=CancelToken()) == "SELECT 1"
+
+
+class TestSqliteInterruption:
+    """Tests for run_query() deadline/cancel handling."""
+
+    def test_deadline_interrupts_statement(self, test_engine):
+        start = time.time()
+        with pytest.raises(DeadlineExceeded):
+            run_query(test_engine, SLOW_SQL, deadline=deadline_in(0.2))
+        assert time.time() - start < 2
+
+    def test_cancel_interrupts_statement(self, test_engine):
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        with pytest.raises(QueryCancelled):
+            run_query(test_engine, SLOW_SQL, cancel_token=token)
+
+    def test_connection_reusable_after_interrupt(self, test_engine):
+        with pytest.raises(DeadlineExceeded):
+            run_query(test_engine, SLOW_SQL, deadline=deadline_in(0.1))
+        assert run_query(test_engine, "SELECT COUNT(*) FROM Artist") == [[2]]
+
+
+class TestAgentDeadlines:
+    """End-to-end behaviour of deadlines and cancellation in the graph."""
+
+    def test_cancelled_before_start(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=stub.as_factory())
+        token = CancelToken()
+        token.cancel()
+
+        result = agent.invoke(new_state("List all artists", "test-model", cancel_token=token))
+
+        assert result["stop_reason"] == STOP_CANCELLED
+        assert result["retry_count"] == 0
+        assert stub.prompts == []
+
+    def test_deadline_during_generation(self, test_engine):
+        model = slow_model()
+        agent = build_agent(test_engine, "test-model", llm_factory=lambda name, **options: model)
+
+        start = time.time()
+        result = agent.invoke(new_state("List all artists", "test-model", timeout=0.2))
+
+        assert result["stop_reason"] == STOP_DEADLINE
+        assert result["results"] is None
+        assert time.time() - start < 2
+
+    def test_no_retry_without_time_for_an_llm_call(self):
+        state = new_state("List all artists", "test-model", timeout=1)
+        state.update(generated_sql="SELECT Nam FROM Artist", error="no such column: Nam")
+        assert decide_retry(state) == (False, STOP_LOW_TIME)
+
+    def test_run_cancellable_cancels_when_waiter_unwinds(self):
+        token = CancelToken()
+
+        def interrupt(elapsed):
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            run_cancellable(lambda: token.wait(5), token, on_tick=interrupt, tick_seconds=0.01)
+        assert token.cancelled
@@ -1,6 +1,17 @@
 """Tests for app/database.py functions."""
 
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.agent import run_query
+from app.cancellation import CancelToken, QueryCancelled
 from app.database import (
+    create_db_engine,
+    get_snapshot,
     get_schema_info,
     get_sample_rows,
     build_schema_text,
@@ -133,3 +144,79 @@ class TestBuildSchemaText:
         result = build_schema_text(test_schema_info, tables=["Artist", "NonExistent"])
         assert "CREATE TABLE Artist" in result
         assert "NonExistent" not in result
+
+
+class TestSnapshotEngine:
+    """In-memory snapshot mode (create_db_engine(mode="snapshot"))."""
+
+    @pytest.fixture
+    def db_path(self, file_engine):
+        return file_engine.url.database
+
+    def count(self, engine) -> int:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM Artist")).scalar()
+
+    def test_serves_a_copy(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        assert get_snapshot(engine).generation == 1
+        assert get_schema_info(engine).keys() == {"Artist", "Album"}
+        assert run_query(engine, "SELECT Name FROM Artist ORDER BY ArtistId LIMIT 2") == [["Artist 1"], ["Artist 2"]]
+        assert get_snapshot(create_db_engine(db_path)) is None
+
+    def test_read_only(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        with pytest.raises(OperationalError, match="readonly"):
+            with engine.connect() as conn:
+                conn.execute(text("DELETE FROM Artist"))
+
+    def test_reloads_when_file_changes(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        snapshot = get_snapshot(engine)
+        snapshot.check_interval = 0
+        assert self.count(engine) == 7
+
+        writer = sqlite3.connect(db_path)
+        writer.execute("INSERT INTO Artist (Name) VALUES ('New')")
+        writer.commit()
+        writer.close()
+
+        assert self.count(engine) == 8
+        assert snapshot.generation == 2
+        assert snapshot.refresh() is False  # unchanged since
+
+    def test_check_interval_throttles_reloads(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        writer = sqlite3.connect(db_path)
+        writer.execute("DELETE FROM Album")
+        writer.commit()
+        writer.close()
+        get_snapshot(engine).check_interval = 3600
+        assert self.count(engine) == 7 and get_snapshot(engine).generation == 1
+
+    def test_pooled_connections_across_threads(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        counts = []
+
+        def worker():
+            for _ in range(20):
+                counts.append(self.count(engine))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert counts == [7] * 80
+
+    def test_cancellation(self, db_path):
+        engine = create_db_engine(db_path, mode="snapshot")
+        token = CancelToken()
+        token.cancel()
+        with pytest.raises(QueryCancelled):
+            run_query(engine, "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                              "SELECT COUNT(*) FROM n", cancel_token=token)
+
+    def test_unknown_mode(self, db_path):
+        with pytest.raises(ValueError, match="Unknown engine mode"):
+            create_db_engine(db_path, mode="mmap")
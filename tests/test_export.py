@@ -0,0 +1,55 @@
+"""Tests for streaming CSV/Parquet export (app/export.py)."""
+
+import csv
+import io
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.cancellation import CancelToken, QueryCancelled
+from app.export import export_query, iter_export
+from app.metrics import Metrics
+
+SQL = "SELECT ArtistId, Name FROM Artist ORDER BY ArtistId"
+
+
+class TestIterExport:
+
+    def test_csv_streams_in_batches(self, file_engine):
+        stats = {}
+        chunks = list(iter_export(file_engine, SQL, "csv", batch_size=3, stats=stats, metrics=Metrics()))
+
+        assert len(chunks) == 3  # 3 + 3 + 1 rows, header in the first chunk
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        assert rows[0] == ["ArtistId", "Name"]
+        assert rows[1:] == [[str(i), f"Artist {i}"] for i in range(1, 8)]
+        assert stats["rows"] == 7 and stats["bytes"] == sum(map(len, chunks))
+
+    def test_parquet_round_trip(self, file_engine):
+        data = b"".join(iter_export(file_engine, SQL + ";", "parquet", batch_size=2, metrics=Metrics()))
+        table = pq.read_table(io.BytesIO(data))
+        assert table.column_names == ["ArtistId", "Name"]
+        assert table.column("ArtistId").to_pylist() == list(range(1, 8))
+        assert pq.ParquetFile(io.BytesIO(data)).num_row_groups == 4
+
+    @pytest.mark.parametrize("fmt", ["csv", "parquet"])
+    def test_empty_result_keeps_header(self, file_engine, tmp_path, fmt):
+        path = tmp_path / f"out.{fmt}"
+        stats = export_query(file_engine, "SELECT Name FROM Artist WHERE 0", path, fmt)
+        assert stats["rows"] == 0
+        if fmt == "csv":
+            assert path.read_text().strip() == '"Name"'
+        else:
+            assert pq.read_table(path).column_names == ["Name"]
+
+    def test_unknown_format(self, file_engine):
+        with pytest.raises(ValueError):
+            list(iter_export(file_engine, SQL, "xlsx"))
+
+    def test_cancelled_export_stops(self, file_engine):
+        token = CancelToken()
+        chunks = iter_export(file_engine, SQL, "csv", cancel_token=token, batch_size=1, metrics=Metrics())
+        next(chunks)
+        token.cancel()
+        with pytest.raises(QueryCancelled):
+            list(chunks)
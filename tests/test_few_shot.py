@@ -0,0 +1,84 @@
+"""Tests for app/few_shot.py (dynamic few-shot example store)."""
+
+import json
+
+from app.agent import make_execute_query, new_state
+from app.config import FEW_SHOT_SEED_PATH
+from app.few_shot import (
+    add_example,
+    load_seed_examples,
+    retrieve_examples,
+    format_examples,
+    make_example_retriever,
+)
+
+
+class TestExampleStore:
+    """Tests for adding and seeding examples."""
+
+    def test_add_example_deduplicates_question(self, tmp_path):
+        store = tmp_path / "ex.db"
+        assert add_example(store, "How many artists?", "SELECT COUNT(*) FROM Artist") is True
+        assert add_example(store, "how many artists", "SELECT COUNT(ArtistId) FROM Artist") is False
+
+    def test_load_seed_is_idempotent(self, tmp_path):
+        store = tmp_path / "ex.db"
+        with open(FEW_SHOT_SEED_PATH) as f:
+            n_seeds = len(json.load(f))
+        assert load_seed_examples(store, FEW_SHOT_SEED_PATH) == n_seeds
+        assert load_seed_examples(store, FEW_SHOT_SEED_PATH) == 0
+
+
+class TestRetrieveExamples:
+    """Tests for retrieve_examples()."""
+
+    def test_most_similar_first(self, tmp_path):
+        store = tmp_path / "ex.db"
+        add_example(store, "List all genres", "SELECT Name FROM Genre")
+        add_example(store, "Which customers are from Canada?",
+                    "SELECT FirstName FROM Customer WHERE Country = 'Canada'")
+
+        examples = retrieve_examples(store, "How many customers are from Brazil?", k=1)
+
+        assert examples[0]["question"] == "Which customers are from Canada?"
+
+    def test_excludes_the_question_itself(self, tmp_path):
+        store = tmp_path / "ex.db"
+        add_example(store, "List all genres", "SELECT Name FROM Genre")
+        assert retrieve_examples(store, "List all genres", exclude_question="List all genres") == []
+
+    def test_respects_token_budget(self, tmp_path):
+        store = tmp_path / "ex.db"
+        load_seed_examples(store, FEW_SHOT_SEED_PATH)
+        assert len(retrieve_examples(store, "Which customers are from Canada?", k=3)) >= 2
+        assert len(retrieve_examples(store, "Which customers are from Canada?", k=3, token_budget=30)) <= 1
+
+    def test_missing_store_returns_nothing(self, tmp_path):
+        assert retrieve_examples(tmp_path / "missing.db", "List all genres") == []
+
+    def test_format_examples(self):
+        text = format_examples([{"question": "List all genres", "sql": "SELECT Name FROM Genre"}])
+        assert text == "Example 1:\nQuestion: List all genres\nSQL: SELECT Name FROM Genre;"
+
+
+class TestExampleRetriever:
+    """Tests for make_example_retriever()."""
+
+    def test_make_example_retriever(self, tmp_path):
+        store = tmp_path / "ex.db"
+        add_example(store, "List all genres", "SELECT Name FROM Genre")
+        retriever = make_example_retriever(store)
+        assert retriever("Show all genres")[0]["sql"] == "SELECT Name FROM Genre"
+
+
+class TestRecordExample:
+    """execute_query's record_example callback."""
+
+    def test_store_failure_does_not_fail_query(self, test_engine):
+        def locked_store(question, sql):
+            raise OSError("database is locked")
+
+        execute_query = make_execute_query(test_engine, record_example=locked_store)
+        result = execute_query(new_state("q", "test-model") | {"generated_sql": "SELECT Name FROM Artist"})
+        assert result["error"] == ""
+        assert len(result["results"]) == 2
@@ -0,0 +1,42 @@
+"""Tests for Arrow result frames (app/frames.py)."""
+
+import pyarrow as pa
+from sqlalchemy import text
+
+from app.frames import fetch_batches, rows_to_batch
+
+
+class TestRowsToBatch:
+
+    def test_types_inferred_per_column(self):
+        batch = rows_to_batch(["id", "name", "price"], [(1, "a", 0.99), (2, None, 1.99)])
+        assert batch.schema.names == ["id", "name", "price"]
+        assert batch.schema.types == [pa.int64(), pa.string(), pa.float64()]
+
+    def test_mixed_column_becomes_string(self):
+        batch = rows_to_batch(["v"], [(1,), ("x",)])
+        assert batch.column(0).to_pylist() == ["1", "x"]
+
+    def test_schema_pins_later_batches(self):
+        first = rows_to_batch(["v"], [(1.5,)])
+        assert rows_to_batch(["v"], [(2,)], first.schema).schema.types == [pa.float64()]
+
+
+class TestFetchBatches:
+
+    def test_fetches_in_batches(self, test_engine):
+        with test_engine.connect() as conn:
+            result = conn.execute(text("SELECT ArtistId, Name FROM Artist ORDER BY ArtistId"))
+            batches = list(fetch_batches(result, batch_size=1))
+        assert [b.num_rows for b in batches] == [1, 1]
+        assert batches[0].schema.names == ["ArtistId", "Name"]
+
+    def test_max_rows(self, test_engine):
+        with test_engine.connect() as conn:
+            result = conn.execute(text("SELECT ArtistId, Name FROM Artist ORDER BY ArtistId"))
+            batches = list(fetch_batches(result, max_rows=1))
+        assert [b.to_pylist() for b in batches] == [[{"ArtistId": 1, "Name": "AC/DC"}]]
+
+    def test_empty_result_yields_nothing(self, test_engine):
+        with test_engine.connect() as conn:
+            assert list(fetch_batches(conn.execute(text("SELECT Name FROM Artist WHERE 0")))) == []
@@ -0,0 +1,101 @@
+"""Tests for the background Ollama health monitor (app/health.py)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.health import HealthMonitor, probe_ollama
+from app.metrics import Metrics
+
+
+@pytest.fixture
+def tags_server():
+    """Local server answering /api/tags with one model."""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = json.dumps({"models": [{"name": "llama3.1:8b"}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def fixed_probe(ok: bool, calls: list):
+    def probe(base_url, model_name):
+        calls.append(base_url)
+        return {"ok": ok, "message": f"{base_url} ok={ok}", "models": ["llama3.1:8b"],
+                "latency_seconds": 0.01}
+    return probe
+
+
+class TestProbe:
+
+    def test_model_available(self, tags_server):
+        result = probe_ollama(tags_server, "llama3.1:8b")
+        assert result["ok"] and result["models"] == ["llama3.1:8b"]
+        assert result["latency_seconds"] >= 0
+
+    def test_model_missing(self, tags_server):
+        result = probe_ollama(tags_server, "sqlcoder")
+        assert not result["ok"] and "not found" in result["message"]
+
+    def test_unreachable(self):
+        result = probe_ollama("http://127.0.0.1:9", "llama3.1:8b", timeout=0.5)
+        assert not result["ok"] and "Cannot connect" in result["message"]
+
+
+class TestHealthMonitor:
+
+    def test_unknown_before_first_probe(self):
+        calls = []
+        monitor = HealthMonitor(["http://a"], probe=fixed_probe(True, calls), metrics=Metrics())
+        status = monitor.status()
+        assert status["ok"] is None and not status["stale"]
+        assert calls == []  # status() never probes
+
+    def test_refresh_caches_status_and_metrics(self):
+        metrics = Metrics()
+        monitor = HealthMonitor(["http://a"], probe=fixed_probe(True, []), metrics=metrics)
+        monitor.refresh()
+        status = monitor.status()
+        assert status["ok"] and status["models"] == ["llama3.1:8b"]
+        assert metrics.gauge("ollama.up") == 1
+        assert metrics.summary("ollama.probe_seconds")["count"] == 1
+
+    def test_healthy_if_any_replica_is(self):
+        def probe(base_url, model_name):
+            return {"ok": base_url == "http://b", "message": base_url, "models": [],
+                    "latency_seconds": 0.01}
+        monitor = HealthMonitor(["http://a", "http://b"], probe=probe, metrics=Metrics())
+        status = monitor.refresh()
+        assert status["ok"] and "1/2 replicas up" in status["message"]
+
+    def test_stale_after_missed_intervals(self):
+        monitor = HealthMonitor(["http://a"], interval=0.01, probe=fixed_probe(False, []),
+                                metrics=Metrics())
+        monitor.refresh()
+        time.sleep(0.05)
+        assert monitor.status()["stale"]
+
+    def test_background_thread_polls(self):
+        calls = []
+        monitor = HealthMonitor(["http://a"], interval=0.02, probe=fixed_probe(True, calls),
+                                metrics=Metrics())
+        monitor.start()
+        monitor.start()
+        time.sleep(0.1)
+        monitor.stop()
+        assert len(calls) >= 2
+        assert monitor.status()["ok"]
@@ -0,0 +1,119 @@
+"""Tests for hedged LLM requests (app/hedging.py)."""
+
+import time
+
+import pytest
+
+from app.cancellation import CancelToken, QueryCancelled
+from app.hedging import Hedger, hedge_stats
+from app.llm import invoke_for_sql
+from app.metrics import Metrics
+from tests.conftest import StubChatModel
+
+
+def warmed_metrics(latency: float = 0.05, n: int = 20) -> Metrics:
+    """Metrics with n observed LLM calls of the given latency."""
+    metrics = Metrics()
+    for _ in range(n):
+        metrics.observe("llm.seconds", latency)
+    return metrics
+
+
+def sleeper(seconds: float, result: str):
+    """Attempt that returns result after seconds unless its token is cancelled."""
+    def attempt(token: CancelToken) -> str:
+        if token.wait(seconds):
+            raise QueryCancelled("cancelled")
+        return result
+    return attempt
+
+
+class TestHedger:
+
+    def test_no_hedge_before_min_samples(self):
+        hedger = Hedger(metrics=warmed_metrics(n=5), min_samples=20, min_delay=0)
+        assert hedger.delay() is None
+
+    def test_delay_is_percentile_with_floor(self):
+        assert Hedger(metrics=warmed_metrics(0.05), min_delay=0).delay() == 0.05
+        assert Hedger(metrics=warmed_metrics(0.05), min_delay=1.0).delay() == 1.0
+
+    def test_fast_primary_is_not_hedged(self):
+        metrics = warmed_metrics()
+        hedger = Hedger(metrics=metrics, min_delay=0)
+        assert hedger.run(sleeper(0, "primary"), sleeper(0, "backup")) == "primary"
+        assert hedge_stats(metrics)["hedged"] == 0
+
+    def test_slow_primary_loses_and_is_cancelled(self):
+        metrics = warmed_metrics()
+        hedger = Hedger(metrics=metrics, min_delay=0)
+        primary_tokens = []
+
+        def slow_primary(token):
+            primary_tokens.append(token)
+            return sleeper(5, "primary")(token)
+
+        t0 = time.time()
+        assert hedger.run(slow_primary, sleeper(0, "backup")) == "backup"
+        assert time.time() - t0 < 1
+        assert primary_tokens[0].cancelled
+        stats = hedge_stats(metrics)
+        assert (stats["hedged"], stats["backup_wins"], stats["hedge_rate"]) == (1, 1, 1.0)
+
+    def test_failed_attempt_waits_for_the_other(self):
+        hedger = Hedger(metrics=warmed_metrics(), min_delay=0)
+
+        def failing_backup(token):
+            raise RuntimeError("backup down")
+
+        assert hedger.run(sleeper(0.2, "primary"), failing_backup) == "primary"
+
+    def test_both_fail_raises_primary_error(self):
+        hedger = Hedger(metrics=warmed_metrics(), min_delay=0)
+
+        def fail(message):
+            def attempt(token):
+                time.sleep(0.1)
+                raise RuntimeError(message)
+            return attempt
+
+        with pytest.raises(RuntimeError, match="primary"):
+            hedger.run(fail("primary"), fail("backup"))
+
+    def test_caller_cancel_stops_both(self):
+        hedger = Hedger(metrics=warmed_metrics(), min_delay=0)
+        token = CancelToken()
+
+        def primary(attempt_token):
+            token.cancel()
+            return sleeper(5, "primary")(attempt_token)
+
+        with pytest.raises(QueryCancelled):
+            hedger.run(primary, sleeper(5, "backup"), token)
+
+
+class TestInvokeForSql:
+
+    def test_hedges_to_backup_model(self):
+        slow = StubChatModel(responses=["SELECT 'slow' FROM Artist"], sleep=0.2)
+        fast = StubChatModel(responses=["SELECT 'fast'"])
+        models = {"big": slow, "small": fast}
+        hedger = Hedger(metrics=warmed_metrics(), min_delay=0, backup_model="small")
+
+        sql, _ = invoke_for_sql(lambda model_name, **options: models[model_name], "big", "Q",
+                                scheduler=None, replicas=None, hedger=hedger)
+
+        assert sql == "SELECT 'fast'"
+        assert len(fast.prompts) == 1
+
+    def test_no_duplicate_without_distinct_replica_or_model(self):
+        metrics = warmed_metrics()
+        slow = StubChatModel(responses=["SELECT 1"], sleep=0.2)
+        hedger = Hedger(metrics=metrics, min_delay=0, backup_model="")
+
+        sql, _ = invoke_for_sql(lambda model_name, **options: slow, "big", "Q",
+                                scheduler=None, replicas=None, hedger=hedger)
+
+        assert sql == "SELECT 1"
+        assert len(slow.prompts) == 1
+        assert metrics.counter("hedge.calls") == 0
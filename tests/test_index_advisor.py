@@ -0,0 +1,98 @@
+"""Tests for the workload-driven index advisor (app/index_advisor.py)."""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.database import get_schema_info
+from app.index_advisor import advise_indexes, apply_indexes, candidate_indexes, predicate_columns
+from app.sql_rewrite import SchemaFacts
+
+
+@pytest.fixture
+def store_db(tmp_path):
+    """Customer/Invoice database large enough for the planner to prefer indexes."""
+    path = tmp_path / "store.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE Customer (CustomerId INTEGER PRIMARY KEY, Name TEXT NOT NULL,
+                               Country TEXT, City TEXT);
+        CREATE TABLE Invoice (InvoiceId INTEGER PRIMARY KEY, CustomerId INTEGER NOT NULL,
+                              Total REAL NOT NULL);
+        CREATE INDEX IFK_InvoiceCustomerId ON Invoice (CustomerId);
+    """)
+    countries = ["Brazil", "USA", "Germany", "France", "India"]
+    conn.executemany("INSERT INTO Customer VALUES (?, ?, ?, ?)",
+                     [(i, f"Customer {i}", countries[i % 5], f"City {i % 50}") for i in range(1, 2001)])
+    conn.executemany("INSERT INTO Invoice VALUES (?, ?, ?)",
+                     [(i, i % 2000 + 1, i % 25) for i in range(1, 5001)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def schema_info(store_db):
+    return get_schema_info(create_engine(f"sqlite:///{store_db}"))
+
+
+class TestCandidates:
+
+    def test_predicate_and_join_columns(self, schema_info):
+        columns = predicate_columns(
+            "SELECT c.Name, SUM(i.Total) FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId "
+            "WHERE c.Country = 'USA' AND c.City = 'City 1' AND i.Total > 10 GROUP BY c.Name",
+            SchemaFacts(schema_info))
+
+        assert columns["customer"] == {"eq": ["country", "city", "customerid"], "range": []}
+        assert columns["invoice"] == {"eq": ["customerid"], "range": ["total"]}
+
+    def test_in_subquery_projection(self, schema_info):
+        columns = predicate_columns(
+            "SELECT Name FROM Customer WHERE CustomerId IN (SELECT CustomerId FROM Invoice)",
+            SchemaFacts(schema_info))
+        assert columns["invoice"]["eq"] == ["customerid"]
+
+    def test_composite_candidate(self):
+        candidates = candidate_indexes({"customer": {"eq": ["country", "city"], "range": ["name"]}})
+        assert ("customer", ("country", "city", "name")) in candidates
+        assert ("customer", ("name",)) in candidates
+
+
+class TestAdviseIndexes:
+
+    WORKLOAD = [
+        {"sql": "SELECT Name FROM Customer WHERE Country = 'Brazil'", "executions": 10},
+        {"sql": "SELECT c.Name FROM Customer c JOIN Invoice i ON i.CustomerId = c.CustomerId "
+                "WHERE c.Country = 'USA' AND c.City = 'City 5'", "executions": 2},
+        {"sql": "SELECT Name FROM Customer WHERE CustomerId = 3", "executions": 50},
+        {"sql": "SELECT nope FROM Missing", "executions": 5},
+    ]
+
+    def test_ranked_recommendations(self, store_db, schema_info):
+        recommendations = advise_indexes(store_db, schema_info, self.WORKLOAD)
+
+        # (Country, City) adds nothing once Country is indexed; Invoice.CustomerId
+        # and the primary key are already indexed
+        assert len(recommendations) == 1
+        top = recommendations[0]
+        assert (top["table"], top["columns"]) == ("Customer", ["Country"])
+        assert top["sql"] == "CREATE INDEX IF NOT EXISTS [idx_Customer_Country] ON [Customer] ([Country])"
+        assert (top["statements"], top["executions"]) == (2, 12)
+        assert top["benefit"] > 0
+
+    def test_apply_writes_a_copy(self, store_db, schema_info, tmp_path):
+        recommendations = advise_indexes(store_db, schema_info, self.WORKLOAD)
+        copy_path = apply_indexes(store_db, recommendations, tmp_path / "indexed.db")
+
+        conn = sqlite3.connect(copy_path)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT Name FROM Customer WHERE Country = 'Brazil'").fetchall()
+        conn.close()
+        assert "USING INDEX idx_Customer_Country" in plan[0][3]
+        source = sqlite3.connect(store_db)
+        assert source.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'").fetchone() == (1,)
+        source.close()
+
+    def test_nothing_to_recommend(self, store_db, schema_info):
+        assert advise_indexes(store_db, schema_info, self.WORKLOAD[2:]) == []
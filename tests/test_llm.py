@@ -0,0 +1,174 @@
+"""Tests for app/llm.py (LLM client layer and prompt layout)."""
+
+import pytest
+from langchain_core.messages import AIMessage
+from ollama import ResponseError
+
+from app.agent import build_agent
+from app.config import SQL_OUTPUT_SCHEMA
+from app.llm import (
+    OUTPUT_TEXT,
+    OUTPUT_STRUCTURED,
+    OUTPUT_FALLBACK,
+    extract_sql,
+    parse_structured_sql,
+    invoke_for_sql,
+    build_cached_suffix,
+    build_messages,
+    prompt_eval_stats,
+)
+
+
+def initial_state(question: str) -> dict:
+    return {
+        "question": question,
+        "relevant_tables": [],
+        "schema_text": "",
+        "raw_sql": "",
+        "generated_sql": "",
+        "is_valid": False,
+        "validation_error": "",
+        "results": None,
+        "error": "",
+        "retry_count": 0,
+        "model_name": "test-model",
+    }
+
+
+class TestExtractSql:
+    """Tests for extract_sql()."""
+
+    def test_strips_fences_and_semicolon(self):
+        assert extract_sql("```sql\nSELECT 1;\n```") == "SELECT 1"
+
+    def test_keeps_text_after_last_sql_marker(self):
+        content = "Reasoning:\n1. Tables needed: Artist\n\nSQL: SELECT Name FROM Artist;"
+        assert extract_sql(content) == "SELECT Name FROM Artist"
+
+
+class TestCachedLayout:
+    """Tests for the stable-prefix / variable-suffix prompt layout."""
+
+    def test_suffix_carries_hints_and_question(self):
+        suffix = build_cached_suffix("List albums", relevant_tables=["Album", "Artist"])
+        assert suffix.startswith("Tables most likely needed: Album, Artist")
+        assert suffix.endswith("Question: List albums\n\nSQL:")
+
+    def test_suffix_without_hints(self):
+        assert build_cached_suffix("List albums") == "Question: List albums\n\nSQL:"
+
+    def test_build_messages_roles(self):
+        messages = build_messages("prefix", "suffix")
+        assert [m.type for m in messages] == ["system", "human"]
+
+    def test_prefix_identical_across_questions(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Name FROM Artist", "SELECT Title FROM Album")
+        agent = build_agent(test_engine, "test-model", cache_prompt_prefix=True,
+                            llm_factory=stub.as_factory())
+
+        agent.invoke(initial_state("List all artists"))
+        agent.invoke(initial_state("List all albums"))
+
+        first, second = stub.prompts
+        assert first[0].content == second[0].content
+        assert "CREATE TABLE Album" in first[0].content
+        assert "List all artists" in first[1].content
+        assert "List all albums" in second[1].content
+
+    def test_legacy_layout_single_prompt(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=stub.as_factory())
+
+        result = agent.invoke(initial_state("List all artists"))
+
+        assert len(stub.prompts[0]) == 1
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+
+
+class TestPromptEvalStats:
+    """Tests for prompt_eval_stats()."""
+
+    def test_reads_ollama_durations(self):
+        response = AIMessage(content="SELECT 1", response_metadata={
+            "prompt_eval_count": 12, "prompt_eval_duration": 250_000_000,
+        })
+        stats = prompt_eval_stats(response)
+        assert stats["prompt_eval_count"] == 12
+        assert stats["prompt_eval_seconds"] == 0.25
+        assert stats["eval_seconds"] == 0
+
+
+class TestStructuredOutput:
+    """Tests for structured (JSON schema) generation and its fallbacks."""
+
+    def test_parse_structured_sql(self):
+        content = '{"tables": ["Artist"], "sql": "SELECT Name FROM Artist;"}'
+        assert parse_structured_sql(content) == "SELECT Name FROM Artist"
+
+    def test_parse_rejects_non_json(self):
+        assert parse_structured_sql("SELECT Name FROM Artist") is None
+        assert parse_structured_sql('{"tables": []}') is None
+
+    def test_passes_schema_as_format(self, stub_llm):
+        stub = stub_llm('{"tables": ["Artist"], "sql": "SELECT Name FROM Artist"}')
+        options = []
+
+        def factory(model_name, **kwargs):
+            options.append(kwargs)
+            return stub
+
+        sql, mode = invoke_for_sql(factory, "test-model", "Question: ?", structured=True)
+
+        assert (sql, mode) == ("SELECT Name FROM Artist", OUTPUT_STRUCTURED)
+        assert options == [{"format": SQL_OUTPUT_SCHEMA}]
+        assert stub.prompts[0][0].content.endswith('"sql": "the SQL query"}.')
+
+    def test_unparsable_json_falls_back_to_text(self, stub_llm):
+        stub = stub_llm("```sql\nSELECT Name FROM Artist;\n```")
+        sql, mode = invoke_for_sql(stub.as_factory(), "test-model", "Q", structured=True)
+        assert (sql, mode) == ("SELECT Name FROM Artist", OUTPUT_FALLBACK)
+
+    def test_rejected_format_remembered_per_model(self, stub_llm):
+        stub = stub_llm("SELECT 1", "SELECT 2")
+        calls = []
+
+        class RejectingModel:
+            def invoke(self, prompt):
+                raise ResponseError("format not supported", 400)
+
+        def factory(model_name, **kwargs):
+            calls.append(kwargs)
+            return RejectingModel() if "format" in kwargs else stub
+
+        assert invoke_for_sql(factory, "old-model", "Q", structured=True) == ("SELECT 1", OUTPUT_FALLBACK)
+        assert invoke_for_sql(factory, "old-model", "Q", structured=True) == ("SELECT 2", OUTPUT_FALLBACK)
+        assert calls == [{"format": SQL_OUTPUT_SCHEMA}, {}, {}]
+
+    def test_transient_error_does_not_disable_structured_output(self, stub_llm):
+        stub = stub_llm('{"tables": [], "sql": "SELECT 1"}')
+        failures = [ResponseError("server busy", 503)]
+
+        class FlakyModel:
+            def invoke(self, prompt):
+                raise failures.pop()
+
+        def factory(model_name, **kwargs):
+            return FlakyModel() if failures else stub
+
+        with pytest.raises(ResponseError):
+            invoke_for_sql(factory, "busy-model", "Q", structured=True)
+        assert invoke_for_sql(factory, "busy-model", "Q", structured=True) == ("SELECT 1", OUTPUT_STRUCTURED)
+
+    def test_text_mode_by_default(self, stub_llm):
+        stub = stub_llm("SELECT 1;")
+        assert invoke_for_sql(stub.as_factory(), "test-model", "Q") == ("SELECT 1", OUTPUT_TEXT)
+
+    def test_agent_records_output_mode(self, test_engine, stub_llm):
+        stub = stub_llm('{"tables": ["Artist"], "sql": "SELECT Name FROM Artist"}')
+        agent = build_agent(test_engine, "test-model", structured_output=True,
+                            llm_factory=stub.as_factory())
+
+        result = agent.invoke(initial_state("List all artists"))
+
+        assert result["output_mode"] == OUTPUT_STRUCTURED
+        assert result["results"] == [["AC/DC"], ["Accept"]]
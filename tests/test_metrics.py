@@ -0,0 +1,59 @@
+"""Tests for app/metrics.py (in-process counters and latency samples)."""
+
+import threading
+
+from app.metrics import Metrics
+
+
+class TestMetrics:
+    """Tests for the Metrics registry."""
+
+    def test_counters_and_gauges(self):
+        m = Metrics()
+        m.incr("a")
+        m.incr("a", 2)
+        m.set_gauge("depth", 4)
+        assert m.counter("a") == 3
+        assert m.counter("missing") == 0
+        assert m.gauge("depth") == 4
+
+    def test_percentiles(self):
+        m = Metrics()
+        for v in range(1, 101):
+            m.observe("lat", v)
+        assert m.percentile("lat", 50) == 51
+        assert m.percentile("lat", 99) == 99
+        assert m.percentile("missing", 50) is None
+        summary = m.summary("lat")
+        assert summary["count"] == 100
+        assert summary["mean"] == 50.5
+
+    def test_samples_are_bounded(self):
+        m = Metrics(max_samples=10)
+        for v in range(100):
+            m.observe("lat", v)
+        assert m.summary("lat")["count"] == 10
+        assert m.percentile("lat", 0) == 90
+
+    def test_snapshot_filters_by_prefix(self):
+        m = Metrics()
+        m.incr("cascade.a.hits")
+        m.incr("other")
+        m.observe("cascade.a.latency", 1.0)
+        snap = m.snapshot("cascade.")
+        assert snap["counters"] == {"cascade.a.hits": 1}
+        assert snap["latency"]["cascade.a.latency"]["count"] == 1
+
+    def test_concurrent_increments(self):
+        m = Metrics()
+
+        def work():
+            for _ in range(1000):
+                m.incr("n")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert m.counter("n") == 8000
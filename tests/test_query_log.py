@@ -0,0 +1,70 @@
+"""Tests for the executed-query log (app/query_log.py)."""
+
+from app.agent import build_agent, make_execute_query, new_state
+from app.metrics import Metrics
+from app.query_log import (
+    QueryLogWriter,
+    default_log_path,
+    load_workload,
+    query_log_writer,
+    record_query,
+)
+
+
+class TestQueryLog:
+
+    def test_default_path(self):
+        assert default_log_path("data/chinook.db").name == "chinook.queries.db"
+
+    def test_repeated_statements_are_counted(self, tmp_path):
+        log_path = tmp_path / "q.db"
+        record_query(log_path, "SELECT Name FROM Artist;", 0.5)
+        record_query(log_path, "select  name from artist", 0.25)
+        record_query(log_path, "SELECT Title FROM Album", 1.0)
+
+        workload = load_workload(log_path)
+
+        assert [w["executions"] for w in workload] == [2, 1]
+        assert workload[0]["sql"] == "select  name from artist"
+        assert workload[0]["total_seconds"] == 0.75
+        assert load_workload(log_path, limit=1) == workload[:1]
+
+    def test_missing_log_is_empty(self, tmp_path):
+        assert load_workload(tmp_path / "missing.db") == []
+
+    def test_agent_logs_executed_sql(self, test_engine, stub_llm, tmp_path):
+        log_path = tmp_path / "q.db"
+        llm = stub_llm("SELECT Name FROM Artist ORDER BY Name", "SELECT Name FROM Singer")
+        agent = build_agent(test_engine, "test-model", llm_factory=llm.as_factory(),
+                            query_log_path=log_path)
+
+        agent.invoke(new_state("List all artists", "test-model"))
+        query_log_writer(log_path).flush()
+
+        assert [w["sql"] for w in load_workload(log_path)] == ["SELECT Name FROM Artist ORDER BY Name LIMIT 20"]
+
+    def test_writer_batches_until_flush(self, tmp_path):
+        writer = QueryLogWriter(tmp_path / "q.db", flush_seconds=60)
+        writer.record("SELECT 1", 0.1)
+        writer.record("SELECT 1", 0.2)
+        assert load_workload(tmp_path / "q.db") == []
+
+        writer.flush()
+
+        assert load_workload(tmp_path / "q.db")[0]["executions"] == 2
+
+    def test_failed_write_is_dropped(self, tmp_path):
+        metrics = Metrics()
+        writer = QueryLogWriter(tmp_path, flush_seconds=60, metrics=metrics)  # a directory
+        writer.record("SELECT 1", 0.1)
+        writer.flush()
+        assert metrics.counter("query_log.errors") == 1
+
+    def test_log_failure_does_not_fail_query(self, test_engine):
+        def broken_log(sql, seconds):
+            raise OSError("read-only file system")
+
+        execute_query = make_execute_query(test_engine, record_query=broken_log)
+        result = execute_query(new_state("q", "test-model") | {"generated_sql": "SELECT Name FROM Artist"})
+        assert result["error"] == ""
+        assert len(result["results"]) == 2
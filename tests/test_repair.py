@@ -0,0 +1,93 @@
+"""Tests for app/repair.py (compact repair prompts)."""
+
+from app.agent import build_agent, new_state
+from app.repair import (
+    referenced_identifiers,
+    unknown_identifier,
+    error_location,
+    closest_matches,
+    build_compact_schema,
+    build_repair_prompt,
+)
+
+
+def failed(sql: str, error: str = "", validation_error: str = "") -> dict:
+    state = new_state("List all album titles", "test-model")
+    state.update(generated_sql=sql, error=error, validation_error=validation_error)
+    return state
+
+
+class TestReferencedIdentifiers:
+    """Tests for referenced_identifiers()."""
+
+    def test_from_ast(self):
+        tables, columns = referenced_identifiers(
+            "SELECT a.Title FROM Album a JOIN Artist r ON a.ArtistId = r.ArtistId")
+        assert tables == {"Album", "Artist"}
+        assert columns == {"Title", "ArtistId"}
+
+    def test_unparsable_sql_falls_back_to_tokens(self):
+        tables, _ = referenced_identifiers("SELECT Title FROM Album WHERE (")
+        assert "Album" in tables
+
+
+class TestErrorContext:
+    """Tests for error parsing and closest matches."""
+
+    def test_unknown_identifier(self):
+        assert unknown_identifier("no such column: a.Titel") == ("column", "Titel")
+        assert unknown_identifier("no such table: Albums") == ("table", "Albums")
+        assert unknown_identifier("syntax error") is None
+
+    def test_parse_error_location(self):
+        error = "Expecting ). Line 1, Col: 36.\n  SELECT * FROM Artist WHERE (Name = \x1b[4m1\x1b[0m"
+        location = error_location("SELECT * FROM Artist WHERE (Name = 1", error)
+        assert location.splitlines()[1] == " " * 35 + "^"
+
+    def test_sqlite_near_location(self):
+        location = error_location("SELECT Title FORM Album", 'near "FORM": syntax error')
+        assert location.splitlines()[1] == " " * 13 + "^"
+
+    def test_closest_matches(self, test_schema_info):
+        assert closest_matches("Albums", "table", test_schema_info) == ["Album"]
+        assert closest_matches("Titel", "column", test_schema_info) == ["Album.Title TEXT"]
+
+
+class TestCompactPrompt:
+    """Tests for build_compact_schema() / build_repair_prompt()."""
+
+    def test_only_referenced_tables_and_columns(self, test_schema_info):
+        schema = build_compact_schema(test_schema_info, "SELECT Title FROM Album")
+        assert schema == "CREATE TABLE Album (AlbumId INTEGER, Title TEXT);"
+
+    def test_token_budget_keeps_first_table(self, test_schema_info):
+        schema = build_compact_schema(
+            test_schema_info, "SELECT Name, Title FROM Artist JOIN Album USING (ArtistId)",
+            token_budget=1)
+        assert schema.count("CREATE TABLE") == 1
+
+    def test_prompt_has_error_and_suggestion(self, test_schema_info):
+        prompt = build_repair_prompt(
+            failed("SELECT Titel FROM Album", error="no such column: Titel"),
+            test_schema_info, "test-model")
+        assert "Error: no such column: Titel" in prompt
+        assert "Closest matches for column Titel: Album.Title TEXT" in prompt
+        assert "CREATE TABLE Artist" not in prompt
+
+    def test_sqlcoder_keeps_its_format(self, test_schema_info):
+        prompt = build_repair_prompt(
+            failed("SELECT Titel FROM Album", error="no such column: Titel"),
+            test_schema_info, "sqlcoder:7b")
+        assert prompt.startswith("### Task")
+
+    def test_agent_uses_compact_repair(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Titel FROM Album", "SELECT Title FROM Album")
+        agent = build_agent(test_engine, "test-model", compact_repair=True,
+                            llm_factory=stub.as_factory())
+
+        result = agent.invoke(new_state("List all album titles", "test-model"))
+
+        repair_prompt = stub.prompts[1][0].content
+        assert repair_prompt.startswith("Fix this SQLite query.")
+        assert "Album.Title" in repair_prompt
+        assert result["results"] == [["For Those About To Rock"], ["Balls to the Wall"]]
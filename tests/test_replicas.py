@@ -0,0 +1,168 @@
+"""Tests for Ollama replica load balancing (app/replicas.py).
+
+Replicas are stub Ollama servers on local ports answering /api/ps and
+streaming /api/chat, so routing, failover and health checks run against
+real HTTP with the real ChatOllama client.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.llm import create_llm, invoke_for_sql
+from app.metrics import Metrics
+from app.replicas import REPLICA_ERRORS, ReplicaPool
+
+
+class StubOllama:
+    """Minimal Ollama server: /api/ps lists loaded models, /api/chat answers `answer`."""
+
+    def __init__(self, answer: str, loaded: tuple[str, ...] = ()):
+        self.answer = answer
+        self.loaded = list(loaded)
+        self.chats = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != "/api/ps":
+                    self.send_error(404)
+                    return
+                body = json.dumps({"models": [{"name": m, "model": m} for m in stub.loaded]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.chats += 1
+                lines = [
+                    {"model": request["model"], "created_at": "2026-01-01T00:00:00Z",
+                     "message": {"role": "assistant", "content": stub.answer}, "done": False},
+                    {"model": request["model"], "created_at": "2026-01-01T00:00:00Z",
+                     "message": {"role": "assistant", "content": ""}, "done": True,
+                     "done_reason": "stop"},
+                ]
+                body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_servers():
+    servers = []
+
+    def start(*args, **kwargs) -> StubOllama:
+        server = StubOllama(*args, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def closed_port_url() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BaseHTTPRequestHandler)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.server_close()
+    return url
+
+
+class TestRouting:
+
+    def test_prefers_replica_with_model_loaded(self, stub_servers):
+        cold = stub_servers("SELECT 'cold'")
+        warm = stub_servers("SELECT 'warm'", loaded=("llama3.1:8b",))
+        pool = ReplicaPool([cold.url, warm.url], metrics=Metrics())
+        pool.check_all()
+
+        for _ in range(3):
+            sql, _ = invoke_for_sql(create_llm, "llama3.1:8b", "Q", scheduler=None, replicas=pool)
+            assert sql == "SELECT 'warm'"
+        assert cold.chats == 0
+
+    def test_least_outstanding_without_affinity(self):
+        pool = ReplicaPool(["http://a", "http://b"], metrics=Metrics())
+        pool.replicas[0].outstanding = 2
+        assert pool.pick("m").url == "http://b"
+
+    def test_rotates_between_equal_replicas(self):
+        pool = ReplicaPool(["http://a", "http://b"], metrics=Metrics())
+        assert {pool.pick("m").url for _ in range(4)} == {"http://a", "http://b"}
+
+
+class TestFailover:
+
+    def test_connection_error_fails_over(self, stub_servers):
+        live = stub_servers("SELECT 1")
+        metrics = Metrics()
+        pool = ReplicaPool([closed_port_url(), live.url], metrics=metrics)
+        pool.replicas[1].outstanding = 5  # route to the dead replica first
+
+        sql, _ = invoke_for_sql(create_llm, "m", "Q", scheduler=None, replicas=pool)
+
+        assert sql == "SELECT 1"
+        assert metrics.counter("replicas.failover") == 1
+        assert pool.replicas[0].failures == 1
+
+    def test_all_replicas_down_raises(self):
+        pool = ReplicaPool([closed_port_url(), closed_port_url()], metrics=Metrics())
+        with pytest.raises(REPLICA_ERRORS):
+            invoke_for_sql(create_llm, "m", "Q", scheduler=None, replicas=pool)
+
+
+class TestHealthChecks:
+
+    def test_ejects_after_failed_checks_and_recovers(self, stub_servers):
+        server = stub_servers("SELECT 1")
+        down = False
+
+        def fetch(url):
+            if down:
+                raise ConnectionError("down")
+            return {"m"}
+
+        pool = ReplicaPool([server.url, "http://other"], metrics=Metrics(),
+                           eject_failures=2, fetch_models=fetch)
+        down = True
+        pool.check(pool.replicas[0])
+        pool.check(pool.replicas[0])
+        assert not pool.snapshot()[0]["available"]
+        assert pool.pick("m").url == "http://other"
+
+        down = False
+        pool.check(pool.replicas[0])
+        assert pool.snapshot()[0]["available"]
+
+    def test_background_thread_refreshes_loaded_models(self, stub_servers):
+        server = stub_servers("SELECT 1")
+        pool = ReplicaPool([server.url], metrics=Metrics(), check_interval=0.05)
+        pool.start()
+        try:
+            server.loaded = ["llama3.2:3b"]
+            deadline = time.time() + 2
+            while "llama3.2:3b" not in pool.replicas[0].loaded_models and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            pool.stop()
+        assert pool.snapshot()[0]["loaded_models"] == ["llama3.2:3b"]
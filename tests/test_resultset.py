@@ -0,0 +1,74 @@
+"""Tests for the columnar result container (app/resultset.py)."""
+
+from array import array
+
+import pyarrow as pa
+
+from app.agent import build_agent, new_state, run_query_result
+from app.resultset import ResultSet
+
+
+def sample() -> ResultSet:
+    return ResultSet.from_rows(["id", "name", "price"],
+                               [(1, "a", 0.5), (2, None, 1.5), (3, "c", 2.0)])
+
+
+class TestResultSet:
+
+    def test_numeric_columns_are_typed_arrays(self):
+        rs = sample()
+        assert isinstance(rs.column("id"), array) and rs.column("id").typecode == "q"
+        assert isinstance(rs.column("price"), array) and rs.column("price").typecode == "d"
+        assert rs.column("name") == ["a", None, "c"]
+
+    def test_nullable_or_mixed_numeric_stays_list(self):
+        rs = ResultSet.from_rows(["v", "w"], [(1, 1), (None, 2.5)])
+        assert rs.column("v") == [1, None]
+        assert rs.column("w") == [1, 2.5]
+
+    def test_row_access(self):
+        rs = sample()
+        assert len(rs) == 3 and bool(rs)
+        assert rs[0] == (1, "a", 0.5) and rs[-1] == (3, "c", 2.0)
+        assert list(rs[1:]) == [(2, None, 1.5), (3, "c", 2.0)]
+        assert not ResultSet.from_rows(["x"], [])
+
+    def test_equality_and_hash(self):
+        assert sample() == sample() and hash(sample()) == hash(sample())
+        assert sample() == [[1, "a", 0.5], [2, None, 1.5], [3, "c", 2.0]]
+        assert sample() != sample()[:2]
+        assert len({sample(), sample()}) == 1
+
+    def test_serialization(self):
+        rs = sample()[:2]
+        assert rs.to_dict() == {"columns": ["id", "name", "price"],
+                                "rows": [[1, "a", 0.5], [2, None, 1.5]]}
+        assert rs.to_csv().splitlines() == ["id,name,price", "1,a,0.5", "2,,1.5"]
+
+    def test_to_arrow_keeps_types(self):
+        table = sample().to_arrow()
+        assert table.column_names == ["id", "name", "price"]
+        assert table.schema.types == [pa.int64(), pa.string(), pa.float64()]
+        assert table.column("id").to_pylist() == [1, 2, 3]
+
+    def test_smaller_than_row_lists(self):
+        rows = [(i, float(i)) for i in range(10_000)]
+        rs = ResultSet.from_rows(["a", "b"], rows)
+        assert rs.nbytes == 16 * 10_000
+
+
+class TestAgentResults:
+
+    def test_run_query_result(self, test_engine):
+        rs = run_query_result(test_engine, "SELECT ArtistId, Name FROM Artist ORDER BY ArtistId")
+        assert rs.columns == ["ArtistId", "Name"]
+        assert rs == [[1, "AC/DC"], [2, "Accept"]]
+
+    def test_agent_state_holds_resultset(self, test_engine, stub_llm):
+        llm = stub_llm("SELECT Name AS artist_name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=llm.as_factory())
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert isinstance(result["results"], ResultSet)
+        assert result["results"].columns == ["artist_name"]
+        assert result["results"] == [["AC/DC"], ["Accept"]]
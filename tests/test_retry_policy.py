@@ -0,0 +1,99 @@
+"""Tests for app/retry_policy.py (adaptive retry policy)."""
+
+from app.agent import build_agent, new_state, check_validation, should_retry
+from app.config import MAX_RETRIES, RETRY_BUDGETS
+from app.retry_policy import (
+    CATEGORY_SCHEMA_LINKING,
+    CATEGORY_SYNTAX,
+    CATEGORY_DIALECT,
+    CATEGORY_HALLUCINATION,
+    CATEGORY_BLOCKED,
+    CATEGORY_EMPTY,
+    CATEGORY_UNKNOWN,
+    STOP_MAX_RETRIES,
+    STOP_REPEATED_SQL,
+    classify_error,
+    decide_retry,
+    normalize_sql,
+)
+
+
+def failed_state(error: str = "", validation_error: str = "", sql: str = "SELECT 1",
+                 retry_count: int = 0, history: list | None = None) -> dict:
+    state = new_state("List all artists", "test-model")
+    state.update(error=error, validation_error=validation_error, generated_sql=sql,
+                 is_valid=not validation_error, retry_count=retry_count,
+                 retry_history=history or [])
+    return state
+
+
+class TestClassifyError:
+    """Tests for classify_error()."""
+
+    def test_categories(self):
+        assert classify_error("no such column: Artist.Nam") == CATEGORY_SCHEMA_LINKING
+        assert classify_error("ambiguous column name: ArtistId") == CATEGORY_SCHEMA_LINKING
+        assert classify_error('near "FORM": syntax error') == CATEGORY_SYNTAX
+        assert classify_error("sqlglot failed to parse SQL") == CATEGORY_SYNTAX
+        assert classify_error("no such function: ILIKE") == CATEGORY_DIALECT
+        assert classify_error("no such table: Singer") == CATEGORY_HALLUCINATION
+        assert classify_error("Write operation blocked: DELETE") == CATEGORY_BLOCKED
+        assert classify_error("LLM returned empty SQL") == CATEGORY_EMPTY
+        assert classify_error("database is locked") == CATEGORY_UNKNOWN
+
+    def test_normalize_sql(self):
+        assert normalize_sql("SELECT  Name\nFROM Artist;") == normalize_sql("select name from artist")
+
+
+class TestDecideRetry:
+    """Tests for decide_retry()."""
+
+    def test_first_failure_retries(self):
+        assert decide_retry(failed_state(error="no such column: Nam")) == (True, CATEGORY_SCHEMA_LINKING)
+
+    def test_blocked_write_never_retried(self):
+        state = failed_state(validation_error="Write operation blocked: DELETE")
+        assert decide_retry(state) == (False, "budget_exhausted:blocked")
+        assert check_validation(state) == "__end__"
+
+    def test_category_budget(self):
+        history = [{"sql": "select name from singer", "category": CATEGORY_HALLUCINATION}]
+        state = failed_state(error="no such table: Performer", sql="SELECT Name FROM Performer",
+                             retry_count=1, history=history)
+        assert RETRY_BUDGETS[CATEGORY_HALLUCINATION] == 1
+        assert decide_retry(state) == (False, "budget_exhausted:hallucination")
+        assert should_retry(state) == "__end__"
+
+    def test_repeated_sql_stops(self):
+        history = [{"sql": "select nam from artist", "category": CATEGORY_SCHEMA_LINKING}]
+        state = failed_state(error="no such column: Nam", sql="SELECT Nam FROM Artist",
+                             retry_count=1, history=history)
+        assert decide_retry(state) == (False, STOP_REPEATED_SQL)
+
+    def test_global_cap(self):
+        state = failed_state(error="database is locked", retry_count=MAX_RETRIES)
+        assert decide_retry(state) == (False, STOP_MAX_RETRIES)
+
+
+class TestAgentRetryPolicy:
+    """End-to-end retry behaviour with a stubbed LLM."""
+
+    def test_repeated_repair_stops_after_one_call(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Nam FROM Artist", "SELECT Nam FROM Artist", "SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=stub.as_factory())
+
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert result["retry_count"] == 1
+        assert result["stop_reason"] == STOP_REPEATED_SQL
+        assert len(stub.prompts) == 2
+
+    def test_successful_repair_has_no_stop_reason(self, test_engine, stub_llm):
+        stub = stub_llm("SELECT Nam FROM Artist", "SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", llm_factory=stub.as_factory())
+
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+        assert result["stop_reason"] == ""
+        assert result["retry_history"][0]["category"] == CATEGORY_SCHEMA_LINKING
@@ -0,0 +1,134 @@
+"""Tests for app/router.py (question-difficulty router)."""
+
+import pytest
+
+from app.agent import build_agent, new_state
+from app.config import PROMPT_ZERO_SHOT, PROMPT_FEW_SHOT, PROMPT_COT, FEW_SHOT_EXAMPLES
+from app.router import (
+    FEATURE_NAMES,
+    extract_features,
+    train_router,
+    predict_route,
+    save_router,
+    load_router,
+    route_labels_from_ablation,
+)
+
+
+def feature(features: list[float], name: str) -> float:
+    return features[FEATURE_NAMES.index(name)]
+
+
+@pytest.fixture
+def router_model():
+    """Router trained so that negation questions over many tables get CoT."""
+    samples = [
+        (extract_features("How many employees are there?", ["Employee"]), PROMPT_ZERO_SHOT),
+        (extract_features("List all media types", ["MediaType"]), PROMPT_ZERO_SHOT),
+        (extract_features("Which genre has the most tracks?", ["Genre", "Track"]), PROMPT_FEW_SHOT),
+        (extract_features("Find customers who have never purchased a Jazz track",
+                          ["Customer", "Invoice", "InvoiceLine", "Track", "Genre"]), PROMPT_COT),
+        (extract_features("Which artists have no albums without tracks?",
+                          ["Artist", "Album", "Track", "Genre"]), PROMPT_COT),
+    ]
+    return train_router(samples)
+
+
+class TestFeatures:
+    """Tests for extract_features()."""
+
+    def test_counts_question_cues(self):
+        features = extract_features(
+            "What is the average invoice total by country, only for countries with more than 5 customers?",
+            ["Customer", "Invoice"],
+        )
+        assert feature(features, "n_tables") == 2
+        assert feature(features, "aggregation") == 2
+        assert feature(features, "grouping") == 1
+        assert feature(features, "comparison") == 2
+        assert feature(features, "numbers") == 1
+
+    def test_negation(self):
+        assert feature(extract_features("Customers who never bought Jazz"), "negation") == 1
+        assert feature(extract_features("Customers who bought Jazz"), "negation") == 0
+
+
+class TestClassifier:
+    """Tests for train_router() / predict_route()."""
+
+    def test_routes_by_nearest_centroid(self, router_model):
+        easy = extract_features("How many customers are there?", ["Customer"])
+        hard = extract_features("Find artists who never appear in any playlist",
+                                ["Artist", "Album", "Track", "PlaylistTrack", "Playlist"])
+        assert predict_route(router_model, easy) == PROMPT_ZERO_SHOT
+        assert predict_route(router_model, hard) == PROMPT_COT
+
+    def test_save_and_load(self, router_model, tmp_path):
+        path = tmp_path / "router.json"
+        save_router(router_model, path)
+        assert load_router(path) == router_model
+
+    def test_rejects_other_feature_set(self, router_model, tmp_path):
+        path = tmp_path / "router.json"
+        save_router({**router_model, "features": ["n_tables"]}, path)
+        with pytest.raises(ValueError):
+            load_router(path)
+
+    def test_rejects_single_route_model(self, tmp_path):
+        path = tmp_path / "router.json"
+        save_router(train_router([(extract_features("List all artists"), PROMPT_ZERO_SHOT)]), path)
+        with pytest.raises(ValueError, match="fewer than two routes"):
+            load_router(path)
+
+    def test_labels_from_ablation(self):
+        results = {"detailed_results": {
+            "zero_shot_full": [{"query_id": "E1", "execution_accurate": True},
+                               {"query_id": "H2", "execution_accurate": False},
+                               {"query_id": "H3", "execution_accurate": False}],
+            "dynamic_few_shot_full": [{"query_id": "E1", "execution_accurate": True},
+                                      {"query_id": "H2", "execution_accurate": False},
+                                      {"query_id": "H3", "execution_accurate": True}],
+            "cot_full": [{"query_id": "E1", "execution_accurate": True},
+                         {"query_id": "H2", "execution_accurate": True},
+                         {"query_id": "H3", "execution_accurate": True}],
+        }}
+        assert route_labels_from_ablation(results) == {
+            "E1": PROMPT_ZERO_SHOT, "H2": PROMPT_COT, "H3": PROMPT_FEW_SHOT,
+        }
+
+
+def simple_questions_to(route: str) -> dict:
+    """Two-route model sending simple one-table questions to route."""
+    return train_router([
+        (extract_features("List all artists", ["Artist"]), route),
+        (extract_features("Find customers who never bought more than 3 Jazz tracks per genre on average",
+                          ["Customer", "Invoice", "InvoiceLine", "Track", "Genre"]), PROMPT_ZERO_SHOT),
+    ])
+
+
+class TestRoutedAgent:
+    """Tests for the route_question node in the graph."""
+
+    def test_cot_route_changes_suffix(self, test_engine, stub_llm, tmp_path):
+        path = tmp_path / "router.json"
+        save_router(simple_questions_to(PROMPT_COT), path)
+        stub = stub_llm("Reasoning: Artist table.\nSQL: SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", router_model_path=path, cache_prompt_prefix=True,
+                            llm_factory=stub.as_factory())
+
+        result = agent.invoke(new_state("List all artists", "test-model"))
+
+        assert result["prompt_type"] == PROMPT_COT
+        assert "Reasoning:" in stub.prompts[0][1].content
+        assert result["results"] == [["AC/DC"], ["Accept"]]
+
+    def test_few_shot_route_without_store_uses_static_examples(self, test_engine, stub_llm, tmp_path):
+        path = tmp_path / "router.json"
+        save_router(simple_questions_to(PROMPT_FEW_SHOT), path)
+        stub = stub_llm("SELECT Name FROM Artist")
+        agent = build_agent(test_engine, "test-model", router_model_path=path, cache_prompt_prefix=True,
+                            llm_factory=stub.as_factory())
+
+        agent.invoke(new_state("List all artists", "test-model"))
+
+        assert FEW_SHOT_EXAMPLES in stub.prompts[0][1].content
@@ -0,0 +1,97 @@
+"""Tests for the LLM call scheduler (app/scheduler.py)."""
+
+import threading
+import time
+
+import pytest
+
+from app.cancellation import CancelToken, DeadlineExceeded, QueryCancelled
+from app.llm import invoke_for_sql
+from app.metrics import Metrics
+from app.scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMScheduler
+
+
+def start_waiter(scheduler: LLMScheduler, order: list, label: str, priority: int) -> threading.Thread:
+    def run():
+        with scheduler.slot(priority):
+            order.append(label)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    time.sleep(0.05)  # enqueue in a known order
+    return thread
+
+
+class TestLLMScheduler:
+
+    def test_caps_concurrency(self):
+        scheduler = LLMScheduler(max_concurrency=2, metrics=Metrics())
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with scheduler.slot():
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        assert peak[0] == 2
+
+    def test_interactive_before_batch(self):
+        scheduler = LLMScheduler(max_concurrency=1, metrics=Metrics())
+        order = []
+        scheduler.acquire()
+        threads = [start_waiter(scheduler, order, "batch-1", PRIORITY_BATCH),
+                   start_waiter(scheduler, order, "batch-2", PRIORITY_BATCH),
+                   start_waiter(scheduler, order, "interactive", PRIORITY_INTERACTIVE)]
+        scheduler.release()
+        for t in threads:
+            t.join(5)
+        assert order == ["interactive", "batch-1", "batch-2"]
+
+    def test_expired_deadline_dropped_from_queue(self):
+        metrics = Metrics()
+        scheduler = LLMScheduler(max_concurrency=1, metrics=metrics)
+        scheduler.acquire()
+        with pytest.raises(DeadlineExceeded):
+            scheduler.acquire(deadline=time.time() + 0.1)
+        assert scheduler.snapshot()["queued"] == 0
+        assert metrics.counter("llm.queue.dropped") == 1
+        scheduler.release()
+
+    def test_cancel_leaves_queue(self):
+        scheduler = LLMScheduler(max_concurrency=1, metrics=Metrics())
+        scheduler.acquire()
+        token = CancelToken()
+        threading.Timer(0.05, token.cancel).start()
+        t0 = time.time()
+        with pytest.raises(QueryCancelled):
+            scheduler.acquire(cancel_token=token)
+        assert time.time() - t0 < 1
+        scheduler.release()
+
+    def test_metrics(self):
+        metrics = Metrics()
+        scheduler = LLMScheduler(max_concurrency=1, metrics=metrics)
+        with scheduler.slot():
+            assert metrics.gauge("llm.queue.inflight") == 1
+        assert metrics.gauge("llm.queue.inflight") == 0
+        assert metrics.summary("llm.queue.wait_seconds")["count"] == 1
+
+    def test_invoke_for_sql_uses_scheduler(self, stub_llm):
+        scheduler = LLMScheduler(max_concurrency=1, metrics=Metrics())
+        scheduler.acquire()
+        with pytest.raises(DeadlineExceeded):
+            invoke_for_sql(stub_llm("SELECT 1").as_factory(), "m", "prompt",
+                           deadline=time.time() + 0.1, scheduler=scheduler)
+        scheduler.release()
+        assert invoke_for_sql(stub_llm("SELECT 1").as_factory(), "m", "prompt",
+                              scheduler=scheduler) == ("SELECT 1", "text")
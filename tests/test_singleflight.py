@@ -0,0 +1,142 @@
+"""Tests for single-flight coalescing (app/singleflight.py)."""
+
+import threading
+import time
+
+import pytest
+
+from app.cancellation import CancelToken, QueryCancelled
+from app.metrics import Metrics
+from app.singleflight import SingleFlight, flight_key
+
+
+def run_concurrently(flights: SingleFlight, key, fn, n: int, tokens=None) -> list:
+    """Call flights.do from n threads; return (result, shared) or the exception per thread."""
+    outcomes = [None] * n
+
+    def call(i: int) -> None:
+        try:
+            outcomes[i] = flights.do(key, fn, tokens[i] if tokens else None)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)  # first thread becomes the leader
+    for t in threads:
+        t.join(5)
+    return outcomes
+
+
+class TestFlightKey:
+
+    def test_normalizes_question(self):
+        assert flight_key("How many  artists?", "m", "db") == flight_key(" how many artists ", "m", "db")
+
+    def test_model_and_database_distinguish(self):
+        assert flight_key("q", "a", "db") != flight_key("q", "b", "db")
+        assert flight_key("q", "a", "db1") != flight_key("q", "a", "db2")
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_one_execution(self):
+        metrics = Metrics()
+        flights = SingleFlight(metrics)
+        calls = []
+
+        def work(token):
+            calls.append(1)
+            time.sleep(0.2)
+            return {"rows": [1]}
+
+        outcomes = run_concurrently(flights, "k", work, 4)
+        assert len(calls) == 1
+        assert all(result == {"rows": [1]} for result, _ in outcomes)
+        assert sorted(shared for _, shared in outcomes) == [False, True, True, True]
+        assert metrics.counter("singleflight.coalesced") == 3
+
+    def test_error_propagates_to_all_callers(self):
+        flights = SingleFlight(Metrics())
+
+        def fail(token):
+            time.sleep(0.1)
+            raise ValueError("boom")
+
+        outcomes = run_concurrently(flights, "k", fail, 3)
+        assert all(isinstance(o, ValueError) for o in outcomes)
+        assert flights.in_flight() == 0
+
+    def test_sequential_calls_run_again(self):
+        flights = SingleFlight(Metrics())
+        assert flights.do("k", lambda token: 1) == (1, False)
+        assert flights.do("k", lambda token: 2) == (2, False)
+
+    def test_one_caller_cancelling_does_not_cancel_shared_run(self):
+        flights = SingleFlight(Metrics())
+        tokens = [CancelToken(), CancelToken()]
+
+        def work(token):
+            tokens[1].cancel()  # the follower gives up
+            time.sleep(0.2)
+            return "cancelled" if token.cancelled else "done"
+
+        outcomes = run_concurrently(flights, "k", work, 2, tokens)
+        assert outcomes[0] == ("done", False)
+        assert isinstance(outcomes[1], QueryCancelled)
+
+    def test_shared_run_cancelled_when_all_callers_leave(self):
+        flights = SingleFlight(Metrics())
+        token = CancelToken()
+        seen = {}
+
+        def work(shared_token):
+            token.cancel()
+            seen["cancelled"] = shared_token.wait(1)
+
+        flights.do("k", work, token)
+        assert seen["cancelled"] is True
+        assert flights.in_flight() == 0
+
+    def test_shared_run_cancelled_when_every_follower_times_out(self):
+        flights = SingleFlight(Metrics())
+        leader_token = CancelToken()
+        seen = {}
+
+        def work(shared_token):
+            seen["cancelled"] = shared_token.wait(2)
+
+        leader = threading.Thread(target=flights.do, args=("k", work, leader_token))
+        leader.start()
+        time.sleep(0.05)
+        outcomes = []
+
+        def follow():
+            try:
+                flights.do("k", lambda token: None, deadline=time.time() + 0.2)
+            except QueryCancelled as e:
+                outcomes.append(e)
+
+        followers = [threading.Thread(target=follow) for _ in range(2)]
+        for follower in followers:
+            follower.start()
+        time.sleep(0.05)
+        leader_token.cancel()  # the leader's client leaves; only the followers remain
+        for thread in followers + [leader]:
+            thread.join(5)
+
+        assert len(outcomes) == 2
+        assert seen["cancelled"] is True
+        assert flights.in_flight() == 0
+
+    def test_follower_deadline(self):
+        flights = SingleFlight(Metrics())
+        release = threading.Event()
+        leader = threading.Thread(target=flights.do, args=("k", lambda token: release.wait(2)))
+        leader.start()
+        time.sleep(0.05)
+        with pytest.raises(QueryCancelled):
+            flights.do("k", lambda token: None, deadline=time.time() + 0.1)
+        release.set()
+        leader.join()
@@ -0,0 +1,150 @@
+"""Tests for the verified optimizer pass (app/sql_optimizer.py, app/sql_rewrite.py)."""
+
+import sqlite3
+import time
+from functools import partial
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.agent import build_agent, new_state
+from app.cancellation import CancelToken
+from app.database import get_schema_info
+from app.metrics import Metrics
+from app.sql_optimizer import SampleDatabase, SqlOptimizer
+from app.sql_rewrite import optimize_sql
+
+
+@pytest.fixture
+def shop_engine(tmp_path):
+    """Artist/Album/Label with NOT NULL foreign keys, plus a nullable Album.Note."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'shop.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Label (LabelId INTEGER PRIMARY KEY, Name TEXT NOT NULL)"))
+        conn.execute(text("CREATE TABLE Artist (ArtistId INTEGER PRIMARY KEY, Name TEXT NOT NULL)"))
+        conn.execute(text("""
+            CREATE TABLE Album (
+                AlbumId INTEGER PRIMARY KEY,
+                Title TEXT NOT NULL,
+                Note TEXT,
+                ArtistId INTEGER NOT NULL REFERENCES Artist(ArtistId),
+                LabelId INTEGER NOT NULL REFERENCES Label(LabelId)
+            )
+        """))
+        conn.execute(text("INSERT INTO Label VALUES (1, 'Atlantic')"))
+        for i in range(1, 11):
+            conn.execute(text("INSERT INTO Artist VALUES (:i, :name)"), {"i": i, "name": f"Artist {i}"})
+        for i in range(1, 6):
+            conn.execute(text("INSERT INTO Album VALUES (:i, :title, NULL, :i, 1)"),
+                         {"i": i, "title": f"Album {i}"})
+    return engine
+
+
+@pytest.fixture
+def schema_info(shop_engine):
+    return get_schema_info(shop_engine)
+
+
+class TestOptimizeSql:
+
+    def test_not_in_becomes_not_exists(self, schema_info):
+        sql = optimize_sql("SELECT Name FROM Artist WHERE ArtistId NOT IN (SELECT ArtistId FROM Album)",
+                           schema_info)
+        assert "NOT EXISTS(SELECT 1 FROM album AS album WHERE album.artistid = artist.artistid)" in sql
+        assert "NOT IN" not in sql.upper().replace("NOT EXISTS", "")
+
+    def test_not_in_over_nullable_column_kept(self, schema_info):
+        assert optimize_sql("SELECT Title FROM Album WHERE Note NOT IN (SELECT Name FROM Label)",
+                            schema_info, rules=()) is None
+
+    def test_unused_joins_removed(self, schema_info):
+        left = optimize_sql("SELECT al.Title FROM Album al LEFT JOIN Artist ar ON al.ArtistId = ar.ArtistId",
+                            schema_info, rules=())
+        inner = optimize_sql("SELECT al.Title FROM Album al JOIN Label l ON l.LabelId = al.LabelId",
+                             schema_info, rules=())
+        assert "JOIN" not in left and "JOIN" not in inner
+
+    def test_used_or_filtering_joins_kept(self, schema_info):
+        used = "SELECT al.Title, ar.Name FROM Album al JOIN Artist ar ON al.ArtistId = ar.ArtistId"
+        # Not on Artist's primary key: the join may filter or duplicate rows
+        filtering = "SELECT al.Title FROM Album al JOIN Artist ar ON al.Title = ar.Name"
+        assert optimize_sql(used, schema_info, rules=()) is None
+        assert optimize_sql(filtering, schema_info, rules=()) is None
+
+    def test_redundant_distinct_dropped(self, schema_info):
+        sql = optimize_sql("SELECT DISTINCT ArtistId, Name FROM Artist", schema_info, rules=())
+        assert "DISTINCT" not in sql
+        assert optimize_sql("SELECT DISTINCT Name FROM Artist", schema_info, rules=()) is None
+
+    def test_unknown_column_not_rewritten(self, schema_info):
+        assert optimize_sql("SELECT Nope FROM Artist WHERE ArtistId NOT IN (SELECT 1)", schema_info) is None
+
+
+class TestSqlOptimizer:
+
+    def test_adopts_verified_rewrite_with_original_names(self, shop_engine, schema_info):
+        metrics = Metrics()
+        optimizer = SqlOptimizer(shop_engine, schema_info, min_speedup=0.0, metrics=metrics)
+
+        outcome = optimizer.optimize(
+            "SELECT Name, COUNT(*) FROM Artist WHERE ArtistId NOT IN (SELECT ArtistId FROM Album) GROUP BY Name")
+
+        assert "NOT EXISTS" in outcome["sql"]
+        names, rows, _ = optimizer.sample.run(outcome["sql"])
+        assert names == ["Name", "COUNT(*)"]
+        assert sorted(rows) == [(f"Artist {i}", 1) for i in sorted(range(6, 11), key=str)]
+        assert outcome["speedup"] > 0
+        assert metrics.counter("optimizer.rewritten") == 1
+        assert metrics.summary("optimizer.speedup")["count"] == 1
+
+    def test_rejects_candidate_with_different_rows(self, shop_engine, schema_info, monkeypatch):
+        metrics = Metrics()
+        optimizer = SqlOptimizer(shop_engine, schema_info, min_speedup=0.0, metrics=metrics)
+        monkeypatch.setattr(optimizer, "candidates", lambda sql: ["SELECT Name FROM Artist LIMIT 3"])
+
+        assert optimizer.optimize("SELECT Name FROM Artist") is None
+        assert metrics.counter("optimizer.rejected") == 1
+
+    def test_rejects_when_not_faster(self, shop_engine, schema_info):
+        optimizer = SqlOptimizer(shop_engine, schema_info, min_speedup=1e9, metrics=Metrics())
+        assert optimizer.optimize("SELECT DISTINCT ArtistId, Name FROM Artist") is None
+
+    def test_skipped_when_budget_is_short(self, shop_engine, schema_info):
+        metrics = Metrics()
+        optimizer = SqlOptimizer(shop_engine, schema_info, min_speedup=0.0, metrics=metrics)
+        cancelled = CancelToken()
+        cancelled.cancel()
+
+        sql = "SELECT Name FROM Artist WHERE ArtistId NOT IN (SELECT ArtistId FROM Album)"
+        assert optimizer.optimize(sql, deadline=time.time() + 1) is None
+        assert optimizer.optimize(sql, cancel_token=cancelled) is None
+        assert metrics.counter("optimizer.skipped") == 2
+
+    def test_sample_run_stops_at_request_deadline(self, shop_engine):
+        sample = SampleDatabase(shop_engine)
+        endless = ("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                   "SELECT COUNT(*) FROM n")
+        t0 = time.time()
+        with pytest.raises(sqlite3.OperationalError):
+            sample.run(endless, timeout=30, deadline=time.time() + 0.2)
+        assert time.time() - t0 < 5
+
+    def test_sample_is_a_prefix(self, shop_engine):
+        sample = SampleDatabase(shop_engine, rows_per_table=3)
+        assert sample.run("SELECT COUNT(*) FROM Artist")[1] == [(3,)]
+        assert sample.run("SELECT COUNT(*) FROM Album")[1] == [(3,)]
+
+
+class TestOptimizeNode:
+
+    def test_agent_executes_optimized_sql(self, shop_engine, stub_llm, monkeypatch):
+        # Any verified rewrite is adopted, however small the sample speedup
+        monkeypatch.setattr("app.agent.SqlOptimizer", partial(SqlOptimizer, min_speedup=0.0))
+        llm = stub_llm("SELECT Name FROM Artist WHERE ArtistId NOT IN (SELECT ArtistId FROM Album)")
+        agent = build_agent(shop_engine, "test-model", llm_factory=llm.as_factory(), optimize=True)
+
+        result = agent.invoke(new_state("Artists without albums", "test-model"))
+
+        assert "NOT EXISTS" in result["optimized_sql"]
+        assert result["executed_sql"].startswith(result["optimized_sql"])
+        assert result["results"] == [[f"Artist {i}"] for i in range(6, 11)]
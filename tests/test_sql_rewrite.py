@@ -0,0 +1,64 @@
+"""Tests for LIMIT pushdown (app/sql_rewrite.py)."""
+
+import pytest
+from sqlalchemy import text
+
+from app.sql_rewrite import push_down_limit
+
+
+class TestPushDownLimit:
+
+    def test_adds_limit_to_ordered_query(self):
+        sql = push_down_limit("SELECT Name FROM Artist ORDER BY Name", 20)
+        assert sql == "SELECT Name FROM Artist ORDER BY Name LIMIT 20"
+
+    def test_tightens_larger_limit_and_keeps_offset(self):
+        sql = push_down_limit("SELECT Name FROM Artist LIMIT 100 OFFSET 10", 20)
+        assert sql == "SELECT Name FROM Artist LIMIT 20 OFFSET 10"
+
+    def test_tightens_offset_comma_limit(self):
+        sql = push_down_limit("SELECT Name FROM Artist LIMIT 10, 100;", 20)
+        assert sql == "SELECT Name FROM Artist LIMIT 10, 20;"
+
+    def test_keeps_original_text_and_column_names(self, file_engine):
+        original = "select count(*), artistid*2 from Album group by artistid*2"
+        rewritten = push_down_limit(original, 20)
+        assert rewritten == original + " LIMIT 20"
+        with file_engine.connect() as conn:
+            assert list(conn.execute(text(rewritten)).keys()) == ["count(*)", "artistid*2"]
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT Name FROM Artist LIMIT 5",
+        "SELECT Name FROM Artist LIMIT 20",
+        "SELECT Name FROM Artist LIMIT ?",
+        "SELECT COUNT(*) FROM Track",
+        "SELECT MAX(Milliseconds) - MIN(Milliseconds) FROM Track",
+        "INSERT INTO Artist (Name) VALUES ('x')",
+        "SELECT FROM WHERE",
+    ])
+    def test_unchanged(self, sql):
+        assert push_down_limit(sql, 20) is None
+
+    def test_group_by_aggregate_is_limited(self):
+        sql = push_down_limit("SELECT GenreId, COUNT(*) FROM Track GROUP BY GenreId", 20)
+        assert sql.endswith("GROUP BY GenreId LIMIT 20")
+
+    def test_window_aggregate_is_limited(self):
+        sql = push_down_limit("SELECT Name, COUNT(*) OVER () FROM Artist", 20)
+        assert sql.endswith("LIMIT 20")
+
+    def test_only_outermost_query(self):
+        sql = push_down_limit(
+            "WITH t AS (SELECT ArtistId FROM Album LIMIT 500) "
+            "SELECT Name FROM Artist WHERE ArtistId IN (SELECT ArtistId FROM t) "
+            "UNION SELECT Title FROM Album", 20)
+        assert "LIMIT 500" in sql
+        assert sql.endswith("FROM Album LIMIT 20")
+        assert sql.count("LIMIT") == 2
+
+    def test_same_leading_rows(self, file_engine):
+        original = "SELECT ArtistId, Name FROM Artist ORDER BY ArtistId DESC"
+        rewritten = push_down_limit(original, 3)
+        with file_engine.connect() as conn:
+            expected = conn.execute(text(original)).fetchmany(3)
+            assert conn.execute(text(rewritten)).fetchall() == expected
@@ -0,0 +1,106 @@
+"""Tests for app/value_index.py (FTS5 value grounding)."""
+
+from sqlalchemy import text
+
+from app.agent import make_schema_filter
+from app.value_index import (
+    default_index_path,
+    normalize_value,
+    get_text_columns,
+    refresh_value_index,
+    lookup_values,
+    make_value_lookup,
+    format_value_hits,
+)
+
+
+class TestNormalizeValue:
+    """Tests for normalize_value()."""
+
+    def test_punctuation_collapses_to_spaces(self):
+        assert normalize_value("AC/DC") == "ac dc"
+
+    def test_strips_diacritics(self):
+        assert normalize_value("São Paulo") == "sao paulo"
+
+
+class TestRefreshValueIndex:
+    """Tests for refresh_value_index()."""
+
+    def test_indexes_only_text_columns(self, test_schema_info):
+        assert get_text_columns(test_schema_info) == [("Artist", "Name"), ("Album", "Title")]
+
+    def test_builds_index(self, test_engine, test_schema_info, tmp_path):
+        stats = refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        assert stats["indexed"] == 2
+        assert stats["values"] == 4
+
+    def test_second_refresh_is_noop(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        stats = refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        assert stats["indexed"] == 0
+        assert stats["unchanged"] == 2
+
+    def test_reindexes_only_changed_table(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        with test_engine.connect() as conn:
+            conn.execute(text("INSERT INTO Artist (ArtistId, Name) VALUES (3, 'Aerosmith')"))
+            conn.commit()
+        stats = refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        assert stats["indexed"] == 1
+        assert lookup_values(tmp_path / "v.db", "Albums by Aerosmith") == [
+            ("Artist", "Name", "Aerosmith")
+        ]
+
+
+class TestLookupValues:
+    """Tests for lookup_values()."""
+
+    def test_finds_value_with_punctuation(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        hits = lookup_values(tmp_path / "v.db", "What albums did AC/DC release?")
+        assert hits == [("Artist", "Name", "AC/DC")]
+
+    def test_prefers_longest_ngram(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        hits = lookup_values(tmp_path / "v.db", "Who recorded Balls to the Wall?")
+        assert hits == [("Album", "Title", "Balls to the Wall")]
+
+    def test_partial_word_is_not_a_hit(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        assert lookup_values(tmp_path / "v.db", "List all rock albums") == []
+
+    def test_exact_match_behind_many_token_matches(self, test_engine, test_schema_info, tmp_path):
+        with test_engine.connect() as conn:
+            for album_id in range(10, 70):
+                conn.execute(text("INSERT INTO Album (AlbumId, Title, ArtistId) VALUES (:id, :title, 1)"),
+                             {"id": album_id, "title": f"Love Song {album_id}"})
+            conn.execute(text("INSERT INTO Album (AlbumId, Title, ArtistId) VALUES (70, 'Love', 1)"))
+            conn.commit()
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        hits = lookup_values(tmp_path / "v.db", "Which albums are called Love?")
+        assert hits == [("Album", "Title", "Love")]
+
+    def test_missing_index_returns_no_hits(self, tmp_path):
+        assert lookup_values(tmp_path / "missing.db", "AC/DC") == []
+
+
+class TestSchemaFilterGrounding:
+    """Tests for value hits injected by schema_filter."""
+
+    def test_hits_added_to_schema_text(self, test_engine, test_schema_info, tmp_path):
+        refresh_value_index(test_engine, test_schema_info, tmp_path / "v.db")
+        schema_filter = make_schema_filter(test_schema_info, {}, make_value_lookup(tmp_path / "v.db"))
+
+        result = schema_filter({"question": "How many albums does Accept have?"})
+
+        assert "'Accept' appears in Artist.Name" in result["schema_text"]
+        assert "Artist" in result["relevant_tables"]
+
+    def test_format_groups_locations(self):
+        text_out = format_value_hits([("Customer", "Country", "Brazil"),
+                                      ("Invoice", "BillingCountry", "Brazil")])
+        assert "'Brazil' appears in Customer.Country, Invoice.BillingCountry" in text_out
+
+    def test_default_index_path(self):
+        assert str(default_index_path("data/chinook.db")).endswith("chinook.values.db")
@@ -0,0 +1,61 @@
+"""Tests for model warm-up and keep-alive (app/warmup.py)."""
+
+from app.config import OLLAMA_KEEP_ALIVE
+from app.llm import create_llm
+from app.metrics import Metrics
+from app.warmup import ModelWarmer, warmup_status
+
+
+def make_warmer(stub, loaded=frozenset(), **kwargs) -> ModelWarmer:
+    return ModelWarmer(["warm-test-model"], "CREATE TABLE Artist (ArtistId INTEGER);",
+                       llm_factory=stub.as_factory(), base_urls=["http://ollama"],
+                       fetch_models=lambda url: set(loaded), metrics=Metrics(), **kwargs)
+
+
+class TestModelWarmer:
+
+    def test_warm_up_prefills_schema_prefix(self, stub_llm):
+        stub = stub_llm("OK")
+        make_warmer(stub).warm_all()
+
+        assert stub.prompts[0][0].content == "CREATE TABLE Artist (ArtistId INTEGER);"
+        status = warmup_status("warm-test-model")
+        assert status["loaded"] is True
+        assert status["warmup_seconds"] is not None
+
+    def test_rewarms_unloaded_model(self, stub_llm):
+        stub = stub_llm("OK")
+        warmer = make_warmer(stub, loaded={"other-model"})
+        warmer.check()
+        assert len(stub.prompts) == 1
+        assert warmer._metrics.counter("warmup.warm-test-model.rewarms") == 1
+
+    def test_only_primary_cascade_model_rewarmed(self, stub_llm):
+        stub = stub_llm("OK")
+        warmer = ModelWarmer(["small-model", "large-model"], llm_factory=stub.as_factory(),
+                             base_urls=["http://ollama"], fetch_models=lambda url: set(),
+                             metrics=Metrics())
+        warmer.check()
+        assert len(stub.prompts) == 1
+        assert warmer._metrics.counter("warmup.small-model.rewarms") == 1
+        assert warmer._metrics.counter("warmup.large-model.rewarms") == 0
+        assert warmup_status("large-model")["loaded"] is False
+
+    def test_loaded_model_not_rewarmed(self, stub_llm):
+        stub = stub_llm("OK")
+        make_warmer(stub, loaded={"warm-test-model"}).check()
+        assert stub.prompts == []
+        assert warmup_status("warm-test-model")["loaded"] is True
+
+    def test_failed_warm_up_recorded(self):
+        class Unreachable:
+            def invoke(self, prompt):
+                raise ConnectionError("no server")
+
+        warmer = ModelWarmer(["unreachable-model"], llm_factory=lambda model_name, **o: Unreachable(),
+                             base_urls=["http://ollama"], metrics=Metrics())
+        assert warmer.warm("unreachable-model") is None
+        assert warmup_status("unreachable-model")["error"] == "no server"
+
+    def test_create_llm_sets_keep_alive(self):
+        assert create_llm("llama3.1:8b").keep_alive == OLLAMA_KEEP_ALIVE